@@ -0,0 +1,239 @@
+import pandas as pd
+import glob
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import embedding_cache
+import latency
+import measure
+import query_pool
+import recall
+import throughput
+
+# --- Configuration ---
+ENGINES = ["sqlserver", "postgres"]
+WORKLOADS = ["scripts", "knn"] # "scripts" = the HyBench query files, "knn" = the recall.py index queries at every K
+QUERIES = None # logical ids to run, e.g. ["NQ1", "NQ16", "IQ1"] (None = all)
+K_VALUES = recall.K_VALUES
+POOL_MODE = "single" # "single" = pool group 0 for everything, "batch" = every query once per query_pool.BATCH_SIZE groups
+PARALLEL = False # run the engines side by side (one thread + connection each) instead of one after the other
+WARMUP_RUNS = measure.WARMUP_RUNS
+REPETITIONS = measure.REPETITIONS
+OUTPUT_FILE = "benchmark_results.csv"
+# Ids the SQL Server script headers spell differently from the HyBench / postgres file names
+SQLSERVER_ALIASES = {"Q3": "NQ3", "Q4": "NQ4"}
+# ---------------------
+# One runner for both engines. Every logical HyBench query id (NQ*, IQ*, SQ*)
+# maps to one SQL text per engine; both engines get the same query vectors
+# (query_pool.py) and parameters, and every measurement becomes one row of a
+# tidy table keyed by (Engine, Workload, Query, K, Params). The System / Query /
+# K / Recall / Latency columns are the ones rec_plots.py and
+# plots/recallvslatency.py read, so OUTPUT_FILE can be plotted directly.
+# Recall is scored per engine against that engine's own data: SQL Server
+# against the embedding cache, PostgreSQL against an index-free run of the
+# same query, since the two databases do not hold the same rows.
+
+SYSTEMS = {"sqlserver": "SQL Server", "postgres": "PostgreSQL"}
+SCRIPT_ID = re.compile(r"^\s*--\s*,?\s*((?:NQ|IQ|SQ)\d+|Q\d+)\b")
+PG_FILE = re.compile(r"^(Q\d+)\((\w+)\)\.sql$")
+# latency.DELIMITER, tolerating the extra spacing some separators in the script have
+SCRIPT_DELIMITER = re.compile(r"--\s*### NEXT QUERY ###")
+
+# --- Query catalog ---
+
+def script_catalog():
+    """{query id: {"label": "Q36", "sqlserver": sql, "postgres": sql}} from both workloads."""
+    catalog = {}
+    with open(latency.INPUT_FILE, 'r') as f:
+        for part in SCRIPT_DELIMITER.split(f.read()):
+            sql = latency.clean_sql(part)
+            headers = [line for line in sql.splitlines() if SCRIPT_ID.match(line)]
+            if len(headers) > 1:
+                raise ValueError(f"{latency.INPUT_FILE}: one part has several query headers {headers}; check its separators")
+            m = SCRIPT_ID.match(sql)
+            if sql and m:
+                qid = SQLSERVER_ALIASES.get(m.group(1), m.group(1))
+                catalog.setdefault(qid, {"label": None})["sqlserver"] = sql
+    for path in sorted(glob.glob(os.path.join(throughput.PG_QUERY_DIR, "*.sql"))):
+        m = PG_FILE.match(os.path.basename(path))
+        if m:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = catalog.setdefault(m.group(2), {"label": None})
+                entry["label"], entry["postgres"] = m.group(1), f.read()
+    return catalog
+
+# Index (approximate) k-NN queries, written against @v1 / @v2 / @vp on SQL Server
+# (recall.bind) and %(v1)s / %(v2)s / %(vp)s on PostgreSQL (psycopg2 parameters).
+PG_KNN = {
+    "Q1": "SELECT old_id FROM text ORDER BY text_embedding <=> %(v1)s::vector LIMIT {k}",
+    "NQ11": "SELECT page_id FROM page ORDER BY page_embedding <=> %(vp)s::vector LIMIT {k}",
+    "NQ13": "SELECT old_id FROM text ORDER BY text_embedding <=> %(v1)s::vector LIMIT {k}",
+    "NQ16": """
+        SELECT old_id FROM (
+            (SELECT old_id, text_embedding <=> %(v1)s::vector AS distance FROM text ORDER BY distance LIMIT {k})
+            UNION ALL
+            (SELECT old_id, text_embedding <=> %(v2)s::vector AS distance FROM text ORDER BY distance LIMIT {k})
+        ) u ORDER BY distance LIMIT {k}
+    """,
+    "NQ18": """
+        SELECT old_id FROM (
+            SELECT old_id, text_embedding <=> %(v1)s::vector AS distance FROM text ORDER BY distance LIMIT {k2}
+        ) s
+        WHERE old_id NOT IN (SELECT old_id FROM text ORDER BY text_embedding <=> %(v2)s::vector LIMIT {k})
+        ORDER BY distance LIMIT {k}
+    """,
+    "IQ1": """
+        SELECT old_id FROM (
+            SELECT old_id, text_embedding <=> %(v1)s::vector AS distance FROM text ORDER BY distance LIMIT {k}
+        ) s ORDER BY distance, old_id OFFSET {offset} LIMIT 10
+    """,
+}
+
+def pool_vectors(group):
+    """({"v1", "v2", "vp"} JSON texts, recall.build_queries kwargs) for pool group `group`."""
+    pool = query_pool.load_pool()
+    _, text = query_pool.draw("text", "multi", 2, 2 * group, pool)[0]
+    _, page = query_pool.draw("page", "single", offset=2 * group, pool=pool)[0]
+    vectors = {"v1": embedding_cache.to_json(text[0]), "v2": embedding_cache.to_json(text[1]),
+               "vp": embedding_cache.to_json(page[0])}
+    exact = {"q_text_1": text[0], "q_text_2": text[1], "q_page": page[0]}
+    return vectors, exact
+
+def build_tasks():
+    """Every (query, K, vector group) to run, with its SQL per engine."""
+    groups = range(query_pool.BATCH_SIZE if POOL_MODE == "batch" else 1)
+    wanted = lambda qid: QUERIES is None or qid in QUERIES
+    tasks = []
+
+    if "scripts" in WORKLOADS:
+        sql_groups = query_pool.sql_groups(POOL_MODE)
+        for qid, entry in script_catalog().items():
+            if not wanted(qid):
+                continue
+            for g in groups:
+                tasks.append({
+                    "workload": "scripts", "query": qid, "label": entry["label"], "k": None,
+                    "params": {"vector_group": g},
+                    "sql": {e: (query_pool.pin(entry[e], sql_groups[g]), None) for e in ENGINES if e in entry},
+                    "truth": None,
+                })
+
+    if "knn" in WORKLOADS:
+        for g in groups:
+            vectors, exact = pool_vectors(g)
+            for k in K_VALUES:
+                for q in recall.build_queries(k, **exact):
+                    if not wanted(q["name"]):
+                        continue
+                    sql = {
+                        "sqlserver": (q["idx"], vectors),
+                        "postgres": (PG_KNN[q["name"]].format(k=k, k2=2 * k, offset=k - 10 if k >= 10 else 0), vectors),
+                    }
+                    tasks.append({
+                        "workload": "knn", "query": q["name"], "label": recall.COMPARISON_LABELS.get(q["name"], q["name"]),
+                        "k": k, "params": {"vector_group": g, "k": k},
+                        "sql": {e: sql[e] for e in ENGINES}, "truth": q["local"],
+                    })
+    return tasks
+
+# --- Execution ---
+
+def run_once(engine, conn, sql, args):
+    """Runs one task's SQL; returns the ids in the first column for k-NN tasks, else the row count."""
+    if args is None:
+        return throughput.execute(engine, conn, sql)
+    cursor = conn.cursor()
+    if engine == "sqlserver":
+        rows = recall.fetch_rows(cursor, sql, args)
+    else:
+        cursor.execute(sql, args)
+        rows = cursor.fetchall()
+        conn.commit()
+    return [r[0] for r in rows]
+
+def postgres_truth(conn, sql, args):
+    """
+    Exact ids for a PostgreSQL k-NN task: the same SQL with index scans off, so
+    the planner falls back to a sequential scan + sort over hybench_pg_200k itself
+    (the embedding caches hold the SQL Server tables, which PostgreSQL does not match).
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET LOCAL enable_indexscan = off; SET LOCAL enable_bitmapscan = off")
+        cursor.execute(sql, args)
+        return [r[0] for r in cursor.fetchall()]
+    finally:
+        conn.rollback()
+
+def run_engine(engine, tasks):
+    conn = throughput.connect(engine)
+    rows = []
+    try:
+        query_pool.check_ids(engine, conn.cursor())
+        for task in tasks:
+            if engine not in task["sql"]:
+                continue
+            sql, args = task["sql"][engine]
+            row = {
+                "Engine": engine,
+                "System": SYSTEMS[engine],
+                "Workload": task["workload"],
+                "Query": task["query"],
+                "Label": task["label"],
+                "K": task["k"],
+                "Params": json.dumps(task["params"], sort_keys=True),
+            }
+            try:
+                samples_ms, result = measure.measure(lambda: run_once(engine, conn, sql, args), WARMUP_RUNS, REPETITIONS)
+                summary = measure.summarize(samples_ms)
+                found = result if isinstance(result, list) else None
+                if task["truth"] is not None:
+                    truth = set(postgres_truth(conn, sql, args) if engine == "postgres" else task["truth"]())
+                    row["Recall"] = round(recall.calculate_recall(truth, set(found)), 2)
+                row.update({
+                    "Latency": summary["P50_MS"],
+                    "Rows": len(found) if found is not None else result,
+                    "Status": "Success",
+                    **summary,
+                })
+                print(f"  [{engine}] {task['query']}" + (f" K={task['k']}" if task["k"] else "") +
+                      f": p50 {summary['P50_MS']:.2f} ms" + (f", recall {row['Recall']:.1f}%" if "Recall" in row else ""))
+            except Exception as e:
+                print(f"  [{engine}] {task['query']} FAILED: {e}")
+                if engine == "postgres":
+                    conn.rollback()
+                row.update({"Status": "Failed", "Error_Msg": str(e)[:200]})
+            rows.append(row)
+    finally:
+        conn.close()
+    return rows
+
+def run_all():
+    if "knn" in WORKLOADS:
+        # Validate the embedding caches against SQL Server so its ground truth keys on the live
+        # snapshot; PostgreSQL ground truth comes from its own exact scan (postgres_truth)
+        if "sqlserver" in ENGINES:
+            conn = throughput.connect("sqlserver")
+            for name in embedding_cache.TABLES:
+                embedding_cache.load_cache(name, conn.cursor())
+            conn.close()
+
+    tasks = build_tasks()
+    print(f"{len(tasks)} tasks on {ENGINES} ({'in parallel' if PARALLEL else 'one engine at a time'}), "
+          f"{WARMUP_RUNS} warmup + {REPETITIONS} timed runs each")
+
+    if PARALLEL:
+        with ThreadPoolExecutor(max_workers=len(ENGINES)) as executor:
+            futures = [executor.submit(run_engine, engine, tasks) for engine in ENGINES]
+            results = [row for f in futures for row in f.result()]
+    else:
+        results = [row for engine in ENGINES for row in run_engine(engine, tasks)]
+
+    df = pd.DataFrame(results)
+    df.to_csv(OUTPUT_FILE, index=False)
+    print(f"\nResults for {df['Query'].nunique() if len(df) else 0} queries saved to {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    run_all()
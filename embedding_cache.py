@@ -0,0 +1,162 @@
+import numpy as np
+import json
+import os
+import time
+
+# --- Configuration ---
+SERVER = "localhost"
+DATABASE = "index_hybench_100k" # the database readers without a cursor open the cache of
+CACHE_DIR = "embedding_cache"
+DIM = 384
+CHUNK_SIZE = 10000
+# cache name -> (table, id column, embedding column)
+TABLES = {
+    "text": ("dbo.text", "old_id", "text_embedding"),
+    "page": ("dbo.page", "page_id", "page_embedding"),
+}
+# ---------------------
+
+conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={SERVER};DATABASE={DATABASE};Trusted_Connection=yes;"
+
+# Each table is cached as three files in CACHE_DIR/{database}:
+#   {name}_vectors.npy  float32 (rows, DIM), row i is the embedding of ids[i]
+#   {name}_ids.npy      int64 ids, sorted ascending
+#   {name}_meta.json    the table snapshot the cache was built from
+# The JSON -> float parse happens once, in build_cache; everything else opens
+# the matrix with mmap and never touches JSON again. Validating a cache first
+# compares a cheap marker (row count from the partition stats, schema modify
+# date, last write from the index usage stats); the full-table checksum only
+# runs when the marker moved.
+
+def cache_paths(name, database=DATABASE):
+    base = os.path.join(CACHE_DIR, database, name)
+    return f"{base}_vectors.npy", f"{base}_ids.npy", f"{base}_meta.json"
+
+def table_marker(cursor, name):
+    """Row count, modify date and last write of the source table, from metadata only (None if unreadable)."""
+    table = TABLES[name][0]
+    try:
+        cursor.execute(
+            "SELECT (SELECT SUM(row_count) FROM sys.dm_db_partition_stats WHERE object_id = OBJECT_ID(?) AND index_id IN (0, 1)), "
+            "(SELECT modify_date FROM sys.tables WHERE object_id = OBJECT_ID(?)), "
+            "(SELECT MAX(last_user_update) FROM sys.dm_db_index_usage_stats WHERE database_id = DB_ID() AND object_id = OBJECT_ID(?))",
+            table, table, table)
+        rows, modified, written = cursor.fetchone()
+    except Exception:
+        return None # no VIEW SERVER STATE: always checksum
+    return {"rows": int(rows or 0), "modified": str(modified), "written": str(written) if written else None}
+
+def table_snapshot(cursor, name):
+    """Database, row count and (id, embedding) checksum of the source table."""
+    table, id_col, emb_col = TABLES[name]
+    # The embedding text is part of the checksum, so re-embedded rows with unchanged ids invalidate the cache too
+    cursor.execute(f"SELECT DB_NAME(), COUNT_BIG(*), CHECKSUM_AGG(CHECKSUM({id_col}, CAST({emb_col} AS NVARCHAR(MAX)))) "
+                   f"FROM {table} WHERE {emb_col} IS NOT NULL")
+    database, rows, checksum = cursor.fetchone()
+    return {"database": database, "rows": int(rows), "checksum": int(checksum or 0)}
+
+def cache_meta(name, database=DATABASE):
+    with open(cache_paths(name, database)[2]) as f:
+        return json.load(f)
+
+def save_meta(name, meta):
+    with open(cache_paths(name, meta["database"])[2], "w") as f:
+        json.dump(meta, f)
+
+def snapshot_id(name, database=DATABASE):
+    """Stable string naming the data the cache currently holds (used to key derived results)."""
+    meta = cache_meta(name, database)
+    return f"{meta['rows']}-{meta['checksum']}"
+
+def parse_embeddings(json_strings):
+    """Parses a batch of JSON arrays into a float32 (n, DIM) block."""
+    return np.array([json.loads(s) for s in json_strings], dtype=np.float32).reshape(-1, DIM)
+
+def to_json(vec):
+    """Float32 vector -> JSON array text that round-trips exactly (what CAST(... AS VECTOR) expects)."""
+    return "[" + ",".join(f"{x:.9g}" for x in np.asarray(vec, dtype=np.float32).tolist()) + "]"
+
+def build_cache(cursor, name):
+    """Streams the table's embeddings once, in id order, straight into the memory-mapped matrix."""
+    table, id_col, emb_col = TABLES[name]
+    marker = table_marker(cursor, name)
+    snapshot = table_snapshot(cursor, name)
+    vectors_path, ids_path, meta_path = cache_paths(name, snapshot["database"])
+    os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+
+    n = snapshot["rows"]
+    print(f"Building embedding cache '{name}' ({n} rows)...", flush=True)
+    start_time = time.time()
+
+    vectors = np.lib.format.open_memmap(vectors_path + ".tmp", mode="w+", dtype=np.float32, shape=(n, DIM))
+    ids = np.empty(n, dtype=np.int64)
+    cursor.execute(
+        f"SELECT {id_col}, CAST({emb_col} AS VARCHAR(MAX)) FROM {table} "
+        f"WHERE {emb_col} IS NOT NULL ORDER BY {id_col}"
+    )
+    pos = 0
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        end = pos + len(rows)
+        ids[pos:end] = [r[0] for r in rows]
+        vectors[pos:end] = parse_embeddings([r[1] for r in rows])
+        pos = end
+    if pos != n:
+        raise RuntimeError(f"{table} changed while caching ({pos} rows read, {n} expected)")
+    vectors.flush()
+    del vectors
+
+    os.replace(vectors_path + ".tmp", vectors_path)
+    np.save(ids_path, ids)
+    save_meta(name, {**snapshot, "marker": marker})
+    print(f"Cache '{name}' written in {time.time() - start_time:.2f} seconds.")
+
+def load_cache(name, cursor=None, database=DATABASE):
+    """
+    Returns (ids, vectors) with `vectors` memory-mapped read-only.
+    With a cursor, the cache of the cursor's database is used and (re)built
+    when missing or when the table's row count or checksum no longer matches
+    the one it was built from; the checksum is skipped while the table's
+    marker is unchanged. Without one, `database`'s cache is opened as is.
+    """
+    if cursor is not None:
+        database = cursor.execute("SELECT DB_NAME()").fetchone()[0]
+    vectors_path, ids_path, meta_path = cache_paths(name, database)
+    if cursor is not None:
+        stale = True
+        if os.path.exists(meta_path) and os.path.exists(vectors_path):
+            meta = cache_meta(name, database)
+            marker = table_marker(cursor, name)
+            if marker is None or meta.get("marker") != marker:
+                snapshot = table_snapshot(cursor, name)
+                stale = {key: meta.get(key) for key in snapshot} != snapshot
+                if not stale:
+                    save_meta(name, {**snapshot, "marker": marker})
+            else:
+                stale = False
+        if stale:
+            build_cache(cursor, name)
+    elif not os.path.exists(vectors_path):
+        raise FileNotFoundError(f"No embedding cache for '{name}' of {database} in {CACHE_DIR}; build it with a database cursor first")
+    return np.load(ids_path), np.load(vectors_path, mmap_mode="r")
+
+def lookup(ids, wanted):
+    """Row positions of `wanted` ids in the cache (-1 where absent)."""
+    wanted = np.asarray(wanted, dtype=np.int64)
+    if len(ids) == 0:
+        return np.full(len(wanted), -1)
+    pos = np.searchsorted(ids, wanted)
+    pos = np.minimum(pos, len(ids) - 1)
+    return np.where(ids[pos] == wanted, pos, -1)
+
+if __name__ == "__main__":
+    import pyodbc # only needed to build the cache; readers work without it
+
+    conn = pyodbc.connect(conn_str)
+    cursor = conn.cursor()
+    for name in TABLES:
+        ids, vectors = load_cache(name, cursor)
+        print(f"{name}: {vectors.shape[0]} x {vectors.shape[1]} float32 ({vectors.nbytes / 1e6:.1f} MB)")
+    conn.close()
@@ -0,0 +1,87 @@
+import numpy as np
+
+# --- Configuration ---
+BLOCK_ROWS = 16384 # matrix rows per matmul block; bounds the (block x queries) distance buffer
+# ---------------------
+# Exact cosine k-NN over an embedding_cache matrix, used as recall ground truth
+# instead of ORDER BY VECTOR_DISTANCE(...) full scans on the server. `ids` and
+# `vectors` are the row-aligned pair returned by embedding_cache.load_cache;
+# ids are sorted, so ordering ties by row position matches the SQL tie-breaker
+# ORDER BY distance, id.
+
+def as_queries(queries):
+    q = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    norms = np.linalg.norm(q, axis=1, keepdims=True)
+    return q / np.where(norms == 0, 1, norms)
+
+def search(vectors, queries, k, combine=None, block_rows=BLOCK_ROWS):
+    """
+    Exact cosine top-k for a batch of queries.
+    Scans `vectors` in blocks with one matmul per block and keeps a running
+    top-k per query with argpartition. With combine="min" the queries are
+    targets of a single multi-target search ranked by LEAST(distance_i).
+    Returns (positions, distances), each (n_results, k), sorted by (distance, position).
+    """
+    q = as_queries(queries)
+    n_out = 1 if combine == "min" else len(q)
+    k = min(k, len(vectors))
+    best_d = np.full((n_out, 0), np.inf, dtype=np.float32)
+    best_p = np.empty((n_out, 0), dtype=np.int64)
+
+    for start in range(0, len(vectors), block_rows):
+        block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+        norms = np.linalg.norm(block, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dist = 1.0 - (block @ q.T) / norms[:, None]
+        dist[norms == 0] = np.inf
+        if combine == "min":
+            dist = dist.min(axis=1, keepdims=True)
+
+        cand_d = np.concatenate([best_d, dist.T], axis=1)
+        cand_p = np.concatenate([best_p, np.broadcast_to(np.arange(start, start + len(block)), (n_out, len(block)))], axis=1)
+        if cand_d.shape[1] > k:
+            keep = np.argpartition(cand_d, k - 1, axis=1)[:, :k]
+            cand_d = np.take_along_axis(cand_d, keep, axis=1)
+            cand_p = np.take_along_axis(cand_p, keep, axis=1)
+        best_d, best_p = cand_d, cand_p
+
+    for i in range(n_out):
+        order = np.lexsort((best_p[i], best_d[i]))
+        best_d[i], best_p[i] = best_d[i][order], best_p[i][order]
+    return best_p, best_d
+
+def knn(ids, vectors, query, k):
+    """Plain k-NN (Q1 / NQ11 / NQ13): ids of the k nearest rows."""
+    pos, _ = search(vectors, query, k)
+    return ids[pos[0]].tolist()
+
+def knn_batch(ids, vectors, queries, k):
+    """k-NN for many queries in one scan: list of id lists."""
+    pos, _ = search(vectors, queries, k)
+    return [ids[p].tolist() for p in pos]
+
+def multi_target(ids, vectors, queries, k):
+    """NQ16: k rows with the smallest LEAST(distance to each query)."""
+    pos, _ = search(vectors, queries, k, combine="min")
+    return ids[pos[0]].tolist()
+
+def exclude_ranked(ranking, exclude_ranking, k, exclude_k=None):
+    """
+    NQ18 from two plain rankings: the first k of `ranking` that are not in the
+    first `exclude_k` (default k) of `exclude_ranking`. Needs ranking depth
+    k + exclude_k, since at most exclude_k entries can be removed.
+    """
+    exclude_k = k if exclude_k is None else exclude_k
+    excluded = set(exclude_ranking[:exclude_k])
+    return [x for x in ranking[:k + exclude_k] if x not in excluded][:k]
+
+def exclusion(ids, vectors, query, exclude_query, k, exclude_k=None):
+    """NQ18: k nearest to `query` that are not among the `exclude_k` (default k) nearest to `exclude_query`."""
+    exclude_k = k if exclude_k is None else exclude_k
+    pos, _ = search(vectors, [query, exclude_query], k + exclude_k)
+    return exclude_ranked(ids[pos[0]].tolist(), ids[pos[1]].tolist(), k, exclude_k)
+
+def rank_window(ids, vectors, query, start, stop):
+    """IQ1: ids at ranks [start, stop) (0-based), i.e. OFFSET start ROWS FETCH NEXT stop - start ROWS."""
+    pos, _ = search(vectors, query, stop)
+    return ids[pos[0][start:stop]].tolist()
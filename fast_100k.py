@@ -2,23 +2,45 @@ import pyodbc
 import pandas as pd
 import json
 import time
+from itertools import repeat
+
+from fast_load import NUMBERING_TABLE, STAGING_TABLES, numbered, number_staging, read_staging
 
 # --- Configuration ---
 YOUR_SERVER_NAME = "localhost" 
 DB_NAME = "index_hybench_100k" # <-- NEW DATABASE
 DRIVER = "{ODBC Driver 17 for SQL Server}"
 ROWS_TO_LOAD = 100000 # <-- NEW LIMIT
+LOAD_MODE = "stream" # "stream" = server-side limit + chunked cursor reads, "full" = read whole staging tables into pandas
+CHUNK_SIZE = 10000 # rows per fetchmany / executemany round trip in stream mode
+PREP_MODE = "columnar" # "columnar" = whole-column null defaulting, "rows" = per-row iterrows loop
 # ---------------------
 
 conn_str = f"DRIVER={DRIVER};SERVER={YOUR_SERVER_NAME};DATABASE={DB_NAME};Trusted_Connection=yes;"
 
-def process_page_table(conn):
-    print("\n--- Processing Page Table (100k) ---")
-    df_page = pd.read_sql(f"SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) as rn FROM dbo.stage_page", conn).head(ROWS_TO_LOAD)
-    df_extra = pd.read_sql(f"SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) as rn FROM dbo.stage_page_extra", conn).head(ROWS_TO_LOAD)
-    df_emb = pd.read_sql(f"SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) as rn FROM dbo.stage_page_embedding", conn).head(ROWS_TO_LOAD)
-    df = df_page.merge(df_extra, on="rn").merge(df_emb, on="rn")
-    print(f"Preparing {len(df)} rows for high-speed insert...")
+PAGE_INSERT = "INSERT INTO dbo.page VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+TEXT_INSERT = "INSERT INTO dbo.text VALUES (?, ?, ?, ?)"
+REVISION_INSERT = "INSERT INTO dbo.revision VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+def page_stream_sql(limit):
+    return (
+        f"SELECT p.*, x.*, e.* FROM {numbered('dbo.stage_page')} p "
+        f"JOIN {numbered('dbo.stage_page_extra')} x ON x.rn = p.rn "
+        f"JOIN {numbered('dbo.stage_page_embedding')} e ON e.rn = p.rn "
+        f"WHERE p.rn <= {int(limit)} ORDER BY p.rn"
+    )
+
+def text_stream_sql(limit):
+    return (
+        f"SELECT s.*, e.* FROM {numbered('dbo.stage_text')} s "
+        f"JOIN {numbered('dbo.stage_text_embedding')} e ON e.rn = s.rn "
+        f"WHERE s.rn <= {int(limit)} ORDER BY s.rn"
+    )
+
+def revision_stream_sql(limit):
+    return f"SELECT r.* FROM {numbered('dbo.stage_revision')} r WHERE r.rn <= {int(limit)} ORDER BY r.rn"
+
+def prepare_page_rows(df):
     data_to_insert = []
     for _, row in df.iterrows():
         page_title = row['page_title'] if pd.notna(row['page_title']) else ''
@@ -28,38 +50,18 @@ def process_page_table(conn):
             int(row['page_id']), page_title, 0, 0, page_touched,
             page_touched, None, page_len, row['embedding_json']
         ))
-    sql_insert = "INSERT INTO dbo.page VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
-    cursor = conn.cursor()
-    cursor.fast_executemany = True
-    start_time = time.time()
-    cursor.executemany(sql_insert, data_to_insert)
-    conn.commit()
-    print(f"--- Page table complete in {time.time() - start_time:.2f} seconds ---")
+    return data_to_insert
 
-def process_text_table(conn):
-    print("\n--- Processing Text Table (100k) ---")
-    df_text = pd.read_sql(f"SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) as rn FROM dbo.stage_text", conn).head(ROWS_TO_LOAD)
-    df_emb = pd.read_sql(f"SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) as rn FROM dbo.stage_text_embedding", conn).head(ROWS_TO_LOAD)
-    df = df_text.merge(df_emb, on="rn")
-    print(f"Preparing {len(df)} rows for high-speed insert...")
+def prepare_text_rows(df):
     data_to_insert = []
     for _, row in df.iterrows():
         text_content = row['old_text'] if pd.notna(row['old_text']) else ''
         data_to_insert.append((int(row['old_id']), text_content, 'utf-8', row['embedding_json']))
-    sql_insert = "INSERT INTO dbo.text VALUES (?, ?, ?, ?)"
-    cursor = conn.cursor()
-    cursor.fast_executemany = True
-    start_time = time.time()
-    cursor.executemany(sql_insert, data_to_insert)
-    conn.commit()
-    print(f"--- Text table complete in {time.time() - start_time:.2f} seconds ---")
+    return data_to_insert
 
-def process_revision_table(conn):
-    print("\n--- Processing Revision Table (100k) ---")
-    df_rev = pd.read_sql(f"SELECT * FROM dbo.stage_revision", conn).head(ROWS_TO_LOAD)
-    print(f"Preparing {len(df_rev)} rows for high-speed insert...")
+def prepare_revision_rows(df):
     data_to_insert = []
-    for _, row in df_rev.iterrows():
+    for _, row in df.iterrows():
         rev_timestamp = row['rev_timestamp'] if pd.notna(row['rev_timestamp']) else None
         rev_minor_edit = int(row['rev_minor_edit']) if pd.notna(row['rev_minor_edit']) else 0
         rev_actor = row['rev_actor'] if pd.notna(row['rev_actor']) else None
@@ -67,23 +69,150 @@ def process_revision_table(conn):
             int(row['rev_id']), int(row['rev_page_id']), int(row['rev_id']),
             rev_timestamp, rev_minor_edit, rev_actor, None
         ))
-    sql_insert = "INSERT INTO dbo.revision VALUES (?, ?, ?, ?, ?, ?, ?)"
+    return data_to_insert
+
+def nullable(col):
+    """Column as Python objects with NaN/NaT replaced by None (what pyodbc binds as NULL)."""
+    return col.astype(object).where(col.notna(), None).tolist()
+
+def prepare_page_columns(df):
+    """Same output as prepare_page_rows, built with whole-column operations."""
+    n = len(df)
+    page_touched = nullable(df['page_touched'])
+    return list(zip(
+        df['page_id'].astype('int64').tolist(),
+        df['page_title'].fillna('').tolist(),
+        repeat(0, n), repeat(0, n),
+        page_touched, page_touched,
+        repeat(None, n),
+        df['page_len'].fillna(0).astype('int64').tolist(),
+        df['embedding_json'].tolist(),
+    ))
+
+def prepare_text_columns(df):
+    """Same output as prepare_text_rows, built with whole-column operations."""
+    return list(zip(
+        df['old_id'].astype('int64').tolist(),
+        df['old_text'].fillna('').tolist(),
+        repeat('utf-8', len(df)),
+        df['embedding_json'].tolist(),
+    ))
+
+def prepare_revision_columns(df):
+    """Same output as prepare_revision_rows, built with whole-column operations."""
+    n = len(df)
+    rev_id = df['rev_id'].astype('int64').tolist()
+    return list(zip(
+        rev_id,
+        df['rev_page_id'].astype('int64').tolist(),
+        rev_id,
+        nullable(df['rev_timestamp']),
+        df['rev_minor_edit'].fillna(0).astype('int64').tolist(),
+        nullable(df['rev_actor']),
+        repeat(None, n),
+    ))
+
+PREPARERS = {
+    "columnar": {"page": prepare_page_columns, "text": prepare_text_columns, "revision": prepare_revision_columns},
+    "rows": {"page": prepare_page_rows, "text": prepare_text_rows, "revision": prepare_revision_rows},
+}
+
+def read_chunks(sql):
+    """
+    Yields the result of `sql` as DataFrames of at most CHUNK_SIZE rows.
+    Uses its own connection so the caller can insert on the main one while
+    the result set is still open; only one chunk is ever held in memory.
+    """
+    read_conn = pyodbc.connect(conn_str)
+    try:
+        cursor = read_conn.cursor()
+        cursor.execute(sql)
+        columns = [col[0] for col in cursor.description]
+        while True:
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            df = pd.DataFrame.from_records([tuple(r) for r in rows], columns=columns)
+            # The joins bring one rn column per staging table; keep the first
+            yield df.loc[:, ~df.columns.duplicated()]
+    finally:
+        read_conn.close()
+
+def insert_rows(conn, sql_insert, data_to_insert):
     cursor = conn.cursor()
     cursor.fast_executemany = True
-    start_time = time.time()
     cursor.executemany(sql_insert, data_to_insert)
     conn.commit()
-    print(f"--- Revision table complete in {time.time() - start_time:.2f} seconds ---")
+
+def load_frames(conn, frames, table, sql_insert):
+    """
+    Prepares and inserts each DataFrame in turn.
+    Returns (rows loaded, prep seconds, insert seconds).
+    """
+    prepare = PREPARERS[PREP_MODE][table]
+    loaded, prep_s, insert_s = 0, 0.0, 0.0
+    for df in frames:
+        t0 = time.perf_counter()
+        data_to_insert = prepare(df)
+        t1 = time.perf_counter()
+        insert_rows(conn, sql_insert, data_to_insert)
+        t2 = time.perf_counter()
+        prep_s += t1 - t0
+        insert_s += t2 - t1
+        loaded += len(df)
+        if LOAD_MODE == "stream":
+            print(f"  ... {loaded} rows", flush=True)
+    return loaded, prep_s, insert_s
+
+def report(name, loaded, prep_s, insert_s, start_time):
+    print(f"--- {name} table complete ({loaded} rows) in {time.time() - start_time:.2f} seconds "
+          f"(prep [{PREP_MODE}] {prep_s:.2f}s, insert {insert_s:.2f}s) ---")
+
+def process_page_table(conn):
+    print("\n--- Processing Page Table (100k) ---")
+    start_time = time.time()
+    if LOAD_MODE == "stream":
+        frames = read_chunks(page_stream_sql(ROWS_TO_LOAD))
+    else:
+        df_page = read_staging(conn, "dbo.stage_page", ROWS_TO_LOAD)
+        df_extra = read_staging(conn, "dbo.stage_page_extra", ROWS_TO_LOAD)
+        df_emb = read_staging(conn, "dbo.stage_page_embedding", ROWS_TO_LOAD)
+        df = df_page.merge(df_extra, on="rn").merge(df_emb, on="rn")
+        print(f"Preparing {len(df)} rows for high-speed insert...")
+        frames = [df]
+    report("Page", *load_frames(conn, frames, "page", PAGE_INSERT), start_time)
+
+def process_text_table(conn):
+    print("\n--- Processing Text Table (100k) ---")
+    start_time = time.time()
+    if LOAD_MODE == "stream":
+        frames = read_chunks(text_stream_sql(ROWS_TO_LOAD))
+    else:
+        df_text = read_staging(conn, "dbo.stage_text", ROWS_TO_LOAD)
+        df_emb = read_staging(conn, "dbo.stage_text_embedding", ROWS_TO_LOAD)
+        df = df_text.merge(df_emb, on="rn")
+        print(f"Preparing {len(df)} rows for high-speed insert...")
+        frames = [df]
+    report("Text", *load_frames(conn, frames, "text", TEXT_INSERT), start_time)
+
+def process_revision_table(conn):
+    print("\n--- Processing Revision Table (100k) ---")
+    start_time = time.time()
+    if LOAD_MODE == "stream":
+        frames = read_chunks(revision_stream_sql(ROWS_TO_LOAD))
+    else:
+        df_rev = pd.read_sql(f"SELECT * FROM dbo.stage_revision", conn).head(ROWS_TO_LOAD)
+        print(f"Preparing {len(df_rev)} rows for high-speed insert...")
+        frames = [df_rev]
+    report("Revision", *load_frames(conn, frames, "revision", REVISION_INSERT), start_time)
 
 def cleanup(conn):
     print("\n--- Cleaning up all staging tables ---")
     cursor = conn.cursor()
-    cursor.execute("DROP TABLE dbo.stage_page;")
-    cursor.execute("DROP TABLE dbo.stage_page_extra;")
-    cursor.execute("DROP TABLE dbo.stage_page_embedding;")
-    cursor.execute("DROP TABLE dbo.stage_text;")
-    cursor.execute("DROP TABLE dbo.stage_text_embedding;")
-    cursor.execute("DROP TABLE dbo.stage_revision;")
+    for table in STAGING_TABLES:
+        cursor.execute(f"DROP TABLE {table};")
+        cursor.execute(f"DROP TABLE IF EXISTS {numbered(table)};")
+    cursor.execute(f"DROP TABLE IF EXISTS {NUMBERING_TABLE};")
     conn.commit()
     print("Cleanup complete.")
 
@@ -91,6 +220,9 @@ if __name__ == "__main__":
     try:
         conn = pyodbc.connect(conn_str)
         print(f"Successfully connected to {YOUR_SERVER_NAME} -> {DB_NAME}")
+        if LOAD_MODE == "stream":
+            # Stream reads range-scan fast_load's one-time numbered copies of the staging tables
+            number_staging(conn, ROWS_TO_LOAD)
         process_page_table(conn)
         process_text_table(conn)
         process_revision_table(conn)
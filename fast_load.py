@@ -2,23 +2,116 @@ import pyodbc
 import pandas as pd
 import json
 import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 
 # --- Configuration ---
 YOUR_SERVER_NAME = "localhost" 
 DB_NAME = "index_hybench" # <-- NEW DATABASE
 DRIVER = "{ODBC Driver 17 for SQL Server}"
 ROWS_TO_LOAD = 150000 # <-- NEW LIMIT
+LOAD_MODE = "stream" # "stream" = server-side limit + chunked cursor reads, "full" = read whole staging tables into pandas
+CHUNK_SIZE = 10000 # rows per fetchmany / executemany round trip in stream mode
+PREP_MODE = "columnar" # "columnar" = whole-column null defaulting, "rows" = per-row iterrows loop
+PARALLEL = False # True = load the tables concurrently on pooled connections (always streams)
+WORKERS = 3 # pooled connections / worker threads in parallel mode
+PARTITIONS = {"page": 1, "text": 2, "revision": 1} # row-range partitions per table in parallel mode
+LOAD_ENGINE = "client" # "client" = pull rows into Python, "server" = INSERT ... SELECT on the server, "benchmark" = time both
+SERVER_BATCH_SIZE = 50000 # rows per INSERT ... SELECT batch in the server engine
+MINIMAL_LOGGING = True # switch FULL recovery to BULK_LOGGED for the server engine so TABLOCK inserts are minimally logged
+BENCHMARK_FILE = "load_benchmark.csv"
 # ---------------------
 
 conn_str = f"DRIVER={DRIVER};SERVER={YOUR_SERVER_NAME};DATABASE={DB_NAME};Trusted_Connection=yes;"
 
-def process_page_table(conn):
-    print("\n--- Processing Page Table ---")
-    df_page = pd.read_sql(f"SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) as rn FROM dbo.stage_page", conn).head(ROWS_TO_LOAD)
-    df_extra = pd.read_sql(f"SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) as rn FROM dbo.stage_page_extra", conn).head(ROWS_TO_LOAD)
-    df_emb = pd.read_sql(f"SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) as rn FROM dbo.stage_page_embedding", conn).head(ROWS_TO_LOAD)
-    df = df_page.merge(df_extra, on="rn").merge(df_emb, on="rn")
-    print(f"Preparing {len(df)} rows for high-speed insert...")
+PAGE_INSERT = "INSERT INTO dbo.page VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+TEXT_INSERT = "INSERT INTO dbo.text VALUES (?, ?, ?, ?)"
+REVISION_INSERT = "INSERT INTO dbo.revision VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+STAGING_TABLES = ["dbo.stage_page", "dbo.stage_page_extra", "dbo.stage_page_embedding",
+                  "dbo.stage_text", "dbo.stage_text_embedding", "dbo.stage_revision"]
+
+def numbered(table):
+    """Copy of the staging table with the synthetic row number used to line up the page/text side tables (number_staging)."""
+    return f"{table}_rn"
+
+NUMBERING_TABLE = "dbo.stage_numbering" # staging signature each <table>_rn copy was made from
+
+def numbering_needed():
+    """True when this run's loaders range-scan the numbered copies (all but the client "full" read)."""
+    return LOAD_ENGINE != "client" or LOAD_MODE == "stream" or PARALLEL
+
+def staging_signature(cursor, table):
+    """(rows, checksum) of a staging table; any reload with different contents changes it."""
+    return tuple(cursor.execute(f"SELECT COUNT_BIG(*), CHECKSUM_AGG(BINARY_CHECKSUM(*)) FROM {table}").fetchone())
+
+def number_staging(conn, rows=None):
+    """
+    Numbers the first `rows` (default ROWS_TO_LOAD) rows of every staging
+    table once into <table>_rn, clustered on rn. Stream queries, partitions
+    and increments then range-scan that fixed numbering instead of re-running
+    ROW_NUMBER() OVER (ORDER BY (SELECT NULL)), whose order no query
+    guarantees. A copy is kept while its staging table's row count and
+    checksum match the ones it was made from (NUMBERING_TABLE) and it holds
+    enough rows, so this runs once per staging snapshot.
+    """
+    rows = ROWS_TO_LOAD if rows is None else rows
+    cursor = conn.cursor()
+    cursor.execute(f"IF OBJECT_ID('{NUMBERING_TABLE}', 'U') IS NULL "
+                   f"CREATE TABLE {NUMBERING_TABLE} (table_name SYSNAME PRIMARY KEY, source_rows BIGINT, "
+                   "source_checksum INT, numbered_rows BIGINT)")
+    conn.commit()
+    for table in STAGING_TABLES:
+        target = numbered(table)
+        staged, checksum = staging_signature(cursor, table)
+        wanted = min(rows, staged)
+        made = cursor.execute(f"SELECT source_rows, source_checksum, numbered_rows FROM {NUMBERING_TABLE} WHERE table_name = ?",
+                              table).fetchone()
+        exists = cursor.execute("SELECT OBJECT_ID(?, 'U')", target).fetchone()[0] is not None
+        if exists and made and (made[0], made[1]) == (staged, checksum) and made[2] >= wanted:
+            continue
+        print(f"Numbering {wanted} of {staged} rows of {table} into {target}...")
+        cursor.execute(f"DROP TABLE IF EXISTS {target}")
+        # One serial scan assigns every rn; nothing re-numbers the rows after this
+        cursor.execute(f"SELECT * INTO {target} FROM (SELECT ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) AS rn, * FROM {table}) s "
+                       f"WHERE rn <= {int(wanted)} OPTION (MAXDOP 1)")
+        cursor.execute(f"ALTER TABLE {target} ALTER COLUMN rn BIGINT NOT NULL")
+        cursor.execute(f"ALTER TABLE {target} ADD PRIMARY KEY CLUSTERED (rn)")
+        cursor.execute(f"DELETE FROM {NUMBERING_TABLE} WHERE table_name = ?", table)
+        cursor.execute(f"INSERT INTO {NUMBERING_TABLE} VALUES (?, ?, ?, ?)", table, staged, checksum, wanted)
+        conn.commit()
+
+def read_staging(conn, table, rows=None):
+    """The first `rows` (default ROWS_TO_LOAD) rows of a staging table as read, numbered 1.. in that order (full mode)."""
+    df = pd.read_sql(f"SELECT * FROM {table}", conn).head(ROWS_TO_LOAD if rows is None else rows)
+    return df.assign(rn=range(1, len(df) + 1))
+
+def page_stream_sql(lo, hi):
+    """Joined page rows with lo < rn <= hi."""
+    return (
+        f"SELECT p.*, x.*, e.* FROM {numbered('dbo.stage_page')} p "
+        f"JOIN {numbered('dbo.stage_page_extra')} x ON x.rn = p.rn "
+        f"JOIN {numbered('dbo.stage_page_embedding')} e ON e.rn = p.rn "
+        f"WHERE p.rn > {int(lo)} AND p.rn <= {int(hi)} ORDER BY p.rn"
+    )
+
+def text_stream_sql(lo, hi):
+    """Joined text rows with lo < rn <= hi."""
+    return (
+        f"SELECT s.*, e.* FROM {numbered('dbo.stage_text')} s "
+        f"JOIN {numbered('dbo.stage_text_embedding')} e ON e.rn = s.rn "
+        f"WHERE s.rn > {int(lo)} AND s.rn <= {int(hi)} ORDER BY s.rn"
+    )
+
+def revision_stream_sql(lo, hi):
+    """Revision rows with lo < rn <= hi."""
+    return (
+        f"SELECT r.* FROM {numbered('dbo.stage_revision')} r "
+        f"WHERE r.rn > {int(lo)} AND r.rn <= {int(hi)} ORDER BY r.rn"
+    )
+
+def prepare_page_rows(df):
     data_to_insert = []
     for _, row in df.iterrows():
         page_title = row['page_title'] if pd.notna(row['page_title']) else ''
@@ -28,38 +121,18 @@ def process_page_table(conn):
             int(row['page_id']), page_title, 0, 0, page_touched,
             page_touched, None, page_len, row['embedding_json']
         ))
-    sql_insert = "INSERT INTO dbo.page VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
-    cursor = conn.cursor()
-    cursor.fast_executemany = True
-    start_time = time.time()
-    cursor.executemany(sql_insert, data_to_insert)
-    conn.commit()
-    print(f"--- Page table complete in {time.time() - start_time:.2f} seconds ---")
+    return data_to_insert
 
-def process_text_table(conn):
-    print("\n--- Processing Text Table ---")
-    df_text = pd.read_sql(f"SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) as rn FROM dbo.stage_text", conn).head(ROWS_TO_LOAD)
-    df_emb = pd.read_sql(f"SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) as rn FROM dbo.stage_text_embedding", conn).head(ROWS_TO_LOAD)
-    df = df_text.merge(df_emb, on="rn")
-    print(f"Preparing {len(df)} rows for high-speed insert...")
+def prepare_text_rows(df):
     data_to_insert = []
     for _, row in df.iterrows():
         text_content = row['old_text'] if pd.notna(row['old_text']) else ''
         data_to_insert.append((int(row['old_id']), text_content, 'utf-8', row['embedding_json']))
-    sql_insert = "INSERT INTO dbo.text VALUES (?, ?, ?, ?)"
-    cursor = conn.cursor()
-    cursor.fast_executemany = True
-    start_time = time.time()
-    cursor.executemany(sql_insert, data_to_insert)
-    conn.commit()
-    print(f"--- Text table complete in {time.time() - start_time:.2f} seconds ---")
+    return data_to_insert
 
-def process_revision_table(conn):
-    print("\n--- Processing Revision Table ---")
-    df_rev = pd.read_sql(f"SELECT * FROM dbo.stage_revision", conn).head(ROWS_TO_LOAD)
-    print(f"Preparing {len(df_rev)} rows for high-speed insert...")
+def prepare_revision_rows(df):
     data_to_insert = []
-    for _, row in df_rev.iterrows():
+    for _, row in df.iterrows():
         rev_timestamp = row['rev_timestamp'] if pd.notna(row['rev_timestamp']) else None
         rev_minor_edit = int(row['rev_minor_edit']) if pd.notna(row['rev_minor_edit']) else 0
         rev_actor = row['rev_actor'] if pd.notna(row['rev_actor']) else None
@@ -67,23 +140,321 @@ def process_revision_table(conn):
             int(row['rev_id']), int(row['rev_page_id']), int(row['rev_id']),
             rev_timestamp, rev_minor_edit, rev_actor, None
         ))
-    sql_insert = "INSERT INTO dbo.revision VALUES (?, ?, ?, ?, ?, ?, ?)"
+    return data_to_insert
+
+def nullable(col):
+    """Column as Python objects with NaN/NaT replaced by None (what pyodbc binds as NULL)."""
+    return col.astype(object).where(col.notna(), None).tolist()
+
+def prepare_page_columns(df):
+    """Same output as prepare_page_rows, built with whole-column operations."""
+    n = len(df)
+    page_touched = nullable(df['page_touched'])
+    return list(zip(
+        df['page_id'].astype('int64').tolist(),
+        df['page_title'].fillna('').tolist(),
+        repeat(0, n), repeat(0, n),
+        page_touched, page_touched,
+        repeat(None, n),
+        df['page_len'].fillna(0).astype('int64').tolist(),
+        df['embedding_json'].tolist(),
+    ))
+
+def prepare_text_columns(df):
+    """Same output as prepare_text_rows, built with whole-column operations."""
+    return list(zip(
+        df['old_id'].astype('int64').tolist(),
+        df['old_text'].fillna('').tolist(),
+        repeat('utf-8', len(df)),
+        df['embedding_json'].tolist(),
+    ))
+
+def prepare_revision_columns(df):
+    """Same output as prepare_revision_rows, built with whole-column operations."""
+    n = len(df)
+    rev_id = df['rev_id'].astype('int64').tolist()
+    return list(zip(
+        rev_id,
+        df['rev_page_id'].astype('int64').tolist(),
+        rev_id,
+        nullable(df['rev_timestamp']),
+        df['rev_minor_edit'].fillna(0).astype('int64').tolist(),
+        nullable(df['rev_actor']),
+        repeat(None, n),
+    ))
+
+PREPARERS = {
+    "columnar": {"page": prepare_page_columns, "text": prepare_text_columns, "revision": prepare_revision_columns},
+    "rows": {"page": prepare_page_rows, "text": prepare_text_rows, "revision": prepare_revision_rows},
+}
+
+def read_chunks(sql):
+    """
+    Yields the result of `sql` as DataFrames of at most CHUNK_SIZE rows.
+    Uses its own connection so the caller can insert on the main one while
+    the result set is still open; only one chunk is ever held in memory.
+    """
+    read_conn = pyodbc.connect(conn_str)
+    try:
+        cursor = read_conn.cursor()
+        cursor.execute(sql)
+        columns = [col[0] for col in cursor.description]
+        while True:
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            df = pd.DataFrame.from_records([tuple(r) for r in rows], columns=columns)
+            # The joins bring one rn column per staging table; keep the first
+            yield df.loc[:, ~df.columns.duplicated()]
+    finally:
+        read_conn.close()
+
+def insert_rows(conn, sql_insert, data_to_insert):
     cursor = conn.cursor()
     cursor.fast_executemany = True
-    start_time = time.time()
     cursor.executemany(sql_insert, data_to_insert)
     conn.commit()
-    print(f"--- Revision table complete in {time.time() - start_time:.2f} seconds ---")
+
+def load_frames(conn, frames, table, sql_insert):
+    """
+    Prepares and inserts each DataFrame in turn.
+    Returns (rows loaded, prep seconds, insert seconds).
+    """
+    prepare = PREPARERS[PREP_MODE][table]
+    loaded, prep_s, insert_s = 0, 0.0, 0.0
+    for df in frames:
+        t0 = time.perf_counter()
+        data_to_insert = prepare(df)
+        t1 = time.perf_counter()
+        insert_rows(conn, sql_insert, data_to_insert)
+        t2 = time.perf_counter()
+        prep_s += t1 - t0
+        insert_s += t2 - t1
+        loaded += len(df)
+        if LOAD_MODE == "stream":
+            print(f"  ... {loaded} rows", flush=True)
+    return loaded, prep_s, insert_s
+
+def report(name, loaded, prep_s, insert_s, start_time):
+    print(f"--- {name} table complete ({loaded} rows) in {time.time() - start_time:.2f} seconds "
+          f"(prep [{PREP_MODE}] {prep_s:.2f}s, insert {insert_s:.2f}s) ---")
+
+def process_page_table(conn):
+    print("\n--- Processing Page Table ---")
+    start_time = time.time()
+    if LOAD_MODE == "stream":
+        frames = read_chunks(page_stream_sql(0, ROWS_TO_LOAD))
+    else:
+        df_page = read_staging(conn, "dbo.stage_page")
+        df_extra = read_staging(conn, "dbo.stage_page_extra")
+        df_emb = read_staging(conn, "dbo.stage_page_embedding")
+        df = df_page.merge(df_extra, on="rn").merge(df_emb, on="rn")
+        print(f"Preparing {len(df)} rows for high-speed insert...")
+        frames = [df]
+    report("Page", *load_frames(conn, frames, "page", PAGE_INSERT), start_time)
+
+def process_text_table(conn):
+    print("\n--- Processing Text Table ---")
+    start_time = time.time()
+    if LOAD_MODE == "stream":
+        frames = read_chunks(text_stream_sql(0, ROWS_TO_LOAD))
+    else:
+        df_text = read_staging(conn, "dbo.stage_text")
+        df_emb = read_staging(conn, "dbo.stage_text_embedding")
+        df = df_text.merge(df_emb, on="rn")
+        print(f"Preparing {len(df)} rows for high-speed insert...")
+        frames = [df]
+    report("Text", *load_frames(conn, frames, "text", TEXT_INSERT), start_time)
+
+def process_revision_table(conn):
+    print("\n--- Processing Revision Table ---")
+    start_time = time.time()
+    if LOAD_MODE == "stream":
+        frames = read_chunks(revision_stream_sql(0, ROWS_TO_LOAD))
+    else:
+        df_rev = pd.read_sql(f"SELECT * FROM dbo.stage_revision", conn).head(ROWS_TO_LOAD)
+        print(f"Preparing {len(df_rev)} rows for high-speed insert...")
+        frames = [df_rev]
+    report("Revision", *load_frames(conn, frames, "revision", REVISION_INSERT), start_time)
+
+TABLES = {
+    "page": (page_stream_sql, PAGE_INSERT),
+    "text": (text_stream_sql, TEXT_INSERT),
+    "revision": (revision_stream_sql, REVISION_INSERT),
+}
+
+def partition_bounds(parts):
+    """Splits (0, ROWS_TO_LOAD] into `parts` contiguous rn ranges."""
+    step = -(-ROWS_TO_LOAD // parts)
+    return [(lo, min(lo + step, ROWS_TO_LOAD)) for lo in range(0, ROWS_TO_LOAD, step)]
+
+def load_partition(pool, table, lo, hi):
+    stream_sql, sql_insert = TABLES[table]
+    conn = pool.get()
+    try:
+        start = time.perf_counter()
+        loaded, prep_s, insert_s = load_frames(conn, read_chunks(stream_sql(lo, hi)), table, sql_insert)
+        end = time.perf_counter()
+    finally:
+        pool.put(conn)
+    print(f"  [{table} rn {lo + 1}-{hi}] {loaded} rows in {end - start:.2f}s "
+          f"(prep {prep_s:.2f}s, insert {insert_s:.2f}s)", flush=True)
+    return table, loaded, start, end
+
+def parallel_load():
+    """
+    Loads every table (and every row-range partition of it) as a separate task
+    on a pool of WORKERS connections. Raises if any task fails.
+    """
+    tasks = [(table, lo, hi) for table in TABLES for lo, hi in partition_bounds(PARTITIONS.get(table, 1))]
+    print(f"\n--- Parallel load: {len(tasks)} tasks on {WORKERS} pooled connections ---")
+    pool = queue.Queue()
+    for _ in range(WORKERS):
+        pool.put(pyodbc.connect(conn_str))
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+            futures = [executor.submit(load_partition, pool, *task) for task in tasks]
+            results = [f.result() for f in futures]
+        wall = time.perf_counter() - start
+    finally:
+        while not pool.empty():
+            pool.get().close()
+
+    for table in TABLES:
+        parts = [r for r in results if r[0] == table]
+        rows = sum(r[1] for r in parts)
+        span = max(r[3] for r in parts) - min(r[2] for r in parts)
+        print(f"--- {table}: {rows} rows in {span:.2f}s ({rows / span if span else 0:,.0f} rows/sec) ---")
+    total = sum(r[1] for r in results)
+    print(f"--- Aggregate: {total} rows in {wall:.2f}s ({total / wall if wall else 0:,.0f} rows/sec) ---")
+
+# --- Server-side engine ---
+# Same join, null defaulting and row limit as the client path, but the rows
+# never leave SQL Server. Unqualified columns resolve to whichever staging
+# table holds them; only rn needs a qualifier.
+SERVER_SOURCES = {
+    "page": (
+        "SELECT p.rn, page_id, page_title, page_touched, page_len, embedding_json INTO #page_src "
+        f"FROM {numbered('dbo.stage_page')} p "
+        f"JOIN {numbered('dbo.stage_page_extra')} x ON x.rn = p.rn "
+        f"JOIN {numbered('dbo.stage_page_embedding')} e ON e.rn = p.rn "
+        "WHERE p.rn <= %d",
+        "INSERT INTO dbo.page WITH (TABLOCK) "
+        "SELECT page_id, ISNULL(page_title, ''), 0, 0, page_touched, page_touched, NULL, ISNULL(page_len, 0), embedding_json "
+        "FROM #page_src WHERE rn > ? AND rn <= ?",
+    ),
+    "text": (
+        "SELECT s.rn, old_id, old_text, embedding_json INTO #text_src "
+        f"FROM {numbered('dbo.stage_text')} s "
+        f"JOIN {numbered('dbo.stage_text_embedding')} e ON e.rn = s.rn "
+        "WHERE s.rn <= %d",
+        "INSERT INTO dbo.text WITH (TABLOCK) "
+        "SELECT old_id, ISNULL(old_text, ''), 'utf-8', embedding_json "
+        "FROM #text_src WHERE rn > ? AND rn <= ?",
+    ),
+    "revision": (
+        "SELECT r.rn, rev_id, rev_page_id, rev_timestamp, rev_minor_edit, rev_actor INTO #revision_src "
+        f"FROM {numbered('dbo.stage_revision')} r "
+        "WHERE r.rn <= %d",
+        "INSERT INTO dbo.revision WITH (TABLOCK) "
+        "SELECT rev_id, rev_page_id, rev_id, rev_timestamp, ISNULL(rev_minor_edit, 0), rev_actor, NULL "
+        "FROM #revision_src WHERE rn > ? AND rn <= ?",
+    ),
+}
+
+def recovery_model(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT recovery_model_desc FROM sys.databases WHERE name = ?", DB_NAME)
+    return cursor.fetchone()[0]
+
+def set_recovery_model(conn, model):
+    conn.commit()
+    conn.autocommit = True
+    try:
+        conn.cursor().execute(f"ALTER DATABASE [{DB_NAME}] SET RECOVERY {model};")
+    finally:
+        conn.autocommit = False
+
+def server_load_table(conn, table):
+    """
+    Joins the numbered staging rows once into a temp table (SELECT INTO is
+    minimally logged), then moves them into the target in SERVER_BATCH_SIZE rn ranges.
+    """
+    select_into, insert_batch = SERVER_SOURCES[table]
+    print(f"\n--- Processing {table.capitalize()} Table (server-side) ---")
+    start_time = time.time()
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS #{table}_src;")
+    # Not parameterized: a #table created inside sp_executesql would be dropped
+    # as soon as that statement finished.
+    cursor.execute(select_into % int(ROWS_TO_LOAD))
+    staged = cursor.rowcount
+    cursor.execute(f"CREATE UNIQUE CLUSTERED INDEX ix_rn ON #{table}_src (rn);")
+    conn.commit()
+    loaded = 0
+    for lo in range(0, ROWS_TO_LOAD, SERVER_BATCH_SIZE):
+        cursor.execute(insert_batch, lo, lo + SERVER_BATCH_SIZE)
+        conn.commit()
+        loaded += cursor.rowcount
+        print(f"  ... {loaded} rows", flush=True)
+    cursor.execute(f"DROP TABLE #{table}_src;")
+    conn.commit()
+    print(f"--- {table.capitalize()} table complete ({loaded} of {staged} staged rows) in {time.time() - start_time:.2f} seconds ---")
+
+def server_load(conn):
+    original = recovery_model(conn)
+    if MINIMAL_LOGGING and original == "FULL":
+        print("Switching to BULK_LOGGED recovery for the load...")
+        set_recovery_model(conn, "BULK_LOGGED")
+    try:
+        for table in SERVER_SOURCES:
+            server_load_table(conn, table)
+    finally:
+        if MINIMAL_LOGGING and original == "FULL":
+            set_recovery_model(conn, "FULL")
+
+def client_load(conn):
+    if PARALLEL:
+        parallel_load()
+    else:
+        process_page_table(conn)
+        process_text_table(conn)
+        process_revision_table(conn)
+
+def benchmark_engines(conn):
+    """
+    Loads the same ROWS_TO_LOAD rows with each engine into empty target tables
+    and writes per-engine timings to BENCHMARK_FILE. Staging tables are kept.
+    """
+    results = []
+    for engine, load in [("client", client_load), ("server", server_load)]:
+        cursor = conn.cursor()
+        for table in TABLES:
+            cursor.execute(f"TRUNCATE TABLE dbo.{table};")
+        conn.commit()
+        print(f"\n=== Benchmarking {engine} engine ===")
+        start = time.perf_counter()
+        load(conn)
+        seconds = time.perf_counter() - start
+        rows = sum(cursor.execute(f"SELECT COUNT_BIG(*) FROM dbo.{table}").fetchone()[0] for table in TABLES)
+        results.append({
+            "Engine": engine,
+            "Rows": rows,
+            "Seconds": round(seconds, 2),
+            "Rows_Per_Sec": round(rows / seconds, 1) if seconds else 0,
+        })
+        print(f"=== {engine}: {rows} rows in {seconds:.2f}s ({rows / seconds if seconds else 0:,.0f} rows/sec) ===")
+    pd.DataFrame(results).to_csv(BENCHMARK_FILE, index=False)
+    print(f"\nBenchmark results saved to {BENCHMARK_FILE}")
 
 def cleanup(conn):
     print("\n--- Cleaning up all staging tables ---")
     cursor = conn.cursor()
-    cursor.execute("DROP TABLE dbo.stage_page;")
-    cursor.execute("DROP TABLE dbo.stage_page_extra;")
-    cursor.execute("DROP TABLE dbo.stage_page_embedding;")
-    cursor.execute("DROP TABLE dbo.stage_text;")
-    cursor.execute("DROP TABLE dbo.stage_text_embedding;")
-    cursor.execute("DROP TABLE dbo.stage_revision;")
+    for table in STAGING_TABLES:
+        cursor.execute(f"DROP TABLE {table};")
+        cursor.execute(f"DROP TABLE IF EXISTS {numbered(table)};")
+    cursor.execute(f"DROP TABLE IF EXISTS {NUMBERING_TABLE};")
     conn.commit()
     print("Cleanup complete.")
 
@@ -91,10 +462,16 @@ if __name__ == "__main__":
     try:
         conn = pyodbc.connect(conn_str)
         print(f"Successfully connected to {YOUR_SERVER_NAME} -> {DB_NAME}")
-        process_page_table(conn)
-        process_text_table(conn)
-        process_revision_table(conn)
-        cleanup(conn)
+        if numbering_needed():
+            number_staging(conn)
+        if LOAD_ENGINE == "benchmark":
+            benchmark_engines(conn)
+        else:
+            if LOAD_ENGINE == "server":
+                server_load(conn)
+            else:
+                client_load(conn)
+            cleanup(conn)
         print("\n--- ALL DATA LOADED SUCCESSFULLY! ---")
         conn.close()
     except Exception as e:
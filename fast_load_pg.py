@@ -0,0 +1,245 @@
+import pyodbc
+import psycopg2
+import numpy as np
+import io
+import json
+import struct
+import time
+from datetime import datetime, date, timezone
+
+import fast_load as source
+import embedding_cache
+
+# --- Configuration ---
+PG_DB = "hybench_pg_200k"
+PG_USER = "postgres"
+PG_PASSWORD = "dbms"
+PG_HOST = "localhost"
+PG_PORT = 5432
+ROWS_TO_LOAD = 200000
+DEFER_INDEXES = True # drop secondary/vector indexes before COPY and rebuild them afterwards
+USE_EMBEDDING_CACHE = True # take embeddings from embedding_cache (by id) instead of re-parsing staging JSON
+# ---------------------
+# Rows are read from the same SQL Server staging tables as fast_load.py
+# (source.conn_str, source.CHUNK_SIZE) and prepared with its columnar path,
+# so the column order matches dbo.page / dbo.text / dbo.revision.
+
+TABLES = {
+    "page": source.page_stream_sql,
+    "text": source.text_stream_sql,
+    "revision": source.revision_stream_sql,
+}
+
+# Position of the id and embedding in the prepared row tuples (see fast_load.prepare_*_columns)
+EMBEDDING_FIELDS = {"page": (0, 8), "text": (0, 3)}
+# Prepared tuples follow the SQL Server column order and are COPYed by position;
+# these named columns must sit at the same positions in the PostgreSQL table
+TUPLE_LAYOUT = {
+    "page": {0: "page_id", 1: "page_title", 7: "page_len", 8: "page_embedding"},
+    "text": {0: "old_id", 1: "old_text", 3: "text_embedding"},
+    "revision": {0: "rev_id", 1: "rev_page", 2: "rev_text_id", 3: "rev_timestamp", 4: "rev_minor_edit"},
+}
+
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_TRAILER = struct.pack("!h", -1)
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+PG_EPOCH_DATE = date(2000, 1, 1)
+
+def connect_pg():
+    return psycopg2.connect(dbname=PG_DB, user=PG_USER, password=PG_PASSWORD, host=PG_HOST, port=PG_PORT)
+
+def table_columns(cur, table):
+    """[(column name, type name)] in table order."""
+    cur.execute("""
+        SELECT a.attname, t.typname
+        FROM pg_attribute a JOIN pg_type t ON t.oid = a.atttypid
+        WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+        ORDER BY a.attnum
+    """, (table,))
+    return cur.fetchall()
+
+def to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return datetime.strptime(text, "%Y%m%d%H%M%S") # MediaWiki-style timestamps
+
+def encode_vector(value):
+    """pgvector binary format: int16 dim, int16 unused, dim x float4 (big-endian)."""
+    if isinstance(value, str):
+        value = json.loads(value)
+    vec = np.asarray(value, dtype=">f4")
+    return struct.pack("!hh", len(vec), 0) + vec.tobytes()
+
+def encode_value(value, typname):
+    """Binary COPY representation of one non-NULL value for a column of type `typname`."""
+    if typname == "int2":
+        return struct.pack("!h", int(value))
+    if typname == "int4":
+        return struct.pack("!i", int(value))
+    if typname == "int8":
+        return struct.pack("!q", int(value))
+    if typname == "float4":
+        return struct.pack("!f", float(value))
+    if typname == "float8":
+        return struct.pack("!d", float(value))
+    if typname == "bool":
+        return b"\x01" if value else b"\x00"
+    if typname in ("text", "varchar", "bpchar", "name"):
+        return str(value).encode("utf-8")
+    if typname == "bytea":
+        return bytes(value)
+    if typname == "vector":
+        return encode_vector(value)
+    if typname in ("timestamp", "timestamptz"):
+        ts = to_datetime(value)
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        delta = ts - PG_EPOCH
+        return struct.pack("!q", (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+    if typname == "date":
+        return struct.pack("!i", (to_datetime(value).date() - PG_EPOCH_DATE).days)
+    raise TypeError(f"No binary COPY encoder for column type '{typname}'")
+
+def check_layout(table, columns):
+    """Raises unless the PostgreSQL columns line up with the prepared tuples of `table` (TUPLE_LAYOUT)."""
+    names = [name for name, _ in columns]
+    wrong = {i: name for i, name in TUPLE_LAYOUT[table].items() if i >= len(names) or names[i] != name}
+    if wrong:
+        raise ValueError(f"{table}: PostgreSQL columns {names} do not match the prepared tuple layout "
+                         f"(expected {', '.join(f'{n} at {i}' for i, n in wrong.items())})")
+
+def encode_rows(rows, typnames):
+    """One binary COPY payload (header, tuples, trailer) for a chunk of rows."""
+    buf = bytearray(COPY_HEADER)
+    field_count = struct.pack("!h", len(typnames))
+    for row in rows:
+        if len(row) != len(typnames):
+            raise ValueError(f"Row has {len(row)} fields, the COPY target {len(typnames)}: {row[:3]}...")
+        buf += field_count
+        for value, typname in zip(row, typnames):
+            if value is None:
+                buf += b"\xff\xff\xff\xff"
+            else:
+                data = encode_value(value, typname)
+                buf += struct.pack("!i", len(data))
+                buf += data
+    buf += COPY_TRAILER
+    return bytes(buf)
+
+def copy_chunk(cur, table, columns, rows):
+    names = ", ".join(name for name, _ in columns)
+    payload = encode_rows(rows, [typname for _, typname in columns])
+    cur.copy_expert(f"COPY {table} ({names}) FROM STDIN WITH (FORMAT binary)", io.BytesIO(payload))
+
+def secondary_indexes(cur, table):
+    """(name, CREATE INDEX statement) for indexes that do not back a constraint."""
+    cur.execute("""
+        SELECT i.indexname, i.indexdef
+        FROM pg_indexes i
+        WHERE i.schemaname = current_schema() AND i.tablename = %s
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_constraint c
+              WHERE c.conindid = format('%%I.%%I', i.schemaname, i.indexname)::regclass
+          )
+    """, (table,))
+    return cur.fetchall()
+
+def open_embedding_cache(table):
+    """(ids, vectors) from embedding_cache for tables that carry an embedding, else None."""
+    if not USE_EMBEDDING_CACHE or table not in EMBEDDING_FIELDS:
+        return None
+    # Ids only identify rows within one database, so the cache is the one of source.DB_NAME,
+    # built or revalidated against it here
+    try:
+        conn = pyodbc.connect(source.conn_str)
+        try:
+            return embedding_cache.load_cache(table, conn.cursor())
+        finally:
+            conn.close()
+    except (pyodbc.Error, RuntimeError) as e:
+        print(f"Embedding cache for {table} unavailable ({e}); parsing staging JSON instead.")
+        return None
+
+def with_cached_embeddings(rows, table, cache):
+    """Swaps the JSON embedding of each row for its float32 row in the cache, where present."""
+    id_field, emb_field = EMBEDDING_FIELDS[table]
+    ids, vectors = cache
+    positions = embedding_cache.lookup(ids, [row[id_field] for row in rows])
+    return [
+        row[:emb_field] + (vectors[pos],) + row[emb_field + 1:] if pos >= 0 else row
+        for row, pos in zip(rows, positions)
+    ]
+
+def load_table(conn, table, lo=0, hi=None):
+    """COPYs staging rows lo < rn <= hi (default ROWS_TO_LOAD) of `table`; returns rows loaded."""
+    print(f"\n--- COPY {table} ---")
+    cur = conn.cursor()
+    columns = table_columns(cur, table)
+    check_layout(table, columns)
+    prepare = source.PREPARERS["columnar"][table]
+    cache = open_embedding_cache(table)
+    start_time = time.time()
+    loaded, prep_s, copy_s = 0, 0.0, 0.0
+    for df in source.read_chunks(TABLES[table](lo, ROWS_TO_LOAD if hi is None else hi)):
+        t0 = time.perf_counter()
+        rows = prepare(df)
+        if cache is not None:
+            rows = with_cached_embeddings(rows, table, cache)
+        t1 = time.perf_counter()
+        copy_chunk(cur, table, columns, rows)
+        conn.commit()
+        t2 = time.perf_counter()
+        prep_s += t1 - t0
+        copy_s += t2 - t1
+        loaded += len(rows)
+        print(f"  ... {loaded} rows", flush=True)
+    seconds = time.time() - start_time
+    print(f"--- {table} complete ({loaded} rows) in {seconds:.2f} seconds, {loaded / seconds if seconds else 0:,.0f} rows/sec "
+          f"(prep {prep_s:.2f}s, encode+copy {copy_s:.2f}s) ---")
+    return loaded
+
+if __name__ == "__main__":
+    try:
+        conn = connect_pg()
+        cur = conn.cursor()
+        print(f"Successfully connected to {PG_HOST} -> {PG_DB}")
+        source_conn = pyodbc.connect(source.conn_str)
+        source.number_staging(source_conn, ROWS_TO_LOAD)
+        source_conn.close()
+
+        deferred = []
+        if DEFER_INDEXES:
+            for table in TABLES:
+                for name, ddl in secondary_indexes(cur, table):
+                    print(f"Deferring index {name}")
+                    cur.execute(f'DROP INDEX "{name}"')
+                    deferred.append((name, ddl))
+            conn.commit()
+
+        try:
+            start = time.time()
+            total = sum(load_table(conn, table) for table in TABLES)
+            seconds = time.time() - start
+            print(f"\n--- {total} rows loaded in {seconds:.2f} seconds ({total / seconds if seconds else 0:,.0f} rows/sec) ---")
+        finally:
+            # Rebuild even after a failed load so the schema is never left without its indexes
+            conn.rollback()
+            for name, ddl in deferred:
+                t0 = time.time()
+                cur.execute(ddl)
+                conn.commit()
+                print(f"Rebuilt index {name} in {time.time() - t0:.2f} seconds")
+
+        cur.execute("ANALYZE")
+        conn.commit()
+        print("\n--- ALL DATA LOADED SUCCESSFULLY! ---")
+        conn.close()
+    except Exception as e:
+        print("\n--- AN ERROR OCCURRED ---")
+        print(e)
@@ -0,0 +1,110 @@
+import numpy as np
+import hashlib
+import sqlite3
+from functools import lru_cache
+
+import embedding_cache
+import exact_knn
+
+# --- Configuration ---
+GT_DB = "ground_truth.sqlite"
+# ---------------------
+# Persistent exact rankings keyed by (table, query-vector hash, shape, snapshot).
+# Only the deepest ranking computed so far is kept per key; any smaller K or
+# rank window is a slice of it. Shapes:
+#   "knn"   one query vector, ranked by cosine distance
+#   "least" several target vectors, ranked by LEAST(distance_i)
+# Exclusion (NQ18) and pagination (IQ1) are derived from "knn" rankings.
+# The snapshot is embedding_cache.snapshot_id(table), which changes whenever the
+# cache is rebuilt for a new row count / checksum; it is re-read on every
+# lookup, and entries from any other snapshot of the same table are dropped
+# the first time a snapshot is seen.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ground_truth (
+    tbl TEXT NOT NULL,
+    vec_hash TEXT NOT NULL,
+    shape TEXT NOT NULL,
+    snapshot TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    ids BLOB NOT NULL,
+    distances BLOB NOT NULL,
+    PRIMARY KEY (tbl, vec_hash, shape)
+)
+"""
+
+@lru_cache(maxsize=None)
+def connect():
+    db = sqlite3.connect(GT_DB, check_same_thread=False)
+    db.execute(SCHEMA)
+    return db
+
+@lru_cache(maxsize=None)
+def open_snapshot(name, snapshot):
+    """(ids, mmap vectors) of one snapshot of an embedding_cache table, opened once per process."""
+    return embedding_cache.load_cache(name)
+
+def open_table(name):
+    """(ids, mmap vectors, snapshot) for the cache as it is on disk now (a rebuild mid-run is picked up)."""
+    snapshot = embedding_cache.snapshot_id(name)
+    ids, vectors = open_snapshot(name, snapshot)
+    return ids, vectors, snapshot
+
+def vector_hash(queries):
+    """Hash of the float32 bytes of the query vectors (in order)."""
+    h = hashlib.sha1()
+    for q in queries:
+        h.update(np.asarray(q, dtype=np.float32).tobytes())
+    return h.hexdigest()
+
+CHECKED = {} # table -> snapshot whose stale entries have already been dropped
+
+def invalidate(name, snapshot):
+    if CHECKED.get(name) == snapshot:
+        return
+    CHECKED[name] = snapshot
+    db = connect()
+    deleted = db.execute("DELETE FROM ground_truth WHERE tbl = ? AND snapshot <> ?", (name, snapshot)).rowcount
+    db.commit()
+    if deleted:
+        print(f"Ground-truth cache: dropped {deleted} stale '{name}' entries.")
+
+def get(name, queries, shape, snapshot, depth, rows):
+    """
+    Stored (ids, distances) sliced to `depth`, or None if missing or not deep
+    enough. A ranking of all `rows` rows is deep enough for any depth.
+    """
+    row = connect().execute(
+        "SELECT depth, ids, distances FROM ground_truth WHERE tbl = ? AND vec_hash = ? AND shape = ? AND snapshot = ?",
+        (name, vector_hash(queries), shape, snapshot),
+    ).fetchone()
+    if row is None or row[0] < min(depth, rows):
+        return None
+    return np.frombuffer(row[1], dtype=np.int64)[:depth], np.frombuffer(row[2], dtype=np.float32)[:depth]
+
+def put(name, queries, shape, snapshot, ids, distances):
+    db = connect()
+    db.execute(
+        "INSERT OR REPLACE INTO ground_truth VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (name, vector_hash(queries), shape, snapshot, len(ids),
+         np.asarray(ids, dtype=np.int64).tobytes(), np.asarray(distances, dtype=np.float32).tobytes()),
+    )
+    db.commit()
+
+def ranking(name, queries, shape, depth, with_distances=False):
+    """
+    Exact ranking of the first `depth` ids for the given query vectors, served
+    from the store when a deep enough one exists, otherwise computed with
+    exact_knn and stored in place of the shallower one.
+    Call embedding_cache.load_cache(name, cursor) first so the snapshot
+    reflects the live table.
+    """
+    ids, vectors, snapshot = open_table(name)
+    invalidate(name, snapshot)
+    cached = get(name, queries, shape, snapshot, depth, len(ids))
+    if cached is None:
+        pos, dist = exact_knn.search(vectors, queries, depth, combine="min" if shape == "least" else None)
+        put(name, queries, shape, snapshot, ids[pos[0]], dist[0])
+        cached = ids[pos[0]], dist[0]
+    result_ids, result_dist = cached
+    return (result_ids.tolist(), result_dist.tolist()) if with_distances else result_ids.tolist()
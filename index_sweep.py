@@ -0,0 +1,320 @@
+import numpy as np
+import pandas as pd
+import itertools
+import os
+import re
+import time
+
+import bench_runner
+import measure
+import recall
+import throughput
+
+# --- Configuration ---
+INDEX_TYPES = ["ivfflat", "hnsw", "diskann"] # "ivfflat" / "hnsw" = pgvector on PostgreSQL, "diskann" = SQL Server CREATE VECTOR INDEX
+# Per index type: (build-time grid, query-time grid). Every build is queried at every query-time setting.
+GRIDS = {
+    "ivfflat": ({"lists": [200, 400, 600, 800, 1000]}, {"probes": [5, 10, 20, 50, 100]}),
+    "hnsw": ({"m": [8, 16, 32], "ef_construction": [64, 128, 256]}, {"ef_search": [10, 20, 40, 80, 160, 320]}),
+    "diskann": ({"maxdop": [0]}, {"overfetch": [1, 2, 4, 8]}), # overfetch: VECTOR_SEARCH TOP_N = overfetch * k, best k kept
+}
+K_VALUES = [10, 20, 50, 100, 200, 500]
+QUERIES = ["Q1"] # k-NN queries to sweep (bench_runner.PG_KNN on PostgreSQL, SQLSERVER_KNN on SQL Server)
+VECTOR_GROUPS = 5 # query_pool groups per (query, K); recall is their mean, latency their median
+WARMUP_RUNS = 1
+REPETITIONS = 3
+MAINTENANCE_WORK_MEM = "1GB" # PostgreSQL CREATE INDEX
+TARGET_RECALL = 95 # BEST_FILE: fastest configuration per (query, K) reaching this recall
+STORE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plots", "index_sweep.csv")
+BEST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plots", "index_best.csv")
+# ---------------------
+# Sweeps the vector index types of both engines over their build-time and
+# query-time knobs:
+#   ivfflat  lists (build), ivfflat.probes (query)
+#   hnsw     m, ef_construction (build), hnsw.ef_search (query)
+#   diskann  MAXDOP (build; SQL Server exposes no graph knobs), TOP_N over-fetch (query)
+# Each build is timed and sized, then queried at every query-time setting and
+# every K with query_pool vectors. Ground truth is the same k-NN as an exact
+# scan on the same database, run before any sweep index exists, which also
+# gives exact_ms and the accel = exact_ms / idx_ms column.
+#
+# Rows are upserted into STORE_FILE (plots/knee.py reads it), keyed by index,
+# query, k and the knob columns. After every sweep the store gets two flags
+# per (index, query, k): `pareto` marks configurations no other configuration
+# beats on both recall and idx_ms, `knee` the frontier point furthest from the
+# line between its fastest and its most accurate end. BEST_FILE lists, per
+# (query, k), the fastest configuration of any index type at TARGET_RECALL.
+# Vector indexes already on the swept tables are dropped for the sweep and
+# recreated at the end.
+
+ENGINES = {"ivfflat": "postgres", "hnsw": "postgres", "diskann": "sqlserver"}
+KNOBS = ["lists", "probes", "m", "ef_construction", "ef_search", "maxdop", "overfetch"]
+KEY = ["index", "query", "k"] + KNOBS
+PG_VECTOR_INDEX = re.compile(r"USING\s+(ivfflat|hnsw)", re.IGNORECASE)
+EMBEDDING_COLUMNS = {"text": "text_embedding", "page": "page_embedding"}
+
+# Single-target k-NN on the SQL Server vector index; TOP_N over-fetches, TOP keeps the best k
+SQLSERVER_KNN = {
+    "Q1": ("text", "SELECT TOP ({k}) t.old_id FROM VECTOR_SEARCH(TABLE=dbo.text AS t, COLUMN=text_embedding, "
+                   "SIMILAR_TO=@v1, METRIC='cosine', TOP_N={top_n}) AS s ORDER BY s.distance"),
+    "NQ11": ("page", "SELECT TOP ({k}) p.page_id FROM VECTOR_SEARCH(TABLE=dbo.page AS p, COLUMN=page_embedding, "
+                     "SIMILAR_TO=@vp, METRIC='cosine', TOP_N={top_n}) AS s ORDER BY s.distance"),
+    "NQ13": ("text", "SELECT TOP ({k}) t.old_id FROM VECTOR_SEARCH(TABLE=dbo.text AS t, COLUMN=text_embedding, "
+                     "SIMILAR_TO=@v1, METRIC='cosine', TOP_N={top_n}) AS s ORDER BY s.distance"),
+}
+SQLSERVER_EXACT = {
+    "text": "SELECT TOP ({k}) old_id FROM dbo.text ORDER BY VECTOR_DISTANCE('cosine', @v1, text_embedding), old_id",
+    "page": "SELECT TOP ({k}) page_id FROM dbo.page ORDER BY VECTOR_DISTANCE('cosine', @vp, page_embedding), page_id",
+}
+
+# --- Frontier ---
+
+def pareto_frontier(df, x="idx_ms", y="recall"):
+    """Boolean mask of the rows of `df` not dominated on (lower x, higher y)."""
+    order = df.sort_values([x, y], ascending=[True, False]).index
+    mask = pd.Series(False, index=df.index)
+    best = -np.inf
+    for i in order:
+        if df.at[i, y] > best:
+            mask[i] = True
+            best = df.at[i, y]
+    return mask
+
+def knee_point(df, x="idx_ms", y="recall"):
+    """Index label of the knee of a frontier: furthest from the chord between its two ends (both axes scaled to [0, 1])."""
+    pts = df.sort_values(x)
+    if len(pts) < 3:
+        return pts.index[-1] if len(pts) else None
+    xs = (pts[x] - pts[x].min()) / ((pts[x].max() - pts[x].min()) or 1)
+    ys = (pts[y] - pts[y].min()) / ((pts[y].max() - pts[y].min()) or 1)
+    # Chord from (0, 0) to (1, 1): distance is proportional to ys - xs
+    return (ys - xs).idxmax()
+
+def mark_frontiers(df, groups=("index", "query", "k")):
+    df = df.copy()
+    df["pareto"], df["knee"] = False, False
+    for _, part in df.groupby(list(groups), dropna=False):
+        front = pareto_frontier(part)
+        df.loc[front[front].index, "pareto"] = True
+        knee = knee_point(part[front])
+        if knee is not None:
+            df.loc[knee, "knee"] = True
+    return df
+
+def best_per_query(store, target=TARGET_RECALL):
+    """Fastest configuration (any index type) per (query, k) with recall >= target."""
+    hits = store[store["recall"] >= target].dropna(subset=["query"])
+    return hits.loc[hits.groupby(["query", "k"])["idx_ms"].idxmin()].reset_index(drop=True)
+
+def store_keys(df):
+    """KEY tuples as text, so 800 and 800.0 (CSV round trip) compare equal."""
+    text = lambda v: "" if pd.isna(v) else str(int(v)) if isinstance(v, (int, float, np.number)) and float(v).is_integer() else str(v)
+    return [tuple(text(v) for v in row) for row in df.reindex(columns=KEY).itertuples(index=False)]
+
+def save_store(rows):
+    """Upserts `rows` into STORE_FILE and recomputes the frontier flags."""
+    new = pd.DataFrame(rows)
+    if os.path.exists(STORE_FILE):
+        old = pd.read_csv(STORE_FILE)
+        keys = set(store_keys(new))
+        old = old[[key not in keys for key in store_keys(old)]]
+        new = pd.concat([old, new], ignore_index=True)
+    columns = KEY + [c for c in new.columns if c not in KEY + ["pareto", "knee"]]
+    new = mark_frontiers(new.reindex(columns=columns)).sort_values(KEY).reset_index(drop=True)
+    new.to_csv(STORE_FILE, index=False)
+    return new
+
+# --- Indexes ---
+
+def tables_for(index_type, queries):
+    if ENGINES[index_type] == "sqlserver":
+        return sorted({SQLSERVER_KNN[q][0] for q in queries})
+    return sorted({t for q in queries for t in re.findall(r"FROM\s+(text|page)\b", bench_runner.PG_KNN[q])})
+
+def existing_indexes(engine, cursor, tables):
+    """[(name, statement that recreates it)] for the vector indexes on `tables`."""
+    if engine == "postgres":
+        cursor.execute("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = ANY(%s)", (list(tables),))
+        return [(name, definition) for name, definition in cursor.fetchall() if PG_VECTOR_INDEX.search(definition)]
+    cursor.execute(f"""
+        SELECT i.name, OBJECT_NAME(i.object_id), c.name, vi.distance_metric, vi.vector_index_type
+        FROM sys.vector_indexes AS vi
+        JOIN sys.indexes AS i ON i.object_id = vi.object_id AND i.index_id = vi.index_id
+        JOIN sys.index_columns AS ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+        JOIN sys.columns AS c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+        WHERE OBJECT_NAME(i.object_id) IN ({", ".join(f"'{t}'" for t in tables)})
+    """)
+    return [(f"{name} ON dbo.{table}",
+             f"CREATE VECTOR INDEX {name} ON dbo.{table}({column}) WITH (METRIC = '{metric}', TYPE = '{kind}')")
+            for name, table, column, metric, kind in cursor.fetchall()]
+
+def index_mb(engine, cursor, table, name):
+    if engine == "postgres":
+        cursor.execute("SELECT pg_relation_size(%s::regclass)", (name,))
+    else:
+        # A vector index lives in internal tables parented to the base table
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(ps.reserved_page_count), 0) * 8192
+            FROM sys.dm_db_partition_stats AS ps
+            WHERE ps.object_id = OBJECT_ID('dbo.{table}')
+               OR ps.object_id IN (SELECT object_id FROM sys.internal_tables WHERE parent_object_id = OBJECT_ID('dbo.{table}'))
+        """)
+    return float(cursor.fetchone()[0]) / (1 << 20)
+
+def build_index(index_type, cursor, table, params):
+    """(index name, build ms, size MB) for a fresh `index_type` index on `table`."""
+    engine, column = ENGINES[index_type], EMBEDDING_COLUMNS[table]
+    name = f"sweep_{table}_{index_type}"
+    drop_index(engine, cursor, table, name)
+    before = index_mb(engine, cursor, table, None) if engine == "sqlserver" else 0.0
+    if index_type == "diskann":
+        sql = (f"CREATE VECTOR INDEX {name} ON dbo.{table}({column}) "
+               f"WITH (METRIC = 'cosine', TYPE = 'diskann', MAXDOP = {params['maxdop']})")
+    else:
+        options = ", ".join(f"{knob} = {value}" for knob, value in params.items())
+        sql = f"CREATE INDEX {name} ON {table} USING {index_type} ({column} vector_cosine_ops) WITH ({options})"
+    start = time.perf_counter()
+    cursor.execute(sql)
+    build_ms = (time.perf_counter() - start) * 1000
+    return name, build_ms, index_mb(engine, cursor, table, name) - before
+
+def drop_index(engine, cursor, table, name):
+    if engine == "postgres":
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+    else:
+        cursor.execute(f"DROP INDEX IF EXISTS {name} ON dbo.{table}")
+
+def set_query_knobs(index_type, cursor, params):
+    if index_type == "ivfflat":
+        cursor.execute(f"SET ivfflat.probes = {params['probes']}")
+    elif index_type == "hnsw":
+        cursor.execute(f"SET hnsw.ef_search = {params['ef_search']}")
+
+# --- Queries ---
+
+def knn_sql(index_type, query, k, params=None):
+    if ENGINES[index_type] == "sqlserver":
+        overfetch = (params or {}).get("overfetch", 1)
+        return SQLSERVER_KNN[query][1].format(k=k, top_n=overfetch * k)
+    return bench_runner.PG_KNN[query].format(k=k, k2=2 * k, offset=k - 10 if k >= 10 else 0)
+
+def fetch_ids(engine, cursor, sql, vectors):
+    if engine == "sqlserver":
+        return [r[0] for r in recall.fetch_rows(cursor, sql, vectors)]
+    cursor.execute(sql, vectors)
+    return [r[0] for r in cursor.fetchall()]
+
+def exact_results(engine, cursor, queries, k_values=None):
+    """{(query, k, group): (ids, exact p50 ms)} from exact scans."""
+    truth = {}
+    for g in range(VECTOR_GROUPS):
+        vectors, _ = bench_runner.pool_vectors(g)
+        for query in queries:
+            for k in k_values or K_VALUES:
+                if engine == "sqlserver":
+                    sql = SQLSERVER_EXACT[SQLSERVER_KNN[query][0]].format(k=k)
+                else:
+                    sql = bench_runner.PG_KNN[query].format(k=k, k2=2 * k, offset=k - 10 if k >= 10 else 0)
+                samples, ids = measure.measure(lambda: fetch_ids(engine, cursor, sql, vectors), WARMUP_RUNS, REPETITIONS)
+                truth[(query, k, g)] = ids, float(np.median(samples))
+    print(f"[{engine}] exact results for {len(truth)} (query, K, group) combinations.")
+    return truth
+
+def sweep_setting(index_type, cursor, queries, truth, config, k_values=None):
+    """One store row per (query, K) at the current build and query-time settings."""
+    engine = ENGINES[index_type]
+    rows = []
+    for query in queries:
+        for k in k_values or K_VALUES:
+            sql = knn_sql(index_type, query, k, config)
+            recalls, idx_ms, exact_ms = [], [], []
+            for g in range(VECTOR_GROUPS):
+                vectors, _ = bench_runner.pool_vectors(g)
+                samples, ids = measure.measure(lambda: fetch_ids(engine, cursor, sql, vectors), WARMUP_RUNS, REPETITIONS)
+                expected, ms = truth[(query, k, g)]
+                recalls.append(recall.calculate_recall(set(expected), set(ids)))
+                idx_ms.append(float(np.median(samples)))
+                exact_ms.append(ms)
+            row = {"index": index_type, "engine": engine, "query": query, "k": k, **config,
+                   "recall": round(float(np.mean(recalls)), 2), "idx_ms": round(float(np.median(idx_ms)), 3),
+                   "exact_ms": round(float(np.median(exact_ms)), 3)}
+            row["accel"] = row["exact_ms"] / row["idx_ms"] if row["idx_ms"] else None
+            rows.append(row)
+    return rows
+
+def grid(knobs):
+    return [dict(zip(knobs, values)) for values in itertools.product(*knobs.values())]
+
+def describe(params):
+    return ", ".join(f"{knob}={value}" for knob, value in params.items())
+
+def sweep_engine(engine, index_types):
+    """Sweeps `index_types` (all on `engine`) on one connection; returns store rows."""
+    queries = {t: [q for q in QUERIES if engine == "postgres" or q in SQLSERVER_KNN] for t in index_types}
+    skipped = [q for q in QUERIES if q not in queries[index_types[0]]]
+    if skipped:
+        print(f"[{engine}] no index query for {skipped}; skipped")
+    all_queries = sorted({q for qs in queries.values() for q in qs})
+    if not all_queries:
+        return []
+    tables = sorted({t for index_type in index_types for t in tables_for(index_type, queries[index_type])})
+
+    conn = throughput.connect(engine)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    saved = existing_indexes(engine, cursor, tables)
+    rows = []
+    try:
+        for name, _ in saved:
+            print(f"[{engine}] dropping existing vector index {name} for the sweep")
+            cursor.execute(f"DROP INDEX {name}")
+        truth = exact_results(engine, cursor, all_queries)
+        if engine == "postgres":
+            cursor.execute(f"SET maintenance_work_mem = '{MAINTENANCE_WORK_MEM}'")
+
+        for index_type in index_types:
+            build_grid, query_grid = GRIDS[index_type]
+            for build in grid(build_grid):
+                built = [build_index(index_type, cursor, table, build) for table in tables_for(index_type, queries[index_type])]
+                build_ms, size_mb = sum(b[1] for b in built), sum(b[2] for b in built)
+                print(f"{index_type} {describe(build)}: built in {build_ms / 1000:.1f} s, {size_mb:.1f} MB")
+                for setting in grid(query_grid):
+                    set_query_knobs(index_type, cursor, setting)
+                    found = sweep_setting(index_type, cursor, queries[index_type], truth,
+                                          {**build, **setting, "build_ms": round(build_ms, 1), "index_mb": round(size_mb, 2)})
+                    rows.extend(found)
+                    print(f"  {describe(setting)}: " + ", ".join(
+                        f"{r['query']}@{r['k']} {r['recall']:.0f}% {r['idx_ms']:.1f} ms" for r in found))
+                for table in tables_for(index_type, queries[index_type]):
+                    drop_index(engine, cursor, table, f"sweep_{table}_{index_type}")
+    finally:
+        for index_type in index_types:
+            for table in tables:
+                drop_index(engine, cursor, table, f"sweep_{table}_{index_type}")
+        if engine == "postgres":
+            cursor.execute("RESET ivfflat.probes")
+            cursor.execute("RESET hnsw.ef_search")
+        for name, definition in saved:
+            print(f"[{engine}] recreating {name}")
+            cursor.execute(definition)
+        conn.close()
+    return rows
+
+def run_sweep():
+    rows = []
+    for engine in dict.fromkeys(ENGINES[t] for t in INDEX_TYPES):
+        rows.extend(sweep_engine(engine, [t for t in INDEX_TYPES if ENGINES[t] == engine]))
+
+    if rows:
+        store = save_store(rows)
+        knees = store[store["knee"] & store["query"].isin(QUERIES) & store["index"].isin(INDEX_TYPES)]
+        for _, r in knees.iterrows():
+            knobs = describe({c: int(r[c]) for c in KNOBS if pd.notna(r[c])})
+            print(f"Knee {r['index']} {r['query']} K={r['k']}: {knobs} ({r['recall']:.0f}% recall, {r['idx_ms']:.1f} ms)")
+        best = best_per_query(store[store["query"].isin(QUERIES)])
+        best.to_csv(BEST_FILE, index=False)
+        print(f"\n{len(rows)} configurations saved to {STORE_FILE}; "
+              f"fastest per query at {TARGET_RECALL}% recall in {BEST_FILE}")
+
+if __name__ == "__main__":
+    run_sweep()
@@ -1,13 +1,26 @@
 import pyodbc
-import time
+import itertools
 import pandas as pd
 import re
 
+import measure
+import profiling
+import result_fetch
+import query_pool
+
 # --- Configuration ---
 SERVER = "localhost"
 DATABASE = "index_hybench_100k"
 INPUT_FILE = "non_indexed_queries.sql"
 OUTPUT_FILE = "latency_results.csv"
+SAMPLES_FILE = "latency_samples.csv" # every timed run, one row per sample
+WARMUP_RUNS = measure.WARMUP_RUNS
+REPETITIONS = measure.REPETITIONS
+FETCH_MODES = ["materialize"] # any of result_fetch.FETCH_MODES; the first fills Latency_MS, the rest add <Mode>_P50_MS/_P95_MS columns
+CHECKSUM = result_fetch.CHECKSUM # adds a Checksum column (from the first non-count mode)
+QUERY_VECTORS = "pool" # "pool" = pin each query's vector pick to the shared query_pool.py vectors, "script" = the script's own first-row pick
+POOL_MODE = "single" # pool: "single" = every run uses pool group 0, "batch" = runs cycle through query_pool.BATCH_SIZE groups
+PROFILE = True # one extra run per query on a fresh connection with per-phase timings (see profiling.py)
 DELIMITER = "-- ### NEXT QUERY ###" 
 # ---------------------
 
@@ -20,7 +33,35 @@ def clean_sql(sql_text):
     sql_text = re.sub(r'(?m)^\s*GO\s*$', '', sql_text, flags=re.IGNORECASE)
     return sql_text.strip()
 
+def execute_query(cursor, sql, mode="materialize", checksum=False):
+    """
+    Executes one benchmark query and consumes its result with the given
+    result_fetch mode; returns (row count, checksum or None).
+    """
+    cursor.execute(sql)
+
+    # Iterate through all result sets to handle variable assignments
+    while True:
+        if cursor.description:
+            return result_fetch.consume(cursor, mode, result_fetch.BATCH_SIZE, checksum)
+
+        if not cursor.nextset():
+            break
+
+    return 0, None
+
 def run_benchmarks():
+    unknown = [mode for mode in FETCH_MODES if mode not in result_fetch.FETCH_MODES]
+    if unknown:
+        print(f"Unknown fetch modes {unknown}, expected any of {result_fetch.FETCH_MODES}")
+        return
+    if "arrow" in FETCH_MODES:
+        try:
+            result_fetch.import_arrow_odbc()
+        except ImportError as e:
+            print(f"Error: {e}")
+            return
+
     try:
         conn = pyodbc.connect(conn_str)
         
@@ -46,7 +87,13 @@ def run_benchmarks():
         return
     
     queries = raw_content.split(DELIMITER)
+    groups = []
+    if QUERY_VECTORS == "pool":
+        pool = query_pool.load_pool(cursor)
+        query_pool.check_ids("sqlserver", cursor, pool)
+        groups = query_pool.sql_groups(POOL_MODE, pool=pool)
     results = []
+    samples = []
 
     print(f"Found {len(queries)} queries to benchmark...")
 
@@ -56,33 +103,51 @@ def run_benchmarks():
 
         print(f"Running Query {i+1}...", end=" ", flush=True)
         
+        variants = [query_pool.pin(sql, g) for g in groups] or [sql]
+
         try:
-            start_time = time.time()
-            cursor.execute(sql)
-            
-            row_count = 0
-            
-            # Iterate through all result sets to handle variable assignments
-            while True:
-                if cursor.description: 
-                    rows = cursor.fetchall()
-                    row_count = len(rows)
-                    break 
-                
-                if not cursor.nextset():
-                    break
-
-            end_time = time.time()
-            duration_ms = (end_time - start_time) * 1000
-            
-            print(f"Done! ({duration_ms:.2f} ms, {row_count} rows)")
-            
+            per_mode = {}
+            checksum = None
+            for mode in FETCH_MODES:
+                runs = itertools.cycle(variants)
+                if mode == "arrow":
+                    run_once = lambda: result_fetch.consume_arrow(result_fetch.sqlserver_arrow_batches(conn_str, next(runs)))
+                else:
+                    run_once = lambda: execute_query(cursor, next(runs), mode, CHECKSUM)
+                mode_samples, (row_count, digest) = measure.measure(run_once, WARMUP_RUNS, REPETITIONS)
+                per_mode[mode] = mode_samples
+                checksum = checksum or digest
+
+            samples_ms = per_mode[FETCH_MODES[0]]
+            summary = measure.summarize(samples_ms)
+            for mode in FETCH_MODES[1:]:
+                mode_summary = measure.summarize(per_mode[mode])
+                summary[f"{mode.capitalize()}_P50_MS"] = mode_summary["P50_MS"]
+                summary[f"{mode.capitalize()}_P95_MS"] = mode_summary["P95_MS"]
+            if CHECKSUM:
+                summary["Checksum"] = checksum
+
+            print(f"Done! (p50 {summary['P50_MS']:.2f} ms, p95 {summary['P95_MS']:.2f} ms, {row_count} rows)")
+            for mode in FETCH_MODES[1:]:
+                print(f"  {mode}: p50 {summary[mode.capitalize() + '_P50_MS']:.2f} ms")
+
+            phases = {}
+            if PROFILE:
+                phases = profiling.profile_sqlserver(lambda: pyodbc.connect(conn_str, autocommit=True), variants[0])
+                print(f"  execute {phases['Execute_MS']} ms, fetch {phases['Fetch_MS']} ms, "
+                      f"server elapsed {phases['Server_Elapsed_MS']} ms / cpu {phases['Server_CPU_MS']} ms")
+
             results.append({
                 "Query_ID": i + 1,
-                "Latency_MS": round(duration_ms, 2),
+                "Latency_MS": round(summary['P50_MS'], 2),
                 "Rows_Returned": row_count,
-                "Status": "Success"
+                "Fetch_Mode": FETCH_MODES[0],
+                "Status": "Success",
+                **summary,
+                **phases
             })
+            samples.extend({"Query_ID": i + 1, "Run": run + 1, "Latency_MS": round(ms, 3)}
+                           for run, ms in enumerate(samples_ms))
 
         except Exception as e:
             print(f"FAILED.")
@@ -97,7 +162,8 @@ def run_benchmarks():
 
     df = pd.DataFrame(results)
     df.to_csv(OUTPUT_FILE, index=False)
-    print(f"\nBenchmark complete. Results saved to {OUTPUT_FILE}")
+    pd.DataFrame(samples).to_csv(SAMPLES_FILE, index=False)
+    print(f"\nBenchmark complete. Results saved to {OUTPUT_FILE} (raw samples in {SAMPLES_FILE})")
     conn.close()
 
 if __name__ == "__main__":
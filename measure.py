@@ -0,0 +1,65 @@
+import numpy as np
+import time
+
+# --- Configuration ---
+WARMUP_RUNS = 2 # untimed executions before sampling (plan cache, buffer pool)
+REPETITIONS = 10 # timed executions per query
+BOOTSTRAP_RESAMPLES = 2000
+CONFIDENCE = 0.95
+SEED = 42
+# ---------------------
+# Shared latency measurement for latency.py and postgres/run_all.py:
+# warmup, N timed repetitions on time.perf_counter (monotonic, high
+# resolution), and per-query percentiles with bootstrap confidence intervals.
+
+STATS = {
+    "p50": lambda s: np.percentile(s, 50, axis=-1),
+    "p95": lambda s: np.percentile(s, 95, axis=-1),
+    "p99": lambda s: np.percentile(s, 99, axis=-1),
+    "mean": lambda s: np.mean(s, axis=-1),
+    "std": lambda s: np.std(s, axis=-1, ddof=1) if s.shape[-1] > 1 else np.zeros(s.shape[:-1]),
+}
+
+SUMMARY_COLUMNS = ["Runs"] + [
+    f"{name.upper()}{suffix}" for name in STATS for suffix in ("_MS", "_CI_Low", "_CI_High")
+]
+
+def measure(run_once, warmup=WARMUP_RUNS, repetitions=REPETITIONS):
+    """
+    Calls run_once() `warmup` times untimed, then `repetitions` times timed.
+    Returns (samples in ms, the value returned by the last run).
+    """
+    result = None
+    for _ in range(warmup):
+        result = run_once()
+    samples = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        result = run_once()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples, result
+
+def bootstrap_ci(samples, stat, resamples=BOOTSTRAP_RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    """Percentile-bootstrap confidence interval (low, high) of stat(samples)."""
+    samples = np.asarray(samples, dtype=float)
+    rng = np.random.default_rng(seed)
+    boot = stat(samples[rng.integers(0, len(samples), size=(resamples, len(samples)))])
+    alpha = (1 - confidence) / 2
+    return float(np.quantile(boot, alpha)), float(np.quantile(boot, 1 - alpha))
+
+def summarize(samples):
+    """
+    {'P50_MS', 'P50_CI_Low', 'P50_CI_High', 'P95_MS', ...} for a list of samples (ms).
+    Empty input gives an empty dict.
+    """
+    if not samples:
+        return {}
+    s = np.asarray(samples, dtype=float)
+    summary = {"Runs": len(s)}
+    for name, stat in STATS.items():
+        key = name.upper()
+        summary[f"{key}_MS"] = round(float(stat(s)), 3)
+        low, high = bootstrap_ci(s, stat)
+        summary[f"{key}_CI_Low"] = round(low, 3)
+        summary[f"{key}_CI_High"] = round(high, 3)
+    return summary
@@ -7,6 +7,7 @@ import textwrap
 # --- Configuration ---
 LATENCY_FILE = "latency_results.csv"
 RECALL_FILE = "recall_results.csv"
+SAMPLES_FILE = "latency_samples.csv"
 # ---------------------
 
 def plot_index_vs_scan(df_latency, df_recall):
@@ -24,6 +25,9 @@ def plot_index_vs_scan(df_latency, df_recall):
     if data.empty:
         print(f"No data found for K={k_val}")
         return
+    if 'Exact_Latency_MS' not in data or data['Exact_Latency_MS'].isna().all():
+        print("Skipping Index vs Scan plot (no full-scan latency; run recall.py with MEASURE_SCAN_LATENCY = True).")
+        return
 
     queries = data['Query']
     x = np.arange(len(queries))
@@ -31,7 +35,12 @@ def plot_index_vs_scan(df_latency, df_recall):
 
     fig, ax = plt.subplots(figsize=(10, 6))
     rects1 = ax.bar(x - width/2, data['Exact_Latency_MS'], width, label='Non-Indexed (Full Scan)', color='#e74c3c')
-    rects2 = ax.bar(x + width/2, data['Index_Latency_MS'], width, label='Indexed (Vector Search)', color='#2ecc71')
+    # recall.py in single-probe mode times one index call at its largest K; draw that, labelled as such
+    if 'Probe_Latency_MS' in data and data['Index_Latency_MS'].isna().all():
+        index_ms, index_label = data['Probe_Latency_MS'], f"Indexed (single probe at K={data['Probe_K'].max()})"
+    else:
+        index_ms, index_label = data['Index_Latency_MS'], 'Indexed (Vector Search)'
+    rects2 = ax.bar(x + width/2, index_ms, width, label=index_label, color='#2ecc71')
 
     ax.set_ylabel('Latency (ms) - Log Scale')
     ax.set_title(f'Impact of Vector Index (K={k_val})')
@@ -140,6 +149,53 @@ def plot_latency_distribution(df_latency):
     plt.savefig('graph_distribution.png')
     print("Generated graph_distribution.png")
 
+def plot_latency_samples(df_samples, df_latency):
+    """
+    Per-query latency distributions from the raw timed runs (latency.py),
+    with the p50 and its bootstrap CI overlaid when the summary has them.
+    """
+    plt.figure(figsize=(14, 6))
+    order = sorted(df_samples['Query_ID'].unique())
+
+    ax = sns.boxplot(data=df_samples, x='Query_ID', y='Latency_MS', order=order, color='#d6eaf8', fliersize=0)
+    sns.stripplot(data=df_samples, x='Query_ID', y='Latency_MS', order=order, size=3, color='#2c3e50', alpha=0.5, ax=ax)
+
+    if {'P50_CI_Low', 'P50_CI_High'}.issubset(df_latency.columns):
+        ci = df_latency.set_index('Query_ID').reindex(order)
+        ax.errorbar(np.arange(len(order)), ci['P50_MS'],
+                    yerr=[ci['P50_MS'] - ci['P50_CI_Low'], ci['P50_CI_High'] - ci['P50_MS']],
+                    fmt='o', color='#e74c3c', capsize=3, label='p50 (95% bootstrap CI)')
+        ax.legend()
+
+    ax.set_yscale('log')
+    plt.title('Latency Distribution per Query (all timed runs)')
+    plt.xlabel('Query ID')
+    plt.ylabel('Latency (ms) - Log Scale')
+    plt.tight_layout()
+    plt.savefig('graph_latency_samples.png')
+    print("Generated graph_latency_samples.png")
+
+def plot_fetch_modes(df_latency):
+    """
+    p50 per query under each result consumption mode latency.py measured
+    (FETCH_MODES): the first mode's Latency_MS plus every <Mode>_P50_MS column.
+    """
+    modes = [c[:-len('_P50_MS')] for c in df_latency.columns if c.endswith('_P50_MS')]
+    if not modes:
+        return
+    first = str(df_latency['Fetch_Mode'].dropna().iloc[0]).capitalize()
+    df = df_latency[df_latency['Status'] == 'Success'].set_index('Query_ID')
+    data = pd.DataFrame({first: df['Latency_MS'], **{m: df[f'{m}_P50_MS'] for m in modes}})
+
+    ax = data.plot(kind='bar', figsize=(14, 6), width=0.8, logy=True)
+    plt.title('Latency by Result Consumption Mode (p50)')
+    plt.xlabel('Query ID')
+    plt.ylabel('Latency (ms) - Log Scale')
+    ax.legend(title='Fetch mode')
+    plt.tight_layout()
+    plt.savefig('graph_fetch_modes.png')
+    print("Generated graph_fetch_modes.png")
+
 if __name__ == "__main__":
     # Load Data
     try:
@@ -154,9 +210,20 @@ if __name__ == "__main__":
         print("Could not load recall results (Graph 1 will be skipped).")
         df_rec = pd.DataFrame()
 
+    try:
+        df_samples = pd.read_csv(SAMPLES_FILE)
+    except:
+        print("No raw latency samples found (distribution plot will be skipped).")
+        df_samples = pd.DataFrame()
+
     if not df_lat.empty:
         plot_rows_vs_latency(df_lat)
         plot_latency_distribution(df_lat)
+        if 'Fetch_Mode' in df_lat.columns:
+            plot_fetch_modes(df_lat)
+
+    if not df_samples.empty:
+        plot_latency_samples(df_samples, df_lat)
         
     if not df_rec.empty:
         plot_index_vs_scan(df_lat, df_rec)
\ No newline at end of file
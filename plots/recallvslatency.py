@@ -3,7 +3,8 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 
 # --- Configuration ---
-INPUT_FILE = "recall_comparision.csv" # Note: using your filename with 'comparision' typo
+INPUT_FILE = "recall_comparision.csv" # Note: using your filename with 'comparision' typo (benchmark_results.csv from bench_runner.py also works)
+INDEX_LABEL = "lists=800, probes=20" # PostgreSQL index settings the results were taken with (see the knee rows of index_sweep.csv)
 # ---------------------
 
 def plot_comparison():
@@ -13,13 +14,16 @@ def plot_comparison():
         print(f"Error: Could not find '{INPUT_FILE}'. Please make sure the file exists.")
         return
 
+    # benchmark_results.csv (bench_runner.py) also has latency-only rows; keep the recall ones
+    df = df.dropna(subset=["Recall", "K"])
+
     # Set a clean visual style
     sns.set_theme(style="whitegrid")
     
     # --- 1. LATENCY COMPARISON (Lower is Better) ---
     # We use a bar chart because K values are discrete categories
     g1 = sns.catplot(
-        data=df, 
+        data=df.dropna(subset=["Latency"]), # single-probe recall.py rows have no per-K latency
         x="K", 
         y="Latency", 
         hue="System", 
@@ -33,7 +37,7 @@ def plot_comparison():
     
     g1.set_axis_labels("K (Top N)", "Latency (ms)")
     g1.fig.subplots_adjust(top=0.85)
-    g1.fig.suptitle('Latency: SQL Server vs. PostgreSQL (lists=800, probes=20)', fontsize=16, fontweight='bold')
+    g1.fig.suptitle(f'Latency: SQL Server vs. PostgreSQL ({INDEX_LABEL})', fontsize=16, fontweight='bold')
     
     # Add numerical labels on top of bars for clarity
     for ax in g1.axes.flat:
@@ -24,9 +24,11 @@ def plot_slide9_metrics():
         sns.set_theme(style="whitegrid", context="talk") # 'talk' context makes fonts larger for PPTs
 
         # --- PLOT 1: Index Latency vs K ---
+        # Rows without a per-K latency (recall.py single-probe mode) are left out
+        df_lat = df_sql.dropna(subset=["Latency"])
         plt.figure(figsize=(8, 6))
         g1 = sns.lineplot(
-            data=df_sql, 
+            data=df_lat, 
             x="K", 
             y="Latency", 
             hue="Query", 
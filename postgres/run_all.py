@@ -1,74 +1,230 @@
 import psycopg2
+import asyncio
+import itertools
 import time
 import glob
 import csv
 import os
+import sys
+
+# Shared measurement engine lives in the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import measure
+import profiling
+import result_fetch
+import query_pool
+
+EXECUTION_MODE = "sync" # "sync" = one blocking psycopg2 cursor, "async" = asyncpg pool with CONCURRENCY queries in flight
+WARMUP_RUNS = measure.WARMUP_RUNS
+REPETITIONS = measure.REPETITIONS
+FETCH_MODES = ["materialize"] # sync: any of result_fetch.FETCH_MODES; the first fills latency_ms, the rest add <mode>_p50_ms/_p95_ms columns
+CHECKSUM = result_fetch.CHECKSUM # sync: adds a checksum column (from the first non-count mode)
+QUERY_VECTORS = "pool" # "pool" = pin each file's vector pick to the shared query_pool.py vectors, "script" = the file's own pick
+POOL_MODE = "single" # pool: "single" = every run uses pool group 0, "batch" = runs cycle through query_pool.BATCH_SIZE groups
+PROFILE = True # sync: one extra run per file with per-phase timings + EXPLAIN (ANALYZE, TIMING) (see profiling.py)
+CONCURRENCY = 32 # async: pooled connections / queries in flight
+QUERY_TIMEOUT_S = 120 # async: per-query timeout (client cancel + server statement_timeout)
+ASYNC_REPEAT = 1 # async: how many times the whole query list is issued
+OUTPUT_FILE = "latency_results.csv"
+SAMPLES_FILE = "latency_samples.csv"
 
 # ---------------------------------------
 # 1. PostgreSQL Connection Details
 # ---------------------------------------
-conn = psycopg2.connect(
+PG_PARAMS = dict(
     dbname="hybench_pg_200k",
     user="postgres",
     password="dbms",
     host="localhost",
     port=5432
 )
-cur = conn.cursor()
+
 
 # ---------------------------------------
-# 2. Prepare output
+# 2. Synchronous runner (warmup + repetitions per file)
 # ---------------------------------------
-results = []
-sql_files = sorted(glob.glob("*.sql"))
+def run_sync(sql_files):
+    conn = psycopg2.connect(**PG_PARAMS)
 
-print("\nFound", len(sql_files), "SQL files.")
-print("Running in alphabetical order:\n")
+    def run_query(query, mode):
+        """
+        Executes one .sql file's query and consumes its rows in `mode`;
+        returns (row count, checksum or None).
+        """
+        if mode == "arrow":
+            cur = conn.cursor()
+            try:
+                result = result_fetch.consume_arrow(result_fetch.postgres_arrow_batches(cur, query))
+            finally:
+                cur.close()
+            conn.commit()
+            return result
 
-# ---------------------------------------
-# 3. Run each .sql file
-# ---------------------------------------
-for file in sql_files:
-    print(f"➡ Running {file} ...")
-    query = open(file, "r", encoding="utf-8").read()
+        cur = result_fetch.pg_cursor(conn, mode)
+        try:
+            cur.execute(query)
+
+            # Try to fetch rows if SELECT query
+            try:
+                result = result_fetch.consume(cur, mode, result_fetch.BATCH_SIZE, CHECKSUM)
+            except psycopg2.ProgrammingError:
+                # Not a SELECT statement → ignore
+                result = 0, None
+        finally:
+            cur.close()
 
-    start_time = time.time()
+        conn.commit()
+        return result
 
-    row_count = 0  # default
+    groups = query_pool.sql_groups(POOL_MODE) if QUERY_VECTORS == "pool" else []
+    results = []
+    samples = []
+    print(f"Running in alphabetical order ({WARMUP_RUNS} warmup + {REPETITIONS} timed runs each, fetch modes {FETCH_MODES}):\n")
 
-    try:
-        cur.execute(query)
+    for file in sql_files:
+        print(f"➡ Running {file} ...")
+        query = open(file, "r", encoding="utf-8").read()
+        variants = [query_pool.pin(query, g) for g in groups] or [query]
+
+        row_count = 0  # default
+        summary = {}
+
+        mode_p = {}
+        checksum = None
 
-        # Try to fetch rows if SELECT query
         try:
-            rows = cur.fetchall()
-            row_count = len(rows)
-        except psycopg2.ProgrammingError:
-            # Not a SELECT statement → ignore
-            row_count = 0
+            for mode in FETCH_MODES:
+                runs = itertools.cycle(variants)
+                mode_samples, (row_count, digest) = measure.measure(lambda: run_query(next(runs), mode), WARMUP_RUNS, REPETITIONS)
+                checksum = checksum or digest
+                if mode == FETCH_MODES[0]:
+                    summary = measure.summarize(mode_samples)
+                    samples.extend([file, run + 1, round(ms, 3)] for run, ms in enumerate(mode_samples))
+                else:
+                    mode_summary = measure.summarize(mode_samples)
+                    mode_p[mode] = [mode_summary["P50_MS"], mode_summary["P95_MS"]]
+                    print(f"   {mode}: p50 {mode_summary['P50_MS']} ms")
 
-        conn.commit()
+        except Exception as e:
+            print(f"❌ ERROR in {file}: {e}")
+            conn.rollback()
+
+        ms = summary.get("P50_MS", 0)
+
+        print(f"   ✔ p50 {ms} ms, p95 {summary.get('P95_MS', 0)} ms, Rows Returned = {row_count}")
 
-    except Exception as e:
-        print(f"❌ ERROR in {file}: {e}")
-        conn.rollback()
+        phases = {}
+        if PROFILE and summary:
+            try:
+                phases = profiling.profile_postgres(lambda: psycopg2.connect(**PG_PARAMS), variants[0])
+                print(f"     execute {phases['Execute_MS']} ms, fetch {phases['Fetch_MS']} ms, "
+                      f"server execution {phases['Server_Elapsed_MS']} ms, planning {phases['Parse_Compile_MS']} ms")
+            except Exception as e:
+                print(f"❌ PROFILE ERROR in {file}: {e}")
 
-    end_time = time.time()
-    ms = round((end_time - start_time) * 1000, 3)
+        results.append([file, ms, row_count]
+                       + [summary.get(col) for col in measure.SUMMARY_COLUMNS]
+                       + [p for mode in FETCH_MODES[1:] for p in mode_p.get(mode, [None, None])]
+                       + ([checksum] if CHECKSUM else [])
+                       + ([phases.get(col) for col in profiling.PROFILE_COLUMNS] if PROFILE else []))
 
-    print(f"   ✔ Completed in {ms} ms, Rows Returned = {row_count}")
+    conn.close()
+    header = (["query_file", "latency_ms", "row_count"] + measure.SUMMARY_COLUMNS
+              + [f"{mode}_{p}_ms" for mode in FETCH_MODES[1:] for p in ("p50", "p95")]
+              + (["checksum"] if CHECKSUM else []))
+    return header + (profiling.PROFILE_COLUMNS if PROFILE else []), results, samples
 
-    results.append([file, ms, row_count])
 
 # ---------------------------------------
-# 4. Save results to CSV
+# 3. Asynchronous runner (asyncpg pool, bounded in-flight queries)
 # ---------------------------------------
-with open("latency_results.csv", "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerow(["query_file", "latency_ms", "row_count"])
-    writer.writerows(results)
-
-print("\n===================================")
-print(" ALL QUERIES COMPLETE!")
-print(" Results saved to latency_results.csv")
-print("===================================\n")
+async def text_vectors(conn):
+    """Pool init: decode pgvector columns as their text form (asyncpg has no codec for the extension type)."""
+    try:
+        await conn.set_type_codec("vector", schema="public", encoder=str, decoder=str, format="text")
+    except ValueError:
+        pass # pgvector not installed in this database
+
+async def run_async(sql_files):
+    import asyncpg
+
+    groups = query_pool.sql_groups(POOL_MODE) if QUERY_VECTORS == "pool" else [None]
+    queries = [(file, open(file, "r", encoding="utf-8").read()) for file in sql_files]
+    # Each repeat of the query list uses the next pool group
+    queries = [(file, query_pool.pin(query, groups[r % len(groups)]) if groups[0] else query)
+               for r in range(ASYNC_REPEAT) for file, query in queries]
+    pool = await asyncpg.create_pool(
+        database=PG_PARAMS["dbname"], user=PG_PARAMS["user"], password=PG_PARAMS["password"],
+        host=PG_PARAMS["host"], port=PG_PARAMS["port"],
+        min_size=CONCURRENCY, max_size=CONCURRENCY,
+        server_settings={"statement_timeout": str(QUERY_TIMEOUT_S * 1000)},
+        init=text_vectors,
+    )
+    in_flight = asyncio.Semaphore(CONCURRENCY)
+
+    async def run_one(file, query):
+        async with in_flight, pool.acquire() as conn:
+            row_count, status = 0, "ok"
+            start_time = time.perf_counter()
+            try:
+                # fetch() prepares its text, which takes one statement: run any leading
+                # ones with execute() and fetch the last, as psycopg2 returns the last result
+                *prefix, last = result_fetch.split_statements(query)
+                for statement in prefix:
+                    await conn.execute(statement, timeout=QUERY_TIMEOUT_S)
+                rows = await conn.fetch(last, timeout=QUERY_TIMEOUT_S)
+                row_count = len(rows)
+            except asyncio.TimeoutError:
+                status = "timeout"
+            except Exception as e:
+                status = f"error: {e}"[:200]
+            ms = round((time.perf_counter() - start_time) * 1000, 3)
+        mark = "✔" if status == "ok" else "❌"
+        print(f"   {mark} {file}: {ms} ms, Rows Returned = {row_count}" + ("" if status == "ok" else f" ({status})"))
+        return [file, ms, row_count, status]
+
+    print(f"Running {len(queries)} queries with {CONCURRENCY} in flight (timeout {QUERY_TIMEOUT_S}s):\n")
+    try:
+        wall_start = time.perf_counter()
+        results = await asyncio.gather(*(run_one(file, query) for file, query in queries))
+        wall = time.perf_counter() - wall_start
+    finally:
+        await pool.close()
+
+    print(f"\n {len(results)} queries in {wall:.2f} s ({len(results) / wall:.1f} queries/sec)")
+    return ["query_file", "latency_ms", "row_count", "status"], results, []
+
+
+if __name__ == "__main__":
+    sql_files = sorted(glob.glob("*.sql"))
+    print("\nFound", len(sql_files), "SQL files.")
+
+    if QUERY_VECTORS == "pool":
+        # Pool ids come from the SQL Server cache; make sure this database has them all
+        conn = psycopg2.connect(**PG_PARAMS)
+        query_pool.check_ids("postgres", conn.cursor())
+        conn.close()
+
+    if EXECUTION_MODE == "async":
+        header, results, samples = asyncio.run(run_async(sql_files))
+    else:
+        header, results, samples = run_sync(sql_files)
+
+    # ---------------------------------------
+    # 4. Save results to CSV
+    # ---------------------------------------
+    with open(OUTPUT_FILE, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(results)
+
+    if samples:
+        with open(SAMPLES_FILE, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["query_file", "run", "latency_ms"])
+            writer.writerows(samples)
+
+    print("\n===================================")
+    print(" ALL QUERIES COMPLETE!")
+    print(f" Results saved to {OUTPUT_FILE}" + (f" (raw samples in {SAMPLES_FILE})" if samples else ""))
+    print("===================================\n")
@@ -0,0 +1,176 @@
+import json
+import re
+import time
+
+# Phase-level timing for one query execution, so client-side fetch/decode cost
+# can be separated from server work:
+#   Connect_MS      opening the connection the profiled run uses
+#   Execute_MS      execute() until the first result set is ready
+#   First_Row_MS    fetching the first row
+#   Fetch_MS        fetching the remaining rows (the driver decodes values as it
+#                   fetches them, so decoding is part of First_Row_MS / Fetch_MS;
+#                   neither driver exposes it as a phase of its own)
+#   Rows, Bytes     rows and approximate payload bytes transferred (sized after
+#                   the timed run, so the profiler's own work is not in any phase)
+#   Server_Elapsed_MS / Server_CPU_MS / Parse_Compile_MS   as reported by the server
+#   Client_Overhead_MS   client total minus server elapsed
+# SQL Server times come from SET STATISTICS TIME messages on the same run;
+# PostgreSQL times come from a separate EXPLAIN (ANALYZE, TIMING) run, since
+# the server does not report them for a normal execution.
+
+PROFILE_COLUMNS = [
+    "Connect_MS", "Execute_MS", "First_Row_MS", "Fetch_MS", "Rows", "Bytes",
+    "Server_Elapsed_MS", "Server_CPU_MS", "Parse_Compile_MS", "Client_Overhead_MS",
+]
+
+EXEC_TIMES = re.compile(r"SQL Server Execution Times:\s*CPU time = (\d+) ms,\s*elapsed time = (\d+) ms")
+COMPILE_TIMES = re.compile(r"parse and compile time:\s*CPU time = (\d+) ms,\s*elapsed time = (\d+) ms")
+
+def value_bytes(value):
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return 8
+
+def ms_since(t0):
+    return (time.perf_counter() - t0) * 1000
+
+def fetch_phases(cursor, first_row):
+    """Fetches the rest of the current result set; returns (fetch ms, all rows including `first_row`)."""
+    t0 = time.perf_counter()
+    rows = cursor.fetchall()
+    fetch_ms = ms_since(t0)
+    if first_row is not None:
+        rows = [first_row] + list(rows)
+    return fetch_ms, rows
+
+def payload_bytes(rows):
+    """Approximate bytes in `rows`; call outside the timed section."""
+    return sum(value_bytes(v) for row in rows for v in tuple(row))
+
+def sqlserver_messages(cursor):
+    return [str(m[1]) for m in (getattr(cursor, "messages", None) or [])]
+
+def parse_sqlserver_times(messages):
+    """Sums the STATISTICS TIME messages: (elapsed ms, cpu ms, parse/compile ms)."""
+    text = "\n".join(messages)
+    execs = [(int(cpu), int(elapsed)) for cpu, elapsed in EXEC_TIMES.findall(text)]
+    compiles = [int(elapsed) for _, elapsed in COMPILE_TIMES.findall(text)]
+    if not execs:
+        return None, None, sum(compiles) if compiles else None
+    return sum(e for _, e in execs), sum(c for c, _ in execs), sum(compiles)
+
+def sqlserver_times(cursor, sql, *params):
+    """
+    Executes `sql` on a cursor that has SET STATISTICS TIME ON, discarding its
+    results; returns (elapsed ms, cpu ms, parse/compile ms) from the messages.
+    """
+    messages = []
+    cursor.execute(sql, *params)
+    while True:
+        messages += sqlserver_messages(cursor)
+        if cursor.description:
+            cursor.fetchall()
+        if not cursor.nextset():
+            break
+    return parse_sqlserver_times(messages)
+
+def profile_sqlserver(connect, sql):
+    """
+    Profiles one execution of `sql` on a fresh pyodbc connection from connect().
+    Handles multi-statement batches (DECLARE / SET / PRINT before the SELECT).
+    """
+    t0 = time.perf_counter()
+    conn = connect()
+    connect_ms = ms_since(t0)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SET STATISTICS TIME ON;")
+        messages = []
+
+        t_total = time.perf_counter()
+        t0 = time.perf_counter()
+        cursor.execute(sql)
+        messages += sqlserver_messages(cursor)
+        while not cursor.description and cursor.nextset():
+            messages += sqlserver_messages(cursor)
+        execute_ms = ms_since(t0)
+
+        first_row_ms, fetch_ms, fetched = 0.0, 0.0, []
+        if cursor.description:
+            t0 = time.perf_counter()
+            first = cursor.fetchone()
+            first_row_ms = ms_since(t0)
+            fetch_ms, fetched = fetch_phases(cursor, first)
+        messages += sqlserver_messages(cursor)
+        while cursor.nextset():
+            messages += sqlserver_messages(cursor)
+        total_ms = ms_since(t_total)
+    finally:
+        conn.close()
+    rows, payload = len(fetched), payload_bytes(fetched)
+
+    server_elapsed, server_cpu, compile_ms = parse_sqlserver_times(messages)
+    return phase_row(connect_ms, execute_ms, first_row_ms, fetch_ms, rows, payload,
+                     server_elapsed, server_cpu, compile_ms, total_ms)
+
+def profile_postgres(connect, sql):
+    """
+    Profiles one execution of `sql` on a fresh psycopg2 connection from
+    connect(), then runs EXPLAIN (ANALYZE, TIMING) on it for server times.
+    """
+    t0 = time.perf_counter()
+    conn = connect()
+    connect_ms = ms_since(t0)
+    try:
+        cursor = conn.cursor()
+        t_total = time.perf_counter()
+        t0 = time.perf_counter()
+        cursor.execute(sql)
+        execute_ms = ms_since(t0)
+
+        first_row_ms, fetch_ms, fetched = 0.0, 0.0, []
+        if cursor.description:
+            t0 = time.perf_counter()
+            first = cursor.fetchone()
+            first_row_ms = ms_since(t0)
+            fetch_ms, fetched = fetch_phases(cursor, first)
+        total_ms = ms_since(t_total)
+        conn.commit()
+        rows, payload = len(fetched), payload_bytes(fetched)
+
+        server_elapsed, compile_ms = None, None
+        try:
+            cursor.execute("EXPLAIN (ANALYZE, TIMING, FORMAT JSON) " + sql.strip().rstrip(";"))
+            plan = cursor.fetchone()[0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            server_elapsed = plan[0].get("Execution Time")
+            compile_ms = plan[0].get("Planning Time")
+        except Exception:
+            conn.rollback()
+        conn.commit()
+    finally:
+        conn.close()
+
+    return phase_row(connect_ms, execute_ms, first_row_ms, fetch_ms, rows, payload,
+                     server_elapsed, None, compile_ms, total_ms)
+
+def phase_row(connect_ms, execute_ms, first_row_ms, fetch_ms, rows, payload,
+              server_elapsed, server_cpu, compile_ms, total_ms):
+    r = lambda v: round(v, 3) if v is not None else None
+    server_total = None if server_elapsed is None else server_elapsed + (compile_ms or 0)
+    return {
+        "Connect_MS": r(connect_ms),
+        "Execute_MS": r(execute_ms),
+        "First_Row_MS": r(first_row_ms),
+        "Fetch_MS": r(fetch_ms),
+        "Rows": rows,
+        "Bytes": payload,
+        "Server_Elapsed_MS": r(server_elapsed),
+        "Server_CPU_MS": r(server_cpu),
+        "Parse_Compile_MS": r(compile_ms),
+        "Client_Overhead_MS": r(total_ms - server_total) if server_total is not None else None,
+    }
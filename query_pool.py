@@ -0,0 +1,143 @@
+import numpy as np
+import os
+import re
+
+import embedding_cache
+
+# --- Configuration ---
+POOL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_pool.npz") # next to this file, so postgres/run_all.py finds it too
+POOL_SIZE = 200 # vectors sampled per table
+SEED = 42
+MODE = "single" # "single" = one query vector, "batch" = BATCH_SIZE independent vectors, "multi" = one group of TARGETS vectors
+BATCH_SIZE = 20
+TARGETS = 2 # vectors per group in "multi" mode (NQ16 / NQ18 use two)
+# ---------------------
+# A fixed, seeded sample of query vectors shared by every runner, so SQL Server
+# and PostgreSQL (and repeated runs) query with the same vectors. The pool is
+# drawn from the embedding cache (no table scan) and stored in POOL_FILE as
+#   {name}_ids      int64 ids, in draw order
+#   {name}_vectors  float32 (POOL_SIZE, DIM), row i is the embedding of ids[i]
+#   {name}_snapshot the embedding_cache snapshot it was sampled from
+# Delete POOL_FILE (or change SEED / POOL_SIZE) to draw a new pool. Runners call check_ids()
+# once per engine, so a database that lacks some pool ids fails loudly.
+
+def build_pool(cursor=None):
+    arrays = {}
+    rng = np.random.default_rng(SEED)
+    for name in embedding_cache.TABLES:
+        ids, vectors = embedding_cache.load_cache(name, cursor)
+        picks = rng.choice(len(ids), size=min(POOL_SIZE, len(ids)), replace=False)
+        order = np.argsort(picks, kind="stable")
+        rows = np.empty_like(picks)
+        rows[order] = np.arange(len(picks))
+        # Read the mmap in ascending row order, then restore the draw order
+        sorted_vectors = np.asarray(vectors[picks[order]], dtype=np.float32)
+        arrays[f"{name}_ids"] = ids[picks]
+        arrays[f"{name}_vectors"] = sorted_vectors[rows]
+        arrays[f"{name}_snapshot"] = np.array(embedding_cache.snapshot_id(name))
+    np.savez(POOL_FILE, seed=np.array(SEED), **arrays)
+    counts = ", ".join(f"{len(arrays[name + '_ids'])} {name}" for name in embedding_cache.TABLES)
+    print(f"Query pool written to {POOL_FILE} ({counts} vectors).")
+
+def load_pool(cursor=None):
+    """{name: (ids, vectors)}; samples the pool from the embedding cache the first time."""
+    if not os.path.exists(POOL_FILE):
+        build_pool(cursor)
+    with np.load(POOL_FILE) as data:
+        pool = {name: (data[f"{name}_ids"], data[f"{name}_vectors"]) for name in embedding_cache.TABLES}
+        stale = [name for name in embedding_cache.TABLES
+                 if os.path.exists(embedding_cache.cache_paths(name)[2])
+                 and str(data[f"{name}_snapshot"]) != embedding_cache.snapshot_id(name)]
+    if stale:
+        print(f"Warning: query pool was sampled from an older snapshot of {stale}; some ids may no longer exist.")
+    return pool
+
+def draw(name, mode=MODE, n=None, offset=0, pool=None):
+    """
+    Groups of (ids, vectors) from the pool, starting at entry `offset`:
+      single  [one vector]
+      batch   n groups of one vector each (default BATCH_SIZE)
+      multi   [one group of n vectors] (default TARGETS)
+    """
+    ids, vectors = (pool or load_pool())[name]
+    if mode == "single":
+        spans = [(offset, offset + 1)]
+    elif mode == "batch":
+        spans = [(offset + i, offset + i + 1) for i in range(n or BATCH_SIZE)]
+    elif mode == "multi":
+        spans = [(offset, offset + (n or TARGETS))]
+    else:
+        raise ValueError(f"Unknown pool mode '{mode}'")
+    if spans[-1][1] > len(ids):
+        raise ValueError(f"Query pool has {len(ids)} '{name}' vectors, {spans[-1][1]} needed; raise POOL_SIZE")
+    return [(ids[lo:hi], vectors[lo:hi]) for lo, hi in spans]
+
+# --- Pinning the workload scripts to pool vectors ---
+# Both workloads pick their query vector as the first (or, for the second
+# target of NQ16 / NQ18, the last) row by id, or a random row (SQ10):
+#   SELECT TOP 1 @query_vector = text_embedding FROM dbo.text ORDER BY old_id;
+#   SELECT text_embedding FROM text WHERE text_embedding IS NOT NULL ORDER BY old_id LIMIT 1
+# pin() rewrites those picks into id lookups on pool vectors: ascending picks
+# get slot 0 of the group, DESC picks slot 1, random picks slot 0.
+
+ID_COLUMNS = {"text": "old_id", "page": "page_id"}
+
+VECTOR_PICK = re.compile(
+    r"FROM\s+((?:dbo\.)?(text|page))\s+"
+    r"(?:WHERE\s+\w+_embedding\s+IS\s+NOT\s+NULL\s+)?"
+    r"ORDER\s+BY\s+(old_id|page_id|random\(\)|NEWID\(\))(\s+DESC)?(?=\s*(?:;|LIMIT\s+1\b))",
+    re.IGNORECASE,
+)
+
+def sql_groups(mode=MODE, n=None, pool=None):
+    """
+    [{table: [slot 0 id, slot 1 id]}] for pin(): one group in single mode,
+    n (default BATCH_SIZE) disjoint groups in batch mode. Group g holds pool
+    entries 2g and 2g + 1, the same vectors recall.py uses for group g.
+    """
+    pool = pool or load_pool()
+    count = 1 if mode in ("single", "multi") else (n or BATCH_SIZE)
+    groups = []
+    for g in range(count):
+        groups.append({name: [int(i) for i in draw(name, "multi", 2, 2 * g, pool)[0][0]] for name in pool})
+    return groups
+
+CHECKED = {} # engine -> pool file mtime its ids were last checked against
+
+def check_ids(engine, cursor, pool=None):
+    """
+    Raises ValueError if any pool id is missing from `engine`'s tables. The pool
+    is drawn from the SQL Server embedding cache; a pinned id the other database
+    lacks would silently turn a query into a 0-row lookup. Checked once per pool file.
+    """
+    pool = pool or load_pool()
+    stamp = os.path.getmtime(POOL_FILE)
+    if CHECKED.get(engine) == stamp:
+        return
+    for name, (ids, _) in pool.items():
+        wanted = sorted({int(i) for i in ids})
+        table = f"dbo.{name}" if engine == "sqlserver" else name
+        cursor.execute(f"SELECT {ID_COLUMNS[name]} FROM {table} WHERE {ID_COLUMNS[name]} IN ({', '.join(map(str, wanted))})")
+        missing = sorted(set(wanted) - {int(r[0]) for r in cursor.fetchall()})
+        if missing:
+            raise ValueError(f"{len(missing)} of {len(wanted)} pool '{name}' ids are missing on {engine} "
+                             f"(e.g. {missing[:5]}); the pool must be drawn from data both engines hold")
+    CHECKED[engine] = stamp
+
+def pin(sql, group):
+    """`sql` with its first/last-row vector picks replaced by the group's pool ids."""
+    def replace(m):
+        table_ref, name, desc = m.group(1), m.group(2).lower(), m.group(4)
+        return f"FROM {table_ref} WHERE {ID_COLUMNS[name]} = {group[name][1 if desc else 0]}"
+    return VECTOR_PICK.sub(replace, sql)
+
+if __name__ == "__main__":
+    import pyodbc
+
+    conn = pyodbc.connect(embedding_cache.conn_str)
+    cursor = conn.cursor()
+    if os.path.exists(POOL_FILE):
+        os.remove(POOL_FILE)
+    for name, (ids, vectors) in load_pool(cursor).items():
+        print(f"{name}: {len(ids)} vectors, first ids {ids[:5].tolist()}")
+    conn.close()
@@ -3,7 +3,7 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 
 # --- Configuration ---
-INPUT_FILE = "recall_comparision.csv" # Ensure your data is in this file
+INPUT_FILE = "recall_comparision.csv" # Ensure your data is in this file (benchmark_results.csv from bench_runner.py also works)
 # ---------------------
 
 def plot_comparison():
@@ -13,6 +13,9 @@ def plot_comparison():
         print(f"Error: Could not find '{INPUT_FILE}'. Please create it with your data first.")
         return
 
+    # benchmark_results.csv (bench_runner.py) also has latency-only rows; keep the recall ones
+    df = df.dropna(subset=["Recall", "K"])
+
     # Set the visual style
     sns.set_theme(style="whitegrid")
     
@@ -22,7 +25,7 @@ def plot_comparison():
 
     # --- 1. LATENCY COMPARISON (Lower is Better) ---
     g1 = sns.catplot(
-        data=df, 
+        data=df.dropna(subset=["Latency"]), # single-probe recall.py rows have no per-K latency
         x="K", 
         y="Latency", 
         hue="System", 
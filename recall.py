@@ -2,34 +2,328 @@ import pyodbc
 import time
 import pandas as pd
 import random
+import json
+import re
+import numpy as np
+
+import embedding_cache
+import exact_knn
+import gt_cache
+import profiling
+import query_pool
 
 # --- Configuration ---
 SERVER = "localhost"
 DATABASE = "index_hybench_100k" # <--- The script ensures we use this DB
 OUTPUT_FILE = "recall_results.csv"
 K_VALUES = [10, 20, 30, 50, 100, 200]
+QUERY_VECTORS = "pool" # "pool" = the seeded vectors shared with the other runners (query_pool.py), "random" = a new draw every run
+USE_EMBEDDING_CACHE = True # sample query vectors from the local float32 cache instead of CAST(... AS VARCHAR(MAX)) scans
+GT_SOURCE = "local" # "local" = exact_knn over the embedding cache, "sql" = the ORDER BY VECTOR_DISTANCE full scans ("gt")
+GT_DEPTH = 2 * max(K_VALUES) # exact ranking depth computed (and cached) per query vector; NQ18 needs 2k
+MEASURE_SCAN_LATENCY = True # with local ground truth, still run the SQL "gt" scan to time it for the Acceleration column (plot_graphs.py draws it)
+PROBE_MODE = "single" # "single" = one index call at max(K) per query, recall@K from its prefixes; "per_k" = one call per K
+PER_K_LATENCY = False # in single mode, also time the per-K index query so Index_Latency_MS stays per K
+COMPARISON_FILE = "recall_comparision.csv" # SQL Server rows refreshed here for rec_plots.py / plots/slide9.py (None to skip)
+COMPARISON_LABELS = {"NQ11": "Q9", "NQ13": "Q11", "IQ1": "Q16", "NQ16": "Q36", "NQ18": "Q37"} # labels used in the comparison CSV
+BIND_VECTORS = True # pass query vectors as parameters (DECLAREd once per batch) instead of inlining 384-float literals
+COMPILE_FILE = "compile_savings.csv" # single mode: parse/compile time of literal vs bound SQL for fresh vectors (None to skip)
 # ---------------------
 
+K_MAX = max(K_VALUES)
+
 conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={SERVER};DATABASE={DATABASE};Trusted_Connection=yes;"
 
-def get_vectors(cursor):
-    """Fetches 2 random vectors to use for queries."""
-    print("Fetching random query vectors...", end=" ")
+def get_vectors(cursor, group=0):
+    """Fetches 2 query vectors: pool group `group`, or 2 random ones."""
+    print("Fetching query vectors...", end=" ")
+    if QUERY_VECTORS == "pool":
+        _, vectors = query_pool.draw("text", "multi", 2, 2 * group, query_pool.load_pool(cursor))[0]
+        print("Done (pool).")
+        return embedding_cache.to_json(vectors[0]), embedding_cache.to_json(vectors[1])
+    if USE_EMBEDDING_CACHE:
+        _, vectors = embedding_cache.load_cache("text", cursor)
+        i, j = random.sample(range(len(vectors)), 2)
+        print("Done (cache).")
+        return embedding_cache.to_json(vectors[i]), embedding_cache.to_json(vectors[j])
     cursor.execute("SELECT TOP 2 CAST(text_embedding AS VARCHAR(MAX)) FROM dbo.text ORDER BY NEWID()")
     rows = cursor.fetchall()
     print("Done.")
     return rows[0][0], rows[1][0]
 
-def get_page_vector(cursor):
-    """Fetches 1 random page vector for NQ11."""
+def get_page_vector(cursor, group=0):
+    """Fetches 1 page vector for NQ11: pool group `group`, or a random one."""
+    if QUERY_VECTORS == "pool":
+        _, vectors = query_pool.draw("page", "single", offset=2 * group, pool=query_pool.load_pool(cursor))[0]
+        return embedding_cache.to_json(vectors[0])
+    if USE_EMBEDDING_CACHE:
+        _, vectors = embedding_cache.load_cache("page", cursor)
+        return embedding_cache.to_json(vectors[random.randrange(len(vectors))])
     cursor.execute("SELECT TOP 1 CAST(page_embedding AS VARCHAR(MAX)) FROM dbo.page ORDER BY NEWID()")
     return cursor.fetchone()[0]
 
+def exact_ranking(table, query_vectors, shape="knn"):
+    """Top GT_DEPTH exact ids, computed once per query vector and served from gt_cache for every K."""
+    return gt_cache.ranking(table, query_vectors, shape, GT_DEPTH)
+
+VECTOR_VARS = re.compile(r"@(v1|v2|vp)\b")
+
+def bind(sql, vectors, bound=BIND_VECTORS):
+    """
+    Resolves the @v1 / @v2 / @vp references in `sql` against `vectors`
+    ({"v1": json, ...}); returns (sql, params).
+    Bound: each vector used is sent once as a parameter and DECLAREd, so the
+    statement text is the same for every vector and its plan is reused.
+    Literal: the JSON text is inlined as CAST('[...]' AS VECTOR(384)) at every use.
+    """
+    names = list(dict.fromkeys(VECTOR_VARS.findall(sql)))
+    if not bound:
+        return VECTOR_VARS.sub(lambda m: f"CAST('{vectors[m.group(1)]}' AS VECTOR(384))", sql), []
+    # CAST to NVARCHAR(MAX) pins the parameter type whatever length the driver binds it with
+    prelude = "".join(f"DECLARE @{n} VECTOR(384) = CAST(CAST(? AS NVARCHAR(MAX)) AS VECTOR(384));\n" for n in names)
+    return "SET NOCOUNT ON;\n" + prelude + sql, [vectors[n] for n in names]
+
+def fetch_rows(cursor, sql, vectors, bound=BIND_VECTORS):
+    """Executes `sql` with its vectors bound (or inlined); returns the rows of its result set."""
+    text, params = bind(sql, vectors, bound)
+    cursor.execute(text, *params)
+    while not cursor.description and cursor.nextset():
+        pass
+    return cursor.fetchall()
+
 def calculate_recall(gt_ids, idx_ids):
     if not gt_ids: return 0.0
     overlap = len(gt_ids.intersection(idx_ids))
     return (overlap / len(gt_ids)) * 100.0
 
+def build_queries(k, q_text_1=None, q_text_2=None, q_page=None):
+    """
+    Per-K query set: local / SQL ground truth and the index query at TOP_N=k.
+    The SQL refers to the query vectors as @v1 / @v2 / @vp; see bind().
+    """
+    # --- QUERY DICTIONARY (Updated with Quotes & Fixes) ---
+    return [
+        # --- Q1: Standard k-NN ---
+        {
+            "name": "Q1",
+            "local": lambda: exact_ranking("text", [q_text_1])[:k],
+            "gt": f"SELECT TOP {k} old_id FROM dbo.text ORDER BY VECTOR_DISTANCE('cosine', @v1, text_embedding) ASC",
+            "idx": f"SELECT old_id FROM VECTOR_SEARCH(TABLE=dbo.text, COLUMN=text_embedding, SIMILAR_TO=@v1, METRIC='cosine', TOP_N={k})"
+        },
+
+        # --- NQ11: Aggregation on Page k-NN ---
+        {
+            "name": "NQ11",
+            "local": lambda: exact_ranking("page", [q_page])[:k],
+            "gt": f"SELECT TOP {k} page_id FROM dbo.page ORDER BY VECTOR_DISTANCE('cosine', @vp, page_embedding) ASC",
+            "idx": f"SELECT page_id FROM VECTOR_SEARCH(TABLE=dbo.page, COLUMN=page_embedding, SIMILAR_TO=@vp, METRIC='cosine', TOP_N={k})"
+        },
+
+        # --- NQ13: Aggregation on Text k-NN ---
+        {
+            "name": "NQ13",
+            "local": lambda: exact_ranking("text", [q_text_1])[:k],
+            "gt": f"SELECT TOP {k} old_id FROM dbo.text ORDER BY VECTOR_DISTANCE('cosine', @v1, text_embedding) ASC",
+            "idx": f"SELECT old_id FROM VECTOR_SEARCH(TABLE=dbo.text, COLUMN=text_embedding, SIMILAR_TO=@v1, METRIC='cosine', TOP_N={k})"
+        },
+
+        # --- NQ16: Multi-Target (Union) ---
+        {
+            "name": "NQ16",
+            "local": lambda: exact_ranking("text", [q_text_1, q_text_2], "least")[:k],
+            "gt": f"""
+                SELECT TOP {k} old_id FROM dbo.text 
+                ORDER BY LEAST(
+                    VECTOR_DISTANCE('cosine', @v1, text_embedding),
+                    VECTOR_DISTANCE('cosine', @v2, text_embedding)
+                ) ASC
+            """,
+            "idx": f"""
+                SELECT TOP {k} t.old_id FROM (
+                    SELECT old_id, distance FROM VECTOR_SEARCH(TABLE=dbo.text, COLUMN=text_embedding, SIMILAR_TO=@v1, METRIC='cosine', TOP_N={k})
+                    UNION ALL
+                    SELECT old_id, distance FROM VECTOR_SEARCH(TABLE=dbo.text, COLUMN=text_embedding, SIMILAR_TO=@v2, METRIC='cosine', TOP_N={k})
+                ) t ORDER BY t.distance ASC
+            """
+        },
+
+        # --- NQ18: Exclusion ---
+        {
+            "name": "NQ18",
+            "local": lambda: exact_knn.exclude_ranked(exact_ranking("text", [q_text_1]), exact_ranking("text", [q_text_2]), k),
+            "gt": f"""
+                SELECT TOP {k} old_id FROM dbo.text 
+                WHERE old_id NOT IN (
+                    SELECT TOP {k} old_id FROM dbo.text ORDER BY VECTOR_DISTANCE('cosine', @v2, text_embedding) ASC
+                )
+                ORDER BY VECTOR_DISTANCE('cosine', @v1, text_embedding) ASC
+            """,
+            "idx": f"""
+                SELECT TOP {k} t.old_id FROM VECTOR_SEARCH(TABLE=dbo.text AS t, COLUMN=text_embedding, SIMILAR_TO=@v1, METRIC='cosine', TOP_N={k*2}) s
+                WHERE t.old_id NOT IN (
+                    SELECT t2.old_id FROM VECTOR_SEARCH(TABLE=dbo.text AS t2, COLUMN=text_embedding, SIMILAR_TO=@v2, METRIC='cosine', TOP_N={k}) s2
+                )
+                ORDER BY s.distance ASC
+            """
+        },
+
+        # --- IQ1: Pagination ---
+        # Logic: Fetch the LAST 10 items ending at rank K
+        {
+            "name": "IQ1",
+            "local": lambda: exact_ranking("text", [q_text_1])[k-10 if k>=10 else 0:k],
+            "gt": f"""
+                SELECT old_id FROM dbo.text 
+                ORDER BY VECTOR_DISTANCE('cosine', @v1, text_embedding) ASC
+                OFFSET {k-10 if k>=10 else 0} ROWS FETCH NEXT 10 ROWS ONLY
+            """,
+            "idx": f"""
+                SELECT t.old_id FROM VECTOR_SEARCH(TABLE=dbo.text AS t, COLUMN=text_embedding, SIMILAR_TO=@v1, METRIC='cosine', TOP_N={k}) s
+                ORDER BY s.distance ASC, t.old_id ASC
+                OFFSET {k-10 if k>=10 else 0} ROWS FETCH NEXT 10 ROWS ONLY
+            """
+        }
+    ]
+
+def probe_sql(table, id_col, emb_col, var, top_n, src):
+    return (
+        f"SELECT t.{id_col} AS id, s.distance AS distance, {src} AS src "
+        f"FROM VECTOR_SEARCH(TABLE={table} AS t, COLUMN={emb_col}, SIMILAR_TO={var}, METRIC='cosine', TOP_N={top_n}) s"
+    )
+
+def build_probes():
+    """
+    One index call per query at K_MAX. Each probe returns (id, distance, src)
+    ordered by src, distance, id; `derive` turns the per-src candidate lists
+    into the result the per-K index query would return at a smaller K.
+    """
+    text = lambda var, top_n, src=1: probe_sql("dbo.text", "old_id", "text_embedding", var, top_n, src)
+    page = lambda var, top_n, src=1: probe_sql("dbo.page", "page_id", "page_embedding", var, top_n, src)
+    ids = lambda cands: [i for i, _ in cands]
+    return {
+        "Q1": (text("@v1", K_MAX), lambda c, k: ids(c[1][:k])),
+        "NQ11": (page("@vp", K_MAX), lambda c, k: ids(c[1][:k])),
+        "NQ13": (text("@v1", K_MAX), lambda c, k: ids(c[1][:k])),
+        # TOP k over the UNION ALL of both TOP_N=k searches
+        "NQ16": (
+            text("@v1", K_MAX) + " UNION ALL " + text("@v2", K_MAX, 2),
+            lambda c, k: ids(sorted(c[1][:k] + c[2][:k], key=lambda x: x[1])[:k]),
+        ),
+        # First k of the TOP_N=2k search for vec 1 that are not in the TOP_N=k search for vec 2
+        "NQ18": (
+            text("@v1", 2 * K_MAX) + " UNION ALL " + text("@v2", K_MAX, 2),
+            lambda c, k: exact_knn.exclude_ranked(ids(c[1]), ids(c.get(2, [])), k),
+        ),
+        "IQ1": (text("@v1", K_MAX), lambda c, k: ids(c[1][k-10 if k>=10 else 0:k])),
+    }
+
+def run_probe(cursor, sql, vectors):
+    """Runs one probe; returns ({src: [(id, distance), ...]}, ms)."""
+    t0 = time.time()
+    rows = fetch_rows(cursor, sql + " ORDER BY src, distance, id", vectors)
+    ms = (time.time() - t0) * 1000
+    cands = {1: []}
+    for row_id, distance, src in rows:
+        cands.setdefault(src, []).append((row_id, distance))
+    return cands, ms
+
+def ground_truth(cursor, q, vectors):
+    """(gt id set, SQL full-scan ms or None) for one query at one K."""
+    gt_ms = None
+    if GT_SOURCE == "local":
+        gt_ids = set(q['local']())
+    if GT_SOURCE == "sql" or MEASURE_SCAN_LATENCY:
+        t0 = time.time()
+        scan_ids = set(row[0] for row in fetch_rows(cursor, q['gt'], vectors))
+        gt_ms = (time.time() - t0) * 1000
+        if GT_SOURCE == "sql":
+            gt_ids = scan_ids
+    return gt_ids, gt_ms
+
+def timed_ids(cursor, sql, vectors):
+    t0 = time.time()
+    ids = set(row[0] for row in fetch_rows(cursor, sql, vectors))
+    return ids, (time.time() - t0) * 1000
+
+def result_row(name, k, recall, idx_ms, gt_ms, probe_k):
+    # A probe at another K is not this K's latency: it goes in Probe_Latency_MS only, and
+    # Acceleration against it is a lower bound (the K_MAX probe is the slowest one)
+    accel = gt_ms / idx_ms if gt_ms is not None and idx_ms > 0 else None
+    print(f"  {name} K={k}: Recall: {recall:.1f}%" + (f", Accel: {accel:.1f}x" if accel is not None else ""))
+    return {
+        "Query": name,
+        "K": k,
+        "Recall_Pct": round(recall, 2),
+        "Index_Latency_MS": round(idx_ms, 2) if probe_k == k else None,
+        "Probe_Latency_MS": round(idx_ms, 2),
+        "Exact_Latency_MS": round(gt_ms, 2) if gt_ms is not None else None,
+        "Acceleration": round(accel, 2) if accel is not None else None,
+        "GT_Source": GT_SOURCE,
+        "Probe_K": probe_k,
+    }
+
+def fresh_vectors(cursor, group=0):
+    vec_text_1, vec_text_2 = get_vectors(cursor, group)
+    return {"v1": vec_text_1, "v2": vec_text_2, "vp": get_page_vector(cursor, group)}
+
+def compile_savings(cursor, probes):
+    """
+    Parse/compile time per probe for a vector set the server has not seen,
+    literal vs bound (SET STATISTICS TIME). The bound statement is run once
+    on another vector set first, as it would have been earlier in a run.
+    """
+    warm, fresh = fresh_vectors(cursor, 1), fresh_vectors(cursor, 2)
+    rows = []
+    cursor.execute("SET STATISTICS TIME ON;")
+    try:
+        for name, (sql, _) in probes.items():
+            sql += " ORDER BY src, distance, id"
+            fetch_rows(cursor, sql, warm, bound=True)
+            literal_sql, _ = bind(sql, fresh, bound=False)
+            bound_sql, params = bind(sql, fresh, bound=True)
+            literal_compile = profiling.sqlserver_times(cursor, literal_sql)[2]
+            bound_compile = profiling.sqlserver_times(cursor, bound_sql, *params)[2]
+            saved = literal_compile - bound_compile if None not in (literal_compile, bound_compile) else None
+            print(f"  {name}: compile {literal_compile} ms literal vs {bound_compile} ms bound")
+            rows.append({
+                "Query": name,
+                "Literal_Compile_MS": literal_compile,
+                "Bound_Compile_MS": bound_compile,
+                "Saved_Compile_MS": saved,
+                "Literal_SQL_Bytes": len(literal_sql.encode("utf-8")),
+                "Bound_SQL_Bytes": len(bound_sql.encode("utf-8")) + sum(len(p.encode("utf-8")) for p in params),
+            })
+    finally:
+        cursor.execute("SET STATISTICS TIME OFF;")
+    return rows
+
+def save_comparison(results):
+    """
+    Replaces the SQL Server rows of COMPARISON_FILE (read by rec_plots.py and
+    plots/slide9.py). Rows without a per-K latency keep the one already in the file.
+    """
+    if not COMPARISON_FILE:
+        return
+    rows = pd.DataFrame([{
+        "System": "SQL Server",
+        "Query": COMPARISON_LABELS.get(r["Query"], r["Query"]),
+        "K": r["K"],
+        "Recall": r["Recall_Pct"],
+        # A single probe at K_MAX has one latency for every K; leave it out rather than plot a flat line
+        "Latency": r["Index_Latency_MS"],
+    } for r in results])
+    try:
+        existing = pd.read_csv(COMPARISON_FILE)
+        replaced = (existing["System"] == "SQL Server") & existing["Query"].isin(rows["Query"])
+        keys = ["System", "Query", "K"]
+        kept = rows.merge(existing.loc[replaced, keys + ["Latency"]], on=keys, how="left", suffixes=("", "_old"))
+        rows = kept.assign(Latency=kept["Latency"].fillna(kept["Latency_old"])).drop(columns="Latency_old")
+        rows = pd.concat([existing[~replaced], rows], ignore_index=True)
+    except FileNotFoundError:
+        pass
+    rows.to_csv(COMPARISON_FILE, index=False)
+    print(f"SQL Server rows updated in {COMPARISON_FILE}")
+
 def run_benchmark():
     conn = pyodbc.connect(conn_str)
     conn.autocommit = True
@@ -44,131 +338,61 @@ def run_benchmark():
         print("Already enabled or failed (ignoring).")
 
     # 2. Get Query Vectors
-    vec_text_1, vec_text_2 = get_vectors(cursor)
-    vec_page = get_page_vector(cursor)
+    vectors = fresh_vectors(cursor)
+    vec_text_1, vec_text_2, vec_page = vectors["v1"], vectors["v2"], vectors["vp"]
 
+    qv = {}
+    if GT_SOURCE == "local":
+        # Validate both caches against the live tables so gt_cache keys on the current snapshot
+        embedding_cache.load_cache("text", cursor)
+        embedding_cache.load_cache("page", cursor)
+        qv = dict(zip(("q_text_1", "q_text_2", "q_page"),
+                      (np.asarray(json.loads(v), dtype=np.float32) for v in (vec_text_1, vec_text_2, vec_page))))
+
+    per_k = {k: build_queries(k, **qv) for k in K_VALUES}
+    probes = build_probes()
     results = []
 
-    for k in K_VALUES[:1]:
-        print(f"\n=== Benchmarking K={k} ===")
-        
-        # --- QUERY DICTIONARY (Updated with Quotes & Fixes) ---
-        queries = [
-            # --- Q1: Standard k-NN ---
-            {
-                "name": "Q1",
-                "gt": f"SELECT TOP {k} old_id FROM dbo.text ORDER BY VECTOR_DISTANCE('cosine', CAST('{vec_text_1}' AS VECTOR(384)), text_embedding) ASC",
-                "idx": f"SELECT old_id FROM VECTOR_SEARCH(TABLE=dbo.text, COLUMN=text_embedding, SIMILAR_TO=CAST('{vec_text_1}' AS VECTOR(384)), METRIC='cosine', TOP_N={k})"
-            },
-            
-            # --- NQ11: Aggregation on Page k-NN ---
-            {
-                "name": "NQ11",
-                "gt": f"SELECT TOP {k} page_id FROM dbo.page ORDER BY VECTOR_DISTANCE('cosine', CAST('{vec_page}' AS VECTOR(384)), page_embedding) ASC",
-                "idx": f"SELECT page_id FROM VECTOR_SEARCH(TABLE=dbo.page, COLUMN=page_embedding, SIMILAR_TO=CAST('{vec_page}' AS VECTOR(384)), METRIC='cosine', TOP_N={k})"
-            },
-
-            # --- NQ13: Aggregation on Text k-NN ---
-            {
-                "name": "NQ13",
-                "gt": f"SELECT TOP {k} old_id FROM dbo.text ORDER BY VECTOR_DISTANCE('cosine', CAST('{vec_text_1}' AS VECTOR(384)), text_embedding) ASC",
-                "idx": f"SELECT old_id FROM VECTOR_SEARCH(TABLE=dbo.text, COLUMN=text_embedding, SIMILAR_TO=CAST('{vec_text_1}' AS VECTOR(384)), METRIC='cosine', TOP_N={k})"
-            },
-
-            # --- NQ16: Multi-Target (Union) ---
-            {
-                "name": "NQ16",
-                "gt": f"""
-                    SELECT TOP {k} old_id FROM dbo.text 
-                    ORDER BY LEAST(
-                        VECTOR_DISTANCE('cosine', CAST('{vec_text_1}' AS VECTOR(384)), text_embedding),
-                        VECTOR_DISTANCE('cosine', CAST('{vec_text_2}' AS VECTOR(384)), text_embedding)
-                    ) ASC
-                """,
-                "idx": f"""
-                    SELECT TOP {k} t.old_id FROM (
-                        SELECT old_id, distance FROM VECTOR_SEARCH(TABLE=dbo.text, COLUMN=text_embedding, SIMILAR_TO=CAST('{vec_text_1}' AS VECTOR(384)), METRIC='cosine', TOP_N={k})
-                        UNION ALL
-                        SELECT old_id, distance FROM VECTOR_SEARCH(TABLE=dbo.text, COLUMN=text_embedding, SIMILAR_TO=CAST('{vec_text_2}' AS VECTOR(384)), METRIC='cosine', TOP_N={k})
-                    ) t ORDER BY t.distance ASC
-                """
-            },
-
-            # --- NQ18: Exclusion ---
-            {
-                "name": "NQ18",
-                "gt": f"""
-                    SELECT TOP {k} old_id FROM dbo.text 
-                    WHERE old_id NOT IN (
-                        SELECT TOP {k} old_id FROM dbo.text ORDER BY VECTOR_DISTANCE('cosine', CAST('{vec_text_2}' AS VECTOR(384)), text_embedding) ASC
-                    )
-                    ORDER BY VECTOR_DISTANCE('cosine', CAST('{vec_text_1}' AS VECTOR(384)), text_embedding) ASC
-                """,
-                "idx": f"""
-                    SELECT TOP {k} t.old_id FROM VECTOR_SEARCH(TABLE=dbo.text AS t, COLUMN=text_embedding, SIMILAR_TO=CAST('{vec_text_1}' AS VECTOR(384)), METRIC='cosine', TOP_N={k*2}) s
-                    WHERE t.old_id NOT IN (
-                        SELECT t2.old_id FROM VECTOR_SEARCH(TABLE=dbo.text AS t2, COLUMN=text_embedding, SIMILAR_TO=CAST('{vec_text_2}' AS VECTOR(384)), METRIC='cosine', TOP_N={k}) s2
-                    )
-                    ORDER BY s.distance ASC
-                """
-            },
-
-            # --- IQ1: Pagination ---
-            # Logic: Fetch the LAST 10 items ending at rank K
-            {
-                "name": "IQ1",
-                "gt": f"""
-                    SELECT old_id FROM dbo.text 
-                    ORDER BY VECTOR_DISTANCE('cosine', CAST('{vec_text_1}' AS VECTOR(384)), text_embedding) ASC
-                    OFFSET {k-10 if k>=10 else 0} ROWS FETCH NEXT 10 ROWS ONLY
-                """,
-                "idx": f"""
-                    SELECT t.old_id FROM VECTOR_SEARCH(TABLE=dbo.text AS t, COLUMN=text_embedding, SIMILAR_TO=CAST('{vec_text_1}' AS VECTOR(384)), METRIC='cosine', TOP_N={k}) s
-                    ORDER BY s.distance ASC, t.old_id ASC
-                    OFFSET {k-10 if k>=10 else 0} ROWS FETCH NEXT 10 ROWS ONLY
-                """
-            }
-        ]
-
-        for q in queries[:1]:
-            print(f"Running {q['name']}...", end=" ", flush=True)
-            
+    if PROBE_MODE == "single":
+        for name, (sql, derive) in probes.items():
+            print(f"\n=== {name}: single probe at K={K_MAX} ===")
             try:
-                # 1. Ground Truth
-                t0 = time.time()
-                cursor.execute(q['gt'])
-                gt_ids = set(row[0] for row in cursor.fetchall())
-                gt_ms = (time.time() - t0) * 1000
-
-                # 2. Index Search
-                t0 = time.time()
-                cursor.execute(q['idx'])
-                idx_ids = set(row[0] for row in cursor.fetchall())
-                idx_ms = (time.time() - t0) * 1000
-
-                # 3. Calculate Stats
-                recall = calculate_recall(gt_ids, idx_ids)
-                accel = gt_ms / idx_ms if idx_ms > 0 else 0
-
-                print(f"Recall: {recall:.1f}%, Accel: {accel:.1f}x")
-
-                results.append({
-                    "Query": q['name'],
-                    "K": k,
-                    "Recall_Pct": round(recall, 2),
-                    "Index_Latency_MS": round(idx_ms, 2),
-                    "Exact_Latency_MS": round(gt_ms, 2),
-                    "Acceleration": round(accel, 2)
-                })
-
+                cands, probe_ms = run_probe(cursor, sql, vectors)
+                print(f"  Probe: {probe_ms:.2f} ms")
+                for k in K_VALUES:
+                    q = next(q for q in per_k[k] if q['name'] == name)
+                    gt_ids, gt_ms = ground_truth(cursor, q, vectors)
+                    idx_ms = timed_ids(cursor, q['idx'], vectors)[1] if PER_K_LATENCY else probe_ms
+                    recall = calculate_recall(gt_ids, set(derive(cands, k)))
+                    results.append(result_row(name, k, recall, idx_ms, gt_ms, k if PER_K_LATENCY else K_MAX))
             except Exception as e:
                 print("FAILED.")
                 print(f"  Error: {e}")
+    else:
+        for k in K_VALUES:
+            print(f"\n=== Benchmarking K={k} ===")
+            for q in per_k[k]:
+                try:
+                    gt_ids, gt_ms = ground_truth(cursor, q, vectors)
+                    idx_ids, idx_ms = timed_ids(cursor, q['idx'], vectors)
+                    results.append(result_row(q['name'], k, calculate_recall(gt_ids, idx_ids), idx_ms, gt_ms, k))
+                except Exception as e:
+                    print("FAILED.")
+                    print(f"  Error: {e}")
 
     # Save Results
     pd.DataFrame(results).to_csv(OUTPUT_FILE, index=False)
     print(f"\nDone! Results saved to {OUTPUT_FILE}")
+    save_comparison(results)
+
+    if PROBE_MODE == "single" and COMPILE_FILE:
+        print("\n=== Parse/compile time: literal vs bound vectors ===")
+        try:
+            pd.DataFrame(compile_savings(cursor, probes)).to_csv(COMPILE_FILE, index=False)
+            print(f"Compile comparison saved to {COMPILE_FILE}")
+        except Exception as e:
+            print(f"  Compile comparison failed: {e}")
     conn.close()
 
 if __name__ == "__main__":
-    run_benchmark()
\ No newline at end of file
+    run_benchmark()
@@ -0,0 +1,158 @@
+import hashlib
+import io
+
+# --- Configuration ---
+FETCH_MODE = "materialize" # "materialize" = fetchall(), "stream" = fetchmany batches, "count" = count rows only, "arrow" = Arrow record batches
+BATCH_SIZE = 5000 # rows per fetchmany() / server-side cursor FETCH
+CHECKSUM = False # materialize/stream: order-sensitive checksum of every row
+# ---------------------
+# How the benchmark runners consume a result set. "materialize" keeps every
+# row in Python (the original behaviour), "stream" pulls BATCH_SIZE rows at a
+# time and drops them, "count" does the same without touching the values.
+# On PostgreSQL, stream/count should be given a named (server-side) cursor so
+# the driver does not buffer the whole result on execute; see pg_cursor().
+# "arrow" skips the cursor entirely and receives Arrow record batches, so no
+# per-row Python tuples are built (optional: pyarrow, plus arrow-odbc for
+# SQL Server); see sqlserver_arrow_batches() / postgres_arrow_batches().
+
+FETCH_MODES = ["materialize", "stream", "count", "arrow"]
+
+def new_checksum():
+    return hashlib.blake2b(digest_size=16)
+
+def update_checksum(h, rows):
+    for row in rows:
+        h.update(repr(tuple(row)).encode("utf-8"))
+        h.update(b"\n")
+
+def consume(cursor, mode=FETCH_MODE, batch_size=BATCH_SIZE, checksum=CHECKSUM):
+    """
+    Consumes the current result set of `cursor`; returns (rows, checksum hex or None).
+    """
+    if mode not in FETCH_MODES:
+        raise ValueError(f"Unknown fetch mode '{mode}', expected one of {FETCH_MODES}")
+    if mode == "arrow":
+        raise ValueError("'arrow' mode does not use a cursor; use consume_arrow()")
+    h = new_checksum() if checksum and mode != "count" else None
+
+    if mode == "materialize":
+        rows = cursor.fetchall()
+        if h:
+            update_checksum(h, rows)
+        return len(rows), h.hexdigest() if h else None
+
+    total = 0
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        total += len(batch)
+        if h:
+            update_checksum(h, batch)
+    return total, h.hexdigest() if h else None
+
+def pg_cursor(conn, mode=FETCH_MODE, batch_size=BATCH_SIZE, name="bench_stream"):
+    """
+    psycopg2 cursor for `mode`: a client cursor for materialize, otherwise a
+    named server-side cursor fetching batch_size rows per round trip.
+    Named cursors only accept a single SELECT and live until the transaction ends.
+    """
+    if mode == "materialize":
+        return conn.cursor()
+    cursor = conn.cursor(name=name)
+    cursor.itersize = batch_size
+    return cursor
+
+# --- Arrow path ---
+
+def import_arrow_odbc():
+    try:
+        import arrow_odbc
+    except ImportError:
+        raise ImportError("'arrow' mode on SQL Server needs arrow-odbc (pip install arrow-odbc)")
+    return arrow_odbc
+
+def sqlserver_arrow_batches(conn_str, sql, batch_size=BATCH_SIZE):
+    """
+    Arrow record batches of the first result set with columns of `sql`, via
+    arrow-odbc, which binds result columns into columnar ODBC buffers. It opens
+    its own connection from conn_str; ODBC connection pooling is enabled so
+    repeated runs reuse it. The batch runs under SET NOCOUNT ON so the
+    USE/DECLARE/ALTER statements ahead of the SELECT send no row counts.
+    """
+    arrow_odbc = import_arrow_odbc()
+    if not getattr(sqlserver_arrow_batches, "pooling", False):
+        arrow_odbc.enable_odbc_connection_pooling()
+        sqlserver_arrow_batches.pooling = True
+    reader = arrow_odbc.read_arrow_batches_from_odbc(query="SET NOCOUNT ON;\n" + sql, connection_string=conn_str, batch_size=batch_size)
+    while reader is not None and len(reader.schema) == 0:
+        if not reader.more_results():
+            reader = None
+    if reader is None:
+        raise ValueError("Query produced no result set with columns")
+    return reader
+
+def split_statements(sql):
+    """
+    The statements of a script, split on ';' outside quotes and comments, with
+    comments removed and empty pieces dropped. For clients that take one
+    statement per call (asyncpg's fetch, named cursors).
+    """
+    statements, current, i, n = [], [], 0, len(sql)
+    while i < n:
+        c = sql[i]
+        if sql.startswith("--", i):
+            i = sql.find("\n", i)
+            i = n if i < 0 else i
+            continue
+        if sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            current.append(" ")
+            continue
+        if c in ("'", '"'):
+            end = i + 1
+            while end < n and (sql[end] != c or sql.startswith(c * 2, end)):
+                end += 2 if sql.startswith(c * 2, end) else 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+            continue
+        if c == ";":
+            statements.append("".join(current).strip())
+            current = []
+        else:
+            current.append(c)
+        i += 1
+    statements.append("".join(current).strip())
+    return [stmt for stmt in statements if stmt]
+
+def copy_query(sql):
+    """`sql` without its trailing ';' (and any comments after it) so it fits in COPY (...)."""
+    head, sep, tail = sql.strip().rpartition(";")
+    if sep and all(not line.strip() or line.strip().startswith("--") for line in tail.splitlines()):
+        return head
+    return sql.strip()
+
+def postgres_arrow_batches(cursor, sql, batch_size=BATCH_SIZE):
+    """
+    Arrow record batches for `sql` on a psycopg2 cursor. The result is
+    shipped with COPY (query) TO STDOUT in CSV and parsed by pyarrow's
+    streaming CSV reader, since pyarrow cannot read PostgreSQL's binary COPY
+    format. Numbers and text get typed columns; pgvector values stay strings.
+    """
+    try:
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        raise ImportError("'arrow' mode needs pyarrow (pip install pyarrow)")
+    buf = io.BytesIO()
+    cursor.copy_expert(f"COPY (\n{copy_query(sql)}\n) TO STDOUT WITH (FORMAT csv, HEADER)", buf)
+    buf.seek(0)
+    # block_size is in bytes; aim for roughly batch_size short rows per block
+    return pa_csv.open_csv(buf, read_options=pa_csv.ReadOptions(block_size=max(1 << 20, batch_size * 256)))
+
+def consume_arrow(batches):
+    """Consumes Arrow record batches without converting them; returns (rows, None)."""
+    total = 0
+    for batch in batches:
+        total += batch.num_rows
+    return total, None
@@ -0,0 +1,239 @@
+import pyodbc
+import psycopg2
+import numpy as np
+import pandas as pd
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fast_load
+import fast_load_pg
+import index_sweep
+import throughput
+
+# --- Configuration ---
+SIZES = [25000, 50000, 100000, 150000, 200000] # rows per table; loaded incrementally, smallest first
+INDEX_TYPES = index_sweep.INDEX_TYPES
+K_VALUES = [10, 100]
+QUERIES = ["Q1"]
+IVFFLAT_ROWS_PER_LIST = 1000 # lists = rows / this (pgvector's guideline up to 1M rows); probes = sqrt(lists)
+BUILD_PARAMS = {"hnsw": {"m": 16, "ef_construction": 64}, "diskann": {"maxdop": 0}}
+QUERY_PARAMS = {"hnsw": {"ef_search": 40}, "diskann": {"overfetch": 1}}
+# Scratch databases with the HyBench schema; their tables are TRUNCATEd at the start
+SQLSERVER_DB = "hybench_scale"
+PG_DB = "hybench_pg_scale"
+MEMORY_POLL_S = 0.05
+OUTPUT_FILE = "scale_results.csv"
+# ---------------------
+# Index build cost as the data grows. Rows are copied from the staging tables
+# fast_load.py reads (SQL Server: fast_load's client path, PostgreSQL:
+# fast_load_pg COPY) into the scratch databases in increments, so every size
+# only loads the rows it adds: increments are rn ranges of the numbered copies
+# fast_load.number_staging() makes once, and every table must hold exactly
+# the size's row count before any index is built. At each size every index
+# type is built once (settings scaled to the size for IVFFlat) and the row
+# records:
+#   Load_S                  seconds to load this size's increment
+#   Build_MS / Index_MB     CREATE INDEX wall time and on-disk size (index_sweep.build_index)
+#   Peak_Memory_MB          peak memory of the build: the largest workspace grant of the
+#                           building session on SQL Server; on PostgreSQL the unique set
+#                           size (USS) of the building backend and its parallel workers,
+#                           i.e. their private memory (maintenance_work_mem, sort and graph
+#                           state) without the shared_buffers pages they touch, which RSS
+#                           would count (psutil, server on this machine and readable by
+#                           this user; empty otherwise)
+#   Recall / Latency_MS     the index_sweep k-NN queries against an exact scan at this size
+# Indexes are dropped again before the next load.
+
+def connect(engine):
+    if engine == "sqlserver":
+        conn = pyodbc.connect(fast_load.conn_str.replace(f"DATABASE={fast_load.DB_NAME}", f"DATABASE={SQLSERVER_DB}"))
+    else:
+        conn = psycopg2.connect(**{**throughput.PG_PARAMS, "dbname": PG_DB})
+    conn.autocommit = True
+    return conn
+
+def truncate(engine, cursor):
+    for table in fast_load.TABLES:
+        cursor.execute(f"TRUNCATE TABLE {'dbo.' if engine == 'sqlserver' else ''}{table}")
+
+def load_increment(engine, conn, lo, hi):
+    """Loads staging rows lo < rn <= hi of every table; returns seconds."""
+    start = time.perf_counter()
+    for table, (stream_sql, insert_sql) in fast_load.TABLES.items():
+        if engine == "sqlserver":
+            fast_load.load_frames(conn, fast_load.read_chunks(stream_sql(lo, hi)), table, insert_sql)
+        else:
+            fast_load_pg.load_table(conn, table, lo, hi)
+    if engine == "postgres":
+        conn.cursor().execute("ANALYZE")
+    return time.perf_counter() - start
+
+def check_rows(engine, cursor, size):
+    """Raises unless every table holds exactly `size` rows (a short or overlapping increment would skew the build)."""
+    for table in fast_load.TABLES:
+        cursor.execute(f"SELECT COUNT(*) FROM {'dbo.' if engine == 'sqlserver' else ''}{table}")
+        count = cursor.fetchone()[0]
+        if count != size:
+            raise ValueError(f"[{engine}] {table} holds {count} rows after loading up to rn {size}; "
+                             f"are there fewer than {size} staging rows?")
+
+def build_params(index_type, rows):
+    if index_type == "ivfflat":
+        lists = max(1, rows // IVFFLAT_ROWS_PER_LIST)
+        return {"lists": lists}, {"probes": max(1, round(math.sqrt(lists)))}
+    return BUILD_PARAMS[index_type], QUERY_PARAMS[index_type]
+
+# --- Peak memory ---
+
+def memory_probe(engine, cursor, monitor=None):
+    """
+    A function returning the building session's current memory in MB (None
+    when nothing is in use), or None. SQL Server is polled on `monitor`, a
+    cursor on a second connection.
+    """
+    if engine == "sqlserver":
+        session = cursor.execute("SELECT @@SPID").fetchone()[0]
+        def probe():
+            monitor.execute("SELECT MAX(max_used_memory_kb) FROM sys.dm_exec_query_memory_grants WHERE session_id = ?", session)
+            used = monitor.fetchone()[0]
+            return used / 1024 if used is not None else None
+        return probe
+    try:
+        import psutil
+    except ImportError:
+        print("PostgreSQL peak memory needs psutil (pip install psutil); skipped")
+        return None
+    cursor.execute("SELECT pg_backend_pid()")
+    backend = cursor.fetchone()[0]
+    def probe():
+        total = 0
+        for proc in psutil.process_iter(["pid", "cmdline"]):
+            cmdline = " ".join(proc.info["cmdline"] or [])
+            if proc.info["pid"] == backend or f"parallel worker for PID {backend}" in cmdline:
+                try:
+                    total += proc.memory_full_info().uss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass # worker exited between listing and reading, or runs as another user
+        return total / (1 << 20) if total else None
+    return probe
+
+def with_peak_memory(probe, run):
+    """(run(), peak MB seen by `probe` while it ran, or None)."""
+    if probe is None:
+        return run(), None
+    done, peaks = threading.Event(), []
+    def sample():
+        while not done.is_set():
+            try:
+                value = probe()
+            except Exception:
+                value = None
+            if value is not None:
+                peaks.append(value)
+            done.wait(MEMORY_POLL_S)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        sampler = executor.submit(sample)
+        try:
+            result = run()
+        finally:
+            done.set()
+            sampler.result()
+    return result, (round(max(peaks), 1) if peaks else None)
+
+# --- Benchmark ---
+
+def scale_engine(engine, index_types):
+    queries = [q for q in QUERIES if engine == "postgres" or q in index_sweep.SQLSERVER_KNN]
+    if not queries:
+        return []
+    conn = connect(engine)
+    cursor = conn.cursor()
+    for name, _ in index_sweep.existing_indexes(engine, cursor, ["text", "page"]):
+        cursor.execute(f"DROP INDEX {name}")
+    truncate(engine, cursor)
+    monitor = throughput.connect("sqlserver") if engine == "sqlserver" else None
+    probe = memory_probe(engine, cursor, monitor.cursor() if monitor else None)
+    if engine == "postgres":
+        cursor.execute(f"SET maintenance_work_mem = '{index_sweep.MAINTENANCE_WORK_MEM}'")
+
+    rows, loaded = [], 0
+    try:
+        for size in sorted(SIZES):
+            load_s = load_increment(engine, conn, loaded, size)
+            loaded = size
+            check_rows(engine, cursor, size)
+            print(f"[{engine}] {size} rows per table (increment loaded in {load_s:.1f} s)")
+            truth = index_sweep.exact_results(engine, cursor, queries, K_VALUES)
+            for index_type in index_types:
+                build, setting = build_params(index_type, size)
+                tables = index_sweep.tables_for(index_type, queries)
+                built = []
+                for table in tables:
+                    result, peak_mb = with_peak_memory(probe, lambda: index_sweep.build_index(index_type, cursor, table, build))
+                    built.append((*result, peak_mb))
+                build_ms, size_mb = sum(b[1] for b in built), sum(b[2] for b in built)
+                peaks = [b[3] for b in built if b[3] is not None]
+                index_sweep.set_query_knobs(index_type, cursor, setting)
+                found = index_sweep.sweep_setting(index_type, cursor, queries, truth, {**build, **setting}, K_VALUES)
+                for r in found:
+                    rows.append({
+                        "Engine": engine,
+                        "Index": index_type,
+                        "Rows": size,
+                        "Query": r["query"],
+                        "K": r["k"],
+                        "Params": index_sweep.describe({**build, **setting}),
+                        "Load_S": round(load_s, 2),
+                        "Build_MS": round(build_ms, 1),
+                        "Index_MB": round(size_mb, 2),
+                        "Peak_Memory_MB": max(peaks) if peaks else None,
+                        "Recall": r["recall"],
+                        "Latency_MS": r["idx_ms"],
+                        "Exact_MS": r["exact_ms"],
+                    })
+                print(f"  {index_type} ({index_sweep.describe(build)}): built in {build_ms / 1000:.1f} s, {size_mb:.1f} MB"
+                      + (f", peak {max(peaks):.0f} MB" if peaks else "") + "; "
+                      + ", ".join(f"{r['query']}@{r['k']} {r['recall']:.0f}% {r['idx_ms']:.1f} ms" for r in found))
+                for table in tables:
+                    index_sweep.drop_index(engine, cursor, table, f"sweep_{table}_{index_type}")
+    finally:
+        for index_type in index_types:
+            for table in ("text", "page"):
+                index_sweep.drop_index(engine, cursor, table, f"sweep_{table}_{index_type}")
+        conn.close()
+        if monitor:
+            monitor.close()
+    return rows
+
+def growth(df):
+    """Build time / index size exponents per index type (slope of log-log fit against Rows)."""
+    fits = []
+    for (engine, index), part in df.drop_duplicates(["Engine", "Index", "Rows"]).groupby(["Engine", "Index"]):
+        if part["Rows"].nunique() < 2:
+            continue
+        x = np.log(part["Rows"])
+        fits.append({"Engine": engine, "Index": index,
+                     "Build_Exponent": round(float(np.polyfit(x, np.log(part["Build_MS"]), 1)[0]), 2),
+                     "Size_Exponent": round(float(np.polyfit(x, np.log(part["Index_MB"].clip(lower=1e-6)), 1)[0]), 2)})
+    return fits
+
+def run_scale():
+    # Increments range-scan the staging tables' one-time numbering (<table>_rn)
+    source = pyodbc.connect(fast_load.conn_str)
+    fast_load.number_staging(source, max(SIZES))
+    source.close()
+
+    rows = []
+    for engine in dict.fromkeys(index_sweep.ENGINES[t] for t in INDEX_TYPES):
+        rows.extend(scale_engine(engine, [t for t in INDEX_TYPES if index_sweep.ENGINES[t] == engine]))
+    df = pd.DataFrame(rows)
+    df.to_csv(OUTPUT_FILE, index=False)
+    for fit in growth(df) if len(df) else []:
+        # build time ~ rows^exponent; extrapolate with Build_MS * (target / Rows) ** exponent
+        print(f"{fit['Engine']} {fit['Index']}: build time ~ rows^{fit['Build_Exponent']}, size ~ rows^{fit['Size_Exponent']}")
+    print(f"\nResults for {df['Rows'].nunique() if len(df) else 0} sizes saved to {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    run_scale()
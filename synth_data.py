@@ -0,0 +1,356 @@
+import pyodbc
+import numpy as np
+import pandas as pd
+import math
+import os
+import time
+
+import embedding_cache
+import fast_load
+import fast_load_pg
+
+# --- Configuration ---
+ROWS = 200000 # rows per table (page, text, revision)
+SEED = 42
+OUTPUT = "csv" # "staging" = dbo.stage_* in fast_load.DB_NAME, "csv" = one file per staging table, "copy" = binary COPY into fast_load_pg.PG_DB
+OUTPUT_DIR = "synth_data" # csv output
+REPLACE = True # drop and recreate the staging tables ("staging") / TRUNCATE the target tables ("copy") first
+CHUNK_SIZE = fast_load.CHUNK_SIZE # rows generated and written at a time; output depends on SEED, ROWS and CHUNK_SIZE
+DIM = embedding_cache.DIM
+TOPICS = 50 # coarse topics; clusters are perturbations of a topic, so neighbouring clusters share one
+CLUSTERS = 1000
+CLUSTER_SKEW = 1.0 # cluster sizes ~ 1 / rank^skew
+CLUSTER_SPREAD = 0.6 # noise norm relative to the (unit) centroid; varies per cluster (lognormal, sigma 0.3)
+TOPIC_DRIFT = 0.2 # share of texts whose embedding is not about the page they revise
+PAGE_LEN_MEDIAN = 3000 # bytes; lognormal
+PAGE_LEN_SIGMA = 1.3
+YEARS = (2001, 2024) # rev_timestamp / page_touched years, inclusive
+YEAR_GROWTH = 1.15 # each year has this many times the revisions of the one before
+ACTORS = 50000
+ACTOR_SKEW = 1.2 # edits per actor ~ 1 / rank^skew
+PAGE_SKEW = 0.9 # revisions per page ~ 1 / rank^skew
+MINOR_EDIT_RATE = 0.3
+VOCABULARY = 20000
+TEXT_WORDS_MEDIAN = 120 # words per old_text; lognormal (sigma 0.8), capped at 2000
+# ---------------------
+# Seeded synthetic stand-in for the HyBench dump, so the loaders and the
+# scaling benchmarks run at any size without the original staging tables.
+# Rows have the columns fast_load.py reads, split over the same six
+# dbo.stage_* tables (STAGING) and lined up by insertion order:
+#   page      page_id 1..ROWS, title of 1-3 vocabulary words, page_len lognormal,
+#             page_touched in YEARS, embedding from the page's cluster
+#   text      old_id 1..ROWS (= rev_id, what the loaders store as rev_text_id),
+#             old_text of Zipf-distributed words, embedding from the cluster of the
+#             revised page (another cluster with probability TOPIC_DRIFT)
+#   revision  rev_page_id Zipf over pages (popular pages scattered over the id range),
+#             rev_timestamp year growing by YEAR_GROWTH, rev_actor Zipf over ACTORS
+# Embeddings are unit vectors: a cluster centroid plus Gaussian noise. Cluster
+# sizes are Zipf-distributed and clusters of the same topic lie close together,
+# so nearest neighbours come in dense groups of very different sizes. A page's
+# cluster is a hash of its id, so texts can be placed next to their page
+# without holding any per-page state.
+#
+# Every chunk is generated from its own generator seeded by (SEED, table,
+# chunk index) with whole-array NumPy operations and written before the next
+# one is made; memory stays at one chunk plus the CLUSTERS x DIM centroids.
+
+STAGING = {
+    "page": {
+        "stage_page": ["page_id", "page_title", "page_len"],
+        "stage_page_extra": ["page_touched"],
+        "stage_page_embedding": ["embedding_json"],
+    },
+    "text": {
+        "stage_text": ["old_id", "old_text"],
+        "stage_text_embedding": ["embedding_json"],
+    },
+    "revision": {
+        "stage_revision": ["rev_id", "rev_page_id", "rev_timestamp", "rev_minor_edit", "rev_actor"],
+    },
+}
+COLUMN_TYPES = {
+    "page_id": "INT", "page_title": "NVARCHAR(255)", "page_len": "INT", "page_touched": "VARCHAR(20)",
+    "old_id": "INT", "old_text": "NVARCHAR(MAX)", "embedding_json": "NVARCHAR(MAX)",
+    "rev_id": "INT", "rev_page_id": "INT", "rev_timestamp": "VARCHAR(20)", "rev_minor_edit": "TINYINT",
+    "rev_actor": "NVARCHAR(255)",
+}
+SALTS = {"page": 1, "text": 2, "revision": 3, "page_cluster": 4}
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ba", "de", "fi", "go", "ha", "ju", "pe", "qu",
+             "ra", "so", "tu", "wi", "xe", "yo", "ze", "an", "el", "in", "on", "ur", "st", "tr"]
+
+# --- Shared structure ---
+
+def unit_hash(ids, salt):
+    """Uniform [0, 1) per integer id (splitmix64), the same for every chunk layout."""
+    x = np.asarray(ids, dtype=np.uint64) + np.uint64((salt * 0x9E3779B97F4A7C15) % (1 << 64))
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+def power_law_rank(u, n, skew):
+    """Ranks 1..n with P(rank) ~ 1 / rank^skew, by inverting the continuous CDF (no n-sized table)."""
+    if abs(skew - 1.0) < 1e-9:
+        ranks = np.exp(u * math.log(n + 1))
+    else:
+        ranks = ((math.pow(n + 1, 1 - skew) - 1) * u + 1) ** (1 / (1 - skew))
+    return np.clip(ranks.astype(np.int64), 1, n)
+
+def scatter(ranks, n):
+    """Bijection of 1..n so that popular (low) ranks land all over the id range."""
+    step = int(n * 0.6180339887) | 1
+    while math.gcd(step, n) != 1:
+        step += 2
+    return (ranks - 1) * step % n + 1
+
+def normalize(x):
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+def structure():
+    """Cluster centroids, spreads and size CDF, plus the vocabulary; fixed by SEED."""
+    rng = np.random.default_rng([SEED, 0])
+    topics = normalize(rng.standard_normal((TOPICS, DIM)))
+    parent = rng.integers(0, TOPICS, CLUSTERS)
+    centroids = normalize(topics[parent] + 0.5 * normalize(rng.standard_normal((CLUSTERS, DIM)))).astype(np.float32)
+    spreads = (CLUSTER_SPREAD * rng.lognormal(0.0, 0.3, CLUSTERS)).astype(np.float32)
+    weights = 1.0 / np.arange(1, CLUSTERS + 1) ** CLUSTER_SKEW
+    cdf = np.cumsum(rng.permutation(weights)) / weights.sum()
+    parts = np.array(SYLLABLES)[rng.integers(0, len(SYLLABLES), (VOCABULARY, 3))]
+    lengths = rng.integers(1, 4, VOCABULARY)
+    words = np.array(["".join(p[:n]) for p, n in zip(parts, lengths)], dtype=object)
+    return {"centroids": centroids, "spreads": spreads, "cdf": cdf, "words": words}
+
+def page_clusters(page_ids, s):
+    return np.minimum(np.searchsorted(s["cdf"], unit_hash(page_ids, SALTS["page_cluster"]), side="right"), CLUSTERS - 1)
+
+def embeddings(clusters, s, rng):
+    noise = rng.standard_normal((len(clusters), DIM), dtype=np.float32)
+    noise *= (s["spreads"][clusters] / np.sqrt(np.float32(DIM)))[:, None]
+    return normalize(s["centroids"][clusters] + noise).astype(np.float32)
+
+def timestamps(n, rng):
+    """ISO-8601 UTC texts ('2010-01-01T00:00:00Z'), years weighted by YEAR_GROWTH."""
+    years = np.arange(YEARS[0], YEARS[1] + 1)
+    weights = YEAR_GROWTH ** (years - YEARS[0])
+    year = rng.choice(years, n, p=weights / weights.sum())
+    start = (year - 1970).astype("datetime64[Y]").astype("datetime64[s]")
+    length = ((year + 1 - 1970).astype("datetime64[Y]").astype("datetime64[s]") - start).astype(np.int64)
+    ts = start + (rng.random(n) * length).astype("timedelta64[s]")
+    return np.char.add(np.datetime_as_string(ts, unit="s"), "Z").astype(object)
+
+def phrases(counts, s, rng, sep):
+    """One string of counts[i] Zipf-distributed vocabulary words per row."""
+    picks = s["words"][power_law_rank(rng.random(int(counts.sum())), VOCABULARY, 1.0) - 1]
+    return [sep.join(w) for w in np.split(picks, np.cumsum(counts)[:-1])]
+
+# --- Chunks ---
+
+def page_chunk(lo, hi, s, rng):
+    ids = np.arange(lo + 1, hi + 1, dtype=np.int64)
+    n = len(ids)
+    titles = [t.capitalize() for t in phrases(rng.integers(1, 4, n), s, rng, "_")]
+    df = pd.DataFrame({
+        "page_id": ids,
+        "page_title": titles,
+        "page_len": np.clip(rng.lognormal(math.log(PAGE_LEN_MEDIAN), PAGE_LEN_SIGMA, n), 1, 2000000).astype(np.int64),
+        "page_touched": timestamps(n, rng),
+    })
+    return df, embeddings(page_clusters(ids, s), s, rng)
+
+def text_revision_chunk(lo, hi, s, rng):
+    """(text frame, text embeddings, revision frame); text i is the text of revision i."""
+    ids = np.arange(lo + 1, hi + 1, dtype=np.int64)
+    n = len(ids)
+    pages = scatter(power_law_rank(rng.random(n), ROWS, PAGE_SKEW), ROWS)
+    clusters = page_clusters(pages, s)
+    drift = rng.random(n) < TOPIC_DRIFT
+    clusters[drift] = np.minimum(np.searchsorted(s["cdf"], rng.random(int(drift.sum())), side="right"), CLUSTERS - 1)
+    words = np.clip(rng.lognormal(math.log(TEXT_WORDS_MEDIAN), 0.8, n), 1, 2000).astype(np.int64)
+    text = pd.DataFrame({"old_id": ids, "old_text": phrases(words, s, rng, " ")})
+    revision = pd.DataFrame({
+        "rev_id": ids,
+        "rev_page_id": pages,
+        "rev_timestamp": timestamps(n, rng),
+        "rev_minor_edit": (rng.random(n) < MINOR_EDIT_RATE).astype(np.int64),
+        "rev_actor": np.char.add("User_", power_law_rank(rng.random(n), ACTORS, ACTOR_SKEW).astype(str)).astype(object),
+    })
+    return text, embeddings(clusters, s, rng), revision
+
+def chunks(s):
+    """Yields (table, frame, embeddings or None), CHUNK_SIZE rows at a time."""
+    for i, lo in enumerate(range(0, ROWS, CHUNK_SIZE)):
+        yield ("page", *page_chunk(lo, min(lo + CHUNK_SIZE, ROWS), s, np.random.default_rng([SEED, SALTS["page"], i])))
+    for i, lo in enumerate(range(0, ROWS, CHUNK_SIZE)):
+        text, vectors, revision = text_revision_chunk(lo, min(lo + CHUNK_SIZE, ROWS), s,
+                                                      np.random.default_rng([SEED, SALTS["text"], i]))
+        yield "text", text, vectors
+        yield "revision", revision, None
+
+# --- Output ---
+
+# embedding_cache.to_json text ("%.9g" per value) built with whole-array
+# NumPy operations: every value is five 4-byte words (separator / sign / first
+# digit / point, three groups of four fraction digits, "e-XX") that are written
+# with table lookups and then compacted, dropping the bytes a value does not
+# use (trailing zeros, exponent outside scientific notation). The text is
+# identical to to_json's and about twice as fast as np.savetxt, which
+# formats value by value.
+
+def words(texts):
+    """4-byte strings as native uint32s, so one store writes four characters."""
+    return np.frombuffer(b"".join(texts), dtype=np.uint8).reshape(-1, 4).copy().view(np.uint32)[:, 0]
+
+QUADS = words(f"{i:04d}".encode() for i in range(10000))
+QUAD_ZEROS = np.array([4 - len(f"{i:04d}".rstrip("0")) for i in range(10000)], dtype=np.int8)
+HEADS = words(b",-%d." % d for d in range(10))
+EXPONENTS = words(b"e-%02d" % x for x in range(100))
+KEEP = words(bytes(i < n for i in range(4)) for n in range(5)) # KEEP[n]: the first n bytes of a word
+HEAD_KEEP = words(bytes((comma, sign, 1, point)) for comma in (0, 1) for sign in (0, 1) for point in (0, 1))
+JSON_BLOCK = 512 # rows formatted at a time (keeps the working arrays in cache)
+FORMAT_STATS = {"rows": 0, "seconds": 0.0}
+
+def json_block(v):
+    """to_json of every row of float32 matrix v whose values are below 9.5 in magnitude."""
+    ax = np.abs(v).astype(np.float64)
+    nonzero = ax > 0
+    # Nine significant digits: |x| = m * 10^(e - 8) with 10^8 <= m < 10^9
+    e = np.floor(np.log10(np.where(nonzero, ax, 1.0))).astype(np.int64)
+    m = np.rint(ax * 10.0 ** (8 - e))
+    e += m >= 1e9
+    e -= (m < 1e8) & nonzero
+    m = np.rint(ax * 10.0 ** (8 - e)).astype(np.int64)
+    sci = e < -4 # "%.9g" switches to d.dddddddde-XX below 1e-4
+    point = sci | (e == 0) # first significant digit goes before the point, the rest after it
+    fraction = np.where(point, m % 10 ** 8 * 10 ** 4, m * 10 ** np.clip(4 + e, 0, 3)) # 12 digits after the point
+    quads = [fraction // 10 ** 8, fraction // 10 ** 4 % 10 ** 4, fraction % 10 ** 4]
+    digits = np.zeros(v.shape, dtype=np.int8) # fraction digits left once trailing zeros go
+    for i, q in enumerate(quads):
+        digits = np.where(q != 0, 4 * i + 4 - QUAD_ZEROS[q], digits)
+
+    out = np.empty(v.shape + (5,), dtype=np.uint32)
+    keep = np.empty(v.shape + (5,), dtype=np.uint32)
+    out[..., 0] = HEADS[np.where(point, m // 10 ** 8, 0)]
+    keep[..., 0] = HEAD_KEEP[4 * (np.arange(v.shape[1]) > 0) + 2 * np.signbit(v) + (digits > 0)]
+    for i, q in enumerate(quads):
+        out[..., 1 + i] = QUADS[q]
+        keep[..., 1 + i] = KEEP[np.clip(digits - 4 * i, 0, 4)]
+    out[..., 4] = EXPONENTS[np.where(sci, -e, 0)]
+    keep[..., 4] = np.where(sci, KEEP[4], KEEP[0])
+
+    mask = keep.view(np.uint8).reshape(len(v), -1).astype(bool)
+    text = out.view(np.uint8).reshape(len(v), -1)[mask].tobytes().decode("ascii")
+    ends = np.cumsum(mask.sum(axis=1))
+    return ["[" + text[a:b] + "]" for a, b in zip(np.concatenate(([0], ends[:-1])), ends)]
+
+def json_rows(vectors):
+    """embedding_cache.to_json of every row (vectorized; to_json itself for values it does not cover)."""
+    start = time.perf_counter()
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if not np.isfinite(vectors).all() or np.abs(vectors).max(initial=0) >= 9.5:
+        rows = [embedding_cache.to_json(row) for row in vectors]
+    else:
+        rows = [r for lo in range(0, len(vectors), JSON_BLOCK) for r in json_block(vectors[lo:lo + JSON_BLOCK])]
+    FORMAT_STATS["rows"] += len(rows)
+    FORMAT_STATS["seconds"] += time.perf_counter() - start
+    return rows
+
+def staging_frames(table, df, vectors):
+    """{staging table: frame} with the embeddings as JSON text."""
+    if vectors is not None:
+        df = df.assign(embedding_json=json_rows(vectors))
+    return {stage: df[columns] for stage, columns in STAGING[table].items()}
+
+class StagingWriter:
+    """INSERTs into dbo.stage_* on fast_load's connection, in generation order (the loaders number rows by it)."""
+    def __init__(self):
+        self.conn = pyodbc.connect(fast_load.conn_str)
+        cursor = self.conn.cursor()
+        for stage, columns in ((k, v) for t in STAGING.values() for k, v in t.items()):
+            if REPLACE:
+                # The loaders' numbered copy of the old contents goes with it
+                cursor.execute(f"DROP TABLE IF EXISTS {fast_load.numbered(f'dbo.{stage}')}")
+                cursor.execute(f"DROP TABLE IF EXISTS dbo.{stage}")
+                cursor.execute(f"CREATE TABLE dbo.{stage} ({', '.join(f'{c} {COLUMN_TYPES[c]}' for c in columns)})")
+        self.conn.commit()
+
+    def write(self, table, df, vectors):
+        for stage, frame in staging_frames(table, df, vectors).items():
+            columns = list(frame.columns)
+            cursor = self.conn.cursor()
+            cursor.fast_executemany = True
+            cursor.executemany(f"INSERT INTO dbo.{stage} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                               list(zip(*(frame[c].tolist() for c in columns))))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+class CsvWriter:
+    """One CSV per staging table in OUTPUT_DIR (header on the first chunk)."""
+    def __init__(self):
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        self.started = set()
+
+    def write(self, table, df, vectors):
+        for stage, frame in staging_frames(table, df, vectors).items():
+            path = os.path.join(OUTPUT_DIR, f"{stage}.csv")
+            frame.to_csv(path, index=False, mode="a" if stage in self.started else "w", header=stage not in self.started)
+            self.started.add(stage)
+
+    def close(self):
+        pass
+
+class CopyWriter:
+    """Binary COPY straight into the PostgreSQL tables, through fast_load_pg's row preparation and encoder."""
+    def __init__(self):
+        self.conn = fast_load_pg.connect_pg()
+        cur = self.conn.cursor()
+        self.columns = {table: fast_load_pg.table_columns(cur, table) for table in STAGING}
+        for table, columns in self.columns.items():
+            fast_load_pg.check_layout(table, columns)
+        if REPLACE:
+            cur.execute(f"TRUNCATE TABLE {', '.join(STAGING)}")
+        self.conn.commit()
+
+    def write(self, table, df, vectors):
+        if vectors is not None:
+            df = df.assign(embedding_json=list(vectors)) # float32 rows, encoded without a JSON round trip
+        rows = fast_load.PREPARERS["columnar"][table](df)
+        fast_load_pg.copy_chunk(self.conn.cursor(), table, self.columns[table], rows)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+WRITERS = {"staging": StagingWriter, "csv": CsvWriter, "copy": CopyWriter}
+
+def generate():
+    s = structure()
+    writer = WRITERS[OUTPUT]()
+    print(f"Generating {ROWS} rows per table (seed {SEED}) -> {OUTPUT}")
+    start = time.perf_counter()
+    written = dict.fromkeys(STAGING, 0)
+    gen_s, write_s = 0.0, 0.0
+    try:
+        t0 = time.perf_counter()
+        for table, df, vectors in chunks(s):
+            t1 = time.perf_counter()
+            writer.write(table, df, vectors)
+            t2 = time.perf_counter()
+            gen_s += t1 - t0
+            write_s += t2 - t1
+            t0 = t2
+            written[table] += len(df)
+            if table != "text":
+                print(f"  ... {table} {written[table]} rows", flush=True)
+    finally:
+        writer.close()
+    seconds = time.perf_counter() - start
+    print(f"Done in {seconds:.1f} s, {sum(written.values()) / seconds if seconds else 0:,.0f} rows/sec "
+          f"(generate {gen_s:.1f}s, write {write_s:.1f}s)")
+    if FORMAT_STATS["rows"]:
+        print(f"Embeddings formatted as JSON at {FORMAT_STATS['rows'] / FORMAT_STATS['seconds']:,.0f} vectors/sec "
+              f"({FORMAT_STATS['seconds']:.1f}s of the write time)")
+
+if __name__ == "__main__":
+    generate()
@@ -0,0 +1,222 @@
+import pyodbc
+import psycopg2
+import numpy as np
+import pandas as pd
+import glob
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import latency
+
+# --- Configuration ---
+ENGINES = ["sqlserver", "postgres"]
+MODE = "closed" # "closed" = N clients back-to-back, "open" = fixed arrival rate, "both"
+POOL = "thread" # "thread" or "process" pool for closed-loop clients
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16, 32] # closed-loop client counts
+ARRIVAL_RATES = [1, 2, 5, 10, 20, 50] # open-loop offered load (queries/sec)
+MAX_IN_FLIGHT = 64 # open-loop worker threads (one connection each)
+DURATION_S = 30 # measured seconds per level
+SQLSERVER_QUERIES = None # 1-based query numbers from latency.INPUT_FILE (None = all)
+POSTGRES_QUERIES = None # file names from postgres/ (None = all)
+SATURATION_GAIN = 0.10 # closed loop: saturated once one more step adds less than this relative throughput
+SEED = 42
+OUTPUT_FILE = "throughput_results.csv"
+
+PG_PARAMS = dict(dbname="hybench_pg_200k", user="postgres", password="dbms", host="localhost", port=5432)
+PG_QUERY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "postgres")
+# ---------------------
+
+def sqlserver_catalog():
+    """[(query id, sql)] from the same file/delimiter latency.py benchmarks."""
+    with open(latency.INPUT_FILE, 'r') as f:
+        parts = f.read().split(latency.DELIMITER)
+    catalog = [(str(i + 1), latency.clean_sql(p)) for i, p in enumerate(parts)]
+    return [(qid, sql) for qid, sql in catalog
+            if sql and (SQLSERVER_QUERIES is None or int(qid) in SQLSERVER_QUERIES)]
+
+def postgres_catalog():
+    """[(file name, sql)] for the postgres/*.sql workload."""
+    catalog = []
+    for path in sorted(glob.glob(os.path.join(PG_QUERY_DIR, "*.sql"))):
+        name = os.path.basename(path)
+        if POSTGRES_QUERIES is None or name in POSTGRES_QUERIES:
+            with open(path, "r", encoding="utf-8") as f:
+                catalog.append((name, f.read()))
+    return catalog
+
+def connect(engine):
+    if engine == "sqlserver":
+        conn = pyodbc.connect(latency.conn_str)
+        conn.autocommit = True
+        return conn
+    return psycopg2.connect(**PG_PARAMS)
+
+def execute(engine, conn, sql):
+    """Runs one query to completion on `conn`; returns rows fetched."""
+    cursor = conn.cursor()
+    if engine == "sqlserver":
+        return latency.execute_query(cursor, sql)[0]
+    cursor.execute(sql)
+    rows = len(cursor.fetchall()) if cursor.description else 0
+    conn.commit()
+    return rows
+
+def catalog_for(engine):
+    return sqlserver_catalog() if engine == "sqlserver" else postgres_catalog()
+
+# --- Closed loop ---
+
+def closed_loop_client(engine, client_id, deadline, seed):
+    """
+    One client on its own connection issuing queries back-to-back until `deadline`
+    (a time.time() value, so it is comparable across processes).
+    Returns [(query id, latency ms, ok)].
+    """
+    catalog = catalog_for(engine)
+    rng = random.Random(seed + client_id)
+    conn = connect(engine)
+    samples = []
+    try:
+        while time.time() < deadline:
+            qid, sql = rng.choice(catalog)
+            t0 = time.perf_counter()
+            try:
+                execute(engine, conn, sql)
+                ok = True
+            except Exception:
+                ok = False
+                if engine == "postgres":
+                    conn.rollback()
+            samples.append((qid, (time.perf_counter() - t0) * 1000, ok))
+    finally:
+        conn.close()
+    return samples
+
+def run_closed_loop(engine, clients):
+    executor_cls = ProcessPoolExecutor if POOL == "process" else ThreadPoolExecutor
+    start = time.time()
+    deadline = start + DURATION_S
+    with executor_cls(max_workers=clients) as executor:
+        futures = [executor.submit(closed_loop_client, engine, c, deadline, SEED) for c in range(clients)]
+        samples = [s for f in futures for s in f.result()]
+    # Clients finish the query in flight at the deadline, so measure to the last completion
+    return samples, time.time() - start
+
+# --- Open loop ---
+
+def run_open_loop(engine, rate):
+    """
+    Issues queries at Poisson arrivals of `rate`/sec for DURATION_S regardless of
+    completions. Latency is measured from the scheduled arrival, so queueing
+    behind a saturated server counts (no coordinated omission).
+    """
+    catalog = catalog_for(engine)
+    rng = np.random.default_rng(SEED)
+    arrivals = np.cumsum(rng.exponential(1.0 / rate, size=int(rate * DURATION_S * 2) + 1))
+    arrivals = arrivals[arrivals < DURATION_S]
+    picks = rng.integers(0, len(catalog), size=len(arrivals))
+
+    local = threading.local()
+    connections = []
+    lock = threading.Lock()
+
+    def worker_conn():
+        if not hasattr(local, "conn"):
+            local.conn = connect(engine)
+            with lock:
+                connections.append(local.conn)
+        return local.conn
+
+    def run(scheduled, qid, sql):
+        conn = worker_conn()
+        try:
+            execute(engine, conn, sql)
+            ok = True
+        except Exception:
+            ok = False
+            if engine == "postgres":
+                conn.rollback()
+        return qid, (time.perf_counter() - scheduled) * 1000, ok
+
+    start = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT) as executor:
+        for offset, pick in zip(arrivals, picks):
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            qid, sql = catalog[pick]
+            futures.append(executor.submit(run, scheduled, qid, sql))
+        samples = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+    for conn in connections:
+        conn.close()
+    return samples, elapsed
+
+# --- Reporting ---
+
+def summarize(engine, mode, level, samples, elapsed, offered=None):
+    ok = np.array([ms for _, ms, good in samples if good])
+    row = {
+        "Engine": engine,
+        "Mode": mode,
+        "Concurrency": level if mode == "closed" else MAX_IN_FLIGHT,
+        "Offered_QPS": offered,
+        "Issued": len(samples),
+        "Completed": len(ok),
+        "Errors": sum(1 for *_, good in samples if not good),
+        "Duration_S": round(elapsed, 2),
+        "Throughput_QPS": round(len(ok) / elapsed, 3) if elapsed else 0,
+    }
+    for p in (50, 95, 99):
+        row[f"P{p}_MS"] = round(float(np.percentile(ok, p)), 2) if len(ok) else None
+    row["Mean_MS"] = round(float(ok.mean()), 2) if len(ok) else None
+    print(f"  {engine} {mode} {'c=' + str(level) if mode == 'closed' else str(offered) + ' qps'}: "
+          f"{row['Throughput_QPS']} qps, p50 {row['P50_MS']} ms, p99 {row['P99_MS']} ms, {row['Errors']} errors")
+    return row
+
+def saturation_point(rows):
+    """
+    Closed loop: the concurrency after which one more step gains less than
+    SATURATION_GAIN throughput. Open loop: the highest offered rate at which
+    completions keep up (>= 95%) with the arrivals actually issued in
+    DURATION_S; past it the backlog drains after the window and throughput
+    falls behind. None if never saturated.
+    """
+    if not rows:
+        return None
+    if rows[0]["Mode"] == "closed":
+        for prev, cur in zip(rows, rows[1:]):
+            if cur["Throughput_QPS"] < prev["Throughput_QPS"] * (1 + SATURATION_GAIN):
+                return prev["Concurrency"]
+        return None
+    sustained = [r for r in rows if r["Throughput_QPS"] >= 0.95 * r["Issued"] / DURATION_S]
+    if len(sustained) == len(rows):
+        return None
+    return sustained[-1]["Offered_QPS"] if sustained else 0
+
+def run_throughput():
+    results = []
+    for engine in ENGINES:
+        if MODE in ("closed", "both"):
+            print(f"\n=== {engine}: closed loop ({POOL} pool, {DURATION_S}s per level) ===")
+            rows = [summarize(engine, "closed", c, *run_closed_loop(engine, c)) for c in CONCURRENCY_LEVELS]
+            sat = saturation_point(rows)
+            print(f"  Saturation point: {'not reached' if sat is None else str(sat) + ' concurrent clients'}")
+            results += rows
+        if MODE in ("open", "both"):
+            print(f"\n=== {engine}: open loop ({MAX_IN_FLIGHT} workers, {DURATION_S}s per rate) ===")
+            rows = [summarize(engine, "open", None, *run_open_loop(engine, r), offered=r) for r in ARRIVAL_RATES]
+            sat = saturation_point(rows)
+            print(f"  Saturation point: {'not reached' if sat is None else str(sat) + ' qps sustained'}")
+            results += rows
+
+    pd.DataFrame(results).to_csv(OUTPUT_FILE, index=False)
+    print(f"\nThroughput results saved to {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    run_throughput()
@@ -0,0 +1,227 @@
+import pandas as pd
+import hashlib
+from decimal import Decimal
+from itertools import zip_longest
+
+import bench_runner
+import query_pool
+import result_fetch
+import throughput
+
+# --- Configuration ---
+QUERIES = None # logical ids to verify (None = every query both engines have)
+DISTANCE_EPS = 1e-4 # distances within this are equal (float32 math differs between engines); also the tie window
+BATCH_SIZE = result_fetch.BATCH_SIZE
+MAX_EXAMPLES = 5 # mismatching ids kept per query for the report
+BASE_TABLES = ["page", "text", "revision"] # must hold the same number of rows on both engines before comparing
+OUTPUT_FILE = "verify_results.csv"
+# ---------------------
+# Checks that SQL Server and PostgreSQL return the same answer for every query
+# in the shared catalog (bench_runner.script_catalog), pinned to the same pool
+# vectors. Both results are streamed side by side in BATCH_SIZE chunks, so
+# memory stays flat however many rows a query returns:
+#   - id set: order-independent hash (sum of per-id hashes) of the first column
+#   - ordered ids: when the result is sorted by a distance column (ascending
+#     or descending), ids are matched in order, but rows whose distances are
+#     within DISTANCE_EPS may swap places
+#   - distances: compared position by position (sorted, so ties do not matter)
+# Results with a distance column that is not sorted get the id set check only.
+# Nothing is compared unless every BASE_TABLES table has the same row count on
+# both engines: different data would make every answer a "mismatch".
+
+MOD = 1 << 64
+
+def value_key(value):
+    """Engine-independent text for a result value (2010, 2010.0 and Decimal('2010') compare equal)."""
+    if isinstance(value, (float, Decimal)):
+        return str(int(value)) if value == int(value) else repr(round(float(value), 6))
+    return str(value)
+
+def id_hash(value):
+    return int.from_bytes(hashlib.blake2b(value_key(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+def distance_column(description):
+    """Index of the first column whose name mentions a distance, or None."""
+    for i, col in enumerate(description):
+        if "dist" in col[0].lower():
+            return i
+    return None
+
+def open_stream(engine, conn, sql):
+    """Executes `sql` and returns a cursor positioned on its (first) result set."""
+    if engine == "sqlserver":
+        cursor = conn.cursor()
+        cursor.execute(sql)
+        while not cursor.description and cursor.nextset():
+            pass
+    else:
+        # Named (server-side) cursor: rows arrive BATCH_SIZE at a time instead of all on execute.
+        # It takes a single statement, so any leading ones (SET, temp tables) run first.
+        *prefix, last = result_fetch.split_statements(sql)
+        setup = conn.cursor()
+        for statement in prefix:
+            setup.execute(statement)
+        setup.close()
+        cursor = result_fetch.pg_cursor(conn, "stream", BATCH_SIZE, name="verify_stream")
+        cursor.execute(last)
+    return cursor
+
+def table_counts(conns):
+    """{table: {engine: row count}} for BASE_TABLES."""
+    counts = {}
+    for table in BASE_TABLES:
+        counts[table] = {}
+        for engine, conn in conns.items():
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM {'dbo.' if engine == 'sqlserver' else ''}{table}")
+            counts[table][engine] = cursor.fetchone()[0]
+            cursor.close()
+    conns["postgres"].commit()
+    return counts
+
+def rows(cursor):
+    while True:
+        batch = cursor.fetchmany(BATCH_SIZE)
+        if not batch:
+            return
+        yield from batch
+
+class TieMatcher:
+    """
+    Matches two id streams in order, letting ids whose distances are within
+    DISTANCE_EPS of each other appear in either order. Ids left unmatched once
+    both streams have moved past their tie window are mismatches. Memory is
+    bounded by the largest tie group.
+    """
+    def __init__(self):
+        self.pending = ({}, {})
+        self.mismatches = 0
+        self.examples = []
+        self.direction = 0 # +1 ascending, -1 descending, 0 until the distances first move
+
+    def add(self, side, row_id, distance):
+        other = self.pending[1 - side]
+        key = value_key(row_id)
+        if key in other:
+            del other[key]
+        else:
+            self.pending[side][key] = distance
+
+    def evict(self, frontier):
+        """Drops (as mismatches) pending ids both streams have moved past; `frontier` is the one behind."""
+        if not self.direction or frontier is None:
+            return
+        for side in self.pending:
+            stale = [k for k, d in side.items() if d is None or self.direction * (frontier - d) > DISTANCE_EPS]
+            for k in stale:
+                self.miss(k)
+                del side[k]
+
+    def miss(self, key):
+        self.mismatches += 1
+        if len(self.examples) < MAX_EXAMPLES:
+            self.examples.append(key)
+
+    def finish(self):
+        for side in self.pending:
+            for k in side:
+                self.miss(k)
+            side.clear()
+
+def compare(query, sql_by_engine, conns):
+    ss = open_stream("sqlserver", conns["sqlserver"], sql_by_engine["sqlserver"])
+    pg = open_stream("postgres", conns["postgres"], sql_by_engine["postgres"])
+    try:
+        dist_cols = distance_column(ss.description), distance_column(pg.description)
+        ordered = None not in dist_cols
+        counts, set_hashes = [0, 0], [0, 0]
+        matcher = TieMatcher()
+        distance_mismatches, max_diff = 0, 0.0
+        last = [None, None]
+
+        for pair in zip_longest(rows(ss), rows(pg)):
+            distances = [None, None]
+            for side, row in enumerate(pair):
+                if row is None:
+                    continue
+                counts[side] += 1
+                set_hashes[side] = (set_hashes[side] + id_hash(row[0])) % MOD
+                if ordered:
+                    d = distances[side] = float(row[dist_cols[side]]) if row[dist_cols[side]] is not None else None
+                    if d is not None and last[side] is not None and abs(d - last[side]) > DISTANCE_EPS:
+                        step = 1 if d > last[side] else -1
+                        if matcher.direction and step != matcher.direction:
+                            ordered = False # not sorted by this column: id set check only
+                        matcher.direction = step
+                    last[side] = d if d is not None else last[side]
+                    matcher.add(side, row[0], d)
+            if ordered:
+                if None not in distances:
+                    diff = abs(distances[0] - distances[1])
+                    max_diff = max(max_diff, diff)
+                    distance_mismatches += diff > DISTANCE_EPS
+                present = [d for d in distances if d is not None]
+                # The stream that is further behind bounds what the other can still match
+                matcher.evict((min if matcher.direction >= 0 else max)(present) if present else None)
+        if ordered:
+            matcher.finish()
+    finally:
+        ss.close()
+        pg.close()
+        conns["postgres"].commit()
+
+    set_match = counts[0] == counts[1] and set_hashes[0] == set_hashes[1]
+    ok = set_match and (not ordered or (matcher.mismatches == 0 and distance_mismatches == 0))
+    print(f"  {query}: {'OK' if ok else 'MISMATCH'} ({counts[0]} vs {counts[1]} rows"
+          + (f", {matcher.mismatches} out-of-order ids, {distance_mismatches} distance diffs" if ordered else "") + ")")
+    return {
+        "Query": query,
+        "Rows_SQLServer": counts[0],
+        "Rows_Postgres": counts[1],
+        "Set_Hash_SQLServer": f"{set_hashes[0]:016x}",
+        "Set_Hash_Postgres": f"{set_hashes[1]:016x}",
+        "Set_Match": set_match,
+        "Ordered_Checked": ordered,
+        "Order_Mismatches": matcher.mismatches if ordered else None,
+        "Distance_Mismatches": distance_mismatches if ordered else None,
+        "Max_Distance_Diff": round(max_diff, 9) if ordered else None,
+        "Example_Ids": " ".join(matcher.examples) if ordered else "",
+        "Status": "match" if ok else "mismatch",
+    }
+
+def run_verify():
+    group = query_pool.sql_groups("single")[0]
+    catalog = {qid: entry for qid, entry in bench_runner.script_catalog().items()
+               if "sqlserver" in entry and "postgres" in entry and (QUERIES is None or qid in QUERIES)}
+    print(f"Verifying {len(catalog)} queries present on both engines...")
+
+    conns = {engine: throughput.connect(engine) for engine in ("sqlserver", "postgres")}
+    results = []
+    try:
+        counts = table_counts(conns)
+        differ = {table: c for table, c in counts.items() if c["sqlserver"] != c["postgres"]}
+        if differ:
+            for table, c in differ.items():
+                print(f"  {table}: {c['sqlserver']} rows on SQL Server, {c['postgres']} on PostgreSQL")
+            print("Error: the engines hold different data; load the same rows into both before verifying.")
+            return
+        for engine, conn in conns.items():
+            query_pool.check_ids(engine, conn.cursor())
+        for qid, entry in catalog.items():
+            sql = {engine: query_pool.pin(entry[engine], group) for engine in conns}
+            try:
+                results.append(compare(qid, sql, conns))
+            except Exception as e:
+                print(f"  {qid}: ERROR {e}")
+                conns["postgres"].rollback()
+                results.append({"Query": qid, "Status": "error", "Error_Msg": str(e)[:200]})
+    finally:
+        for conn in conns.values():
+            conn.close()
+
+    df = pd.DataFrame(results)
+    df.to_csv(OUTPUT_FILE, index=False)
+    print(f"\n{(df['Status'] == 'match').sum()} / {len(df)} queries match. Report saved to {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    run_verify()
@@ -0,0 +1,409 @@
+import numpy as np
+import pandas as pd
+import json
+import os
+import re
+import string
+from concurrent.futures import ThreadPoolExecutor
+
+import bench_runner
+import embedding_cache
+import measure
+import query_pool
+import result_fetch
+import throughput
+
+# --- Configuration ---
+MODE = "both" # "generate" = write INSTANCES_FILE, "run" = execute an existing INSTANCES_FILE, "both"
+ENGINES = ["sqlserver", "postgres"]
+QUERIES = None # logical ids to generate, e.g. ["NQ2", "IQ4"] (None = every query with parameters)
+INSTANCES_PER_QUERY = 100
+SELECTIVITY_RANGE = (0.0001, 0.5) # target selectivities are drawn log-uniformly from this range
+K_CHOICES = [10, 20, 50, 100]
+SEED = 42
+DISTANCE_SAMPLE_ROWS = 20000 # embedding cache rows the distance thresholds are calibrated on
+CALIBRATION_ENGINE = "sqlserver" # where the page_len / revision year histograms are read from
+CALIBRATION_FILE = "workload_calibration.json"
+INSTANCES_FILE = "workload_instances.jsonl"
+WORKERS = 1 # connections per engine sharing the instance list (more than 1 adds queueing to the latencies)
+WARMUP_RUNS = 1 # untimed runs per query (first instance) before its instances are timed
+OUTPUT_FILE = "workload_results.csv"
+# ---------------------
+# Turns the HyBench scripts into parameter templates and generates randomized
+# instances of them. Literal parameters are replaced by ${name} placeholders:
+#   SQL Server  DECLARE @distance_threshold FLOAT = 0.5;  ->  = ${d};
+#   PostgreSQL  (t.text_embedding <=> q.query_vec) < 0.5  ->  < ${d}
+# (see sqlserver_template / postgres_template for every rule). Only parameters
+# both engines expose are varied; the rest keep the script's value.
+#
+# Each instance draws a target selectivity s and sets every parameter so its
+# own predicate keeps about s of the rows:
+#   d                  s-quantile of the cosine distances from the instance's query vector
+#   d_min/d_max        a band holding s of those distances
+#   d1_*/d2_*          two disjoint bands holding s/2 each
+#   len                s-quantile of page_len
+#   year_*/date_*      a run of consecutive years holding at least s of the revisions
+#   k                  uniform over K_CHOICES
+#   l/r                a 10-rank page ending at a rank drawn from K_CHOICES
+#                      (PostgreSQL gets OFFSET l-1 LIMIT r-l+1, SQL Server its @l / @r)
+# Query vectors come from query_pool.py (a random pool group per instance), so
+# the calibration uses the exact vector the instance runs with.
+#
+# The runner executes every instance of a query on one prepared statement
+# (placeholders and pinned ids become parameters), so instances after the
+# first skip parsing and planning and differ only in their arguments.
+
+SQLSERVER_NAMES = {
+    "distance_threshold": "d", "dist_min": "d_min", "dist_max": "d_max",
+    "page_len_limit": "len", "page_length_limit": "len",
+    "d1_min": "d1_min", "d1_max": "d1_max", "d2_min": "d2_min", "d2_max": "d2_max",
+    "year_low": "year_low", "year_high": "year_high", "date_low": "date_low", "date_high": "date_high",
+    "k": "k", "l": "l", "r": "r",
+}
+DECLARE = re.compile(r"(DECLARE\s+@(\w+)\s+\w+(?:\(\w+\))?\s*=\s*)(?:'([^']*)'|(-?\d+(?:\.\d+)?))(?=\s*;)", re.IGNORECASE)
+
+PG_LEN = re.compile(r"(page_len\s*<\s*)(\d+)", re.IGNORECASE)
+PG_THRESHOLD = re.compile(r"(\)\s*(?:<=?|>=?)\s*)(\d*\.\d+)")
+PG_DISTANCE_BAND = re.compile(r"(BETWEEN\s+)(\d*\.\d+)(\s+AND\s+)(\d*\.\d+)", re.IGNORECASE)
+PG_YEARS = re.compile(r"(BETWEEN\s+)(\d{4})(\s+AND\s+)(\d{4})", re.IGNORECASE)
+PG_DATE = re.compile(r"(rev_timestamp(?:::timestamptz)?\s*)(>=|<=)(\s*')([^']+)(')", re.IGNORECASE)
+PG_LIMIT = re.compile(r"(LIMIT\s+)(\d+)", re.IGNORECASE)
+PG_PAGE = re.compile(r"(OFFSET\s+)(\d+)(\s*(?:--[^\n]*)?\s*LIMIT\s+)(\d+)", re.IGNORECASE)
+
+# --- Templates ---
+
+def sqlserver_template(sql):
+    """(template, {name: script value}) for one SQL Server script; every parameter is a DECLAREd literal."""
+    defaults = {}
+    def replace(m):
+        name = SQLSERVER_NAMES.get(m.group(2))
+        if name is None:
+            return m.group(0)
+        quoted = m.group(3) is not None
+        defaults[name] = m.group(3) if quoted else m.group(4)
+        return f"{m.group(1)}'${{{name}}}'" if quoted else f"{m.group(1)}${{{name}}}"
+    return DECLARE.sub(replace, sql), defaults
+
+def postgres_template(sql):
+    """
+    (template, {name: script value}) for one PostgreSQL file, whose literals
+    sit inline. One distance band is d_min/d_max, two are d1_*/d2_*; LIMIT is
+    k unless the file pages with OFFSET a LIMIT b, which becomes the l/r window
+    (l = a + 1, r = a + b; render() fills ${offset} / ${limit} from them) and
+    turns any other LIMIT r into ${r}.
+    """
+    defaults = {}
+
+    def sub(pattern, names, text):
+        def replace(m):
+            parts = list(m.groups())
+            for i, name in names(m):
+                defaults.setdefault(name, parts[i])
+                parts[i] = f"${{{name}}}"
+            return "".join(parts)
+        return pattern.sub(replace, text)
+
+    bands = iter([["d_min", "d_max"]] if len(PG_DISTANCE_BAND.findall(sql)) == 1
+                 else [["d1_min", "d1_max"], ["d2_min", "d2_max"]])
+    sql = sub(PG_DISTANCE_BAND, lambda m: list(zip((1, 3), next(bands, []))), sql)
+    sql = sub(PG_YEARS, lambda m: [(1, "year_low"), (3, "year_high")], sql)
+    sql = sub(PG_DATE, lambda m: [(3, "date_low" if m.group(2) == ">=" else "date_high")], sql)
+    sql = sub(PG_LEN, lambda m: [(1, "len")], sql)
+    sql = sub(PG_THRESHOLD, lambda m: [(1, "d")], sql)
+    page = PG_PAGE.search(sql)
+    if page:
+        offset, limit = int(page.group(2)), int(page.group(4))
+        defaults.update(l=str(offset + 1), r=str(offset + limit))
+        sql = PG_PAGE.sub(lambda m: f"{m.group(1)}${{offset}}{m.group(3)}${{limit}}", sql)
+        sql = sub(PG_LIMIT, lambda m: [(1, "r")] if int(m.group(2)) == offset + limit else [], sql)
+    else:
+        sql = sub(PG_LIMIT, lambda m: [(1, "k")] if int(m.group(2)) > 1 else [], sql)
+    return sql, defaults
+
+def build_templates():
+    """{query id: {"label", "params": varied names, "table": vector table, engine: (template, defaults)}}."""
+    makers = {"sqlserver": sqlserver_template, "postgres": postgres_template}
+    templates = {}
+    for qid, entry in bench_runner.script_catalog().items():
+        if QUERIES is not None and qid not in QUERIES:
+            continue
+        engines = [e for e in ENGINES if e in entry]
+        if not engines:
+            continue
+        t = {"label": entry["label"]}
+        for engine in engines:
+            t[engine] = makers[engine](entry[engine])
+        params = set.intersection(*(set(t[e][1]) for e in engines))
+        if not params:
+            continue
+        pick = query_pool.VECTOR_PICK.search(entry[engines[0]])
+        t["params"] = sorted(params)
+        t["table"] = pick.group(2).lower() if pick else "text"
+        templates[qid] = t
+    return templates
+
+# pin() with these "ids" turns the vector picks into ${text_0}-style placeholders
+PIN_SLOTS = {name: [f"${{{name}_{slot}}}" for slot in (0, 1)] for name in query_pool.ID_COLUMNS}
+PLACEHOLDER = re.compile(r"'?\$\{(\w+)\}'?")
+
+def format_value(value):
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+def literal(value):
+    """Parameter value for a placeholder: script defaults are text, numbers go over as numbers."""
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, str) and re.fullmatch(r"-?\d+", value):
+        return int(value)
+    if isinstance(value, str) and re.fullmatch(r"-?\d*\.\d+", value):
+        return float(value)
+    return value
+
+def instance_values(template, engine, params, group):
+    """{placeholder: value} for one instance: script values, `params`, the l/r window and the group's pool ids."""
+    values = {**template[engine][1], **params}
+    if "l" in values:
+        l, r = int(values["l"]), int(values["r"])
+        values.update(offset=l - 1, limit=r - l + 1)
+    values.update({f"{name}_{slot}": ids[slot] for name, ids in group.items() for slot in (0, 1)})
+    return values
+
+def render(template, engine, params, group):
+    """SQL for one instance: the engine's template filled with `params` (script values elsewhere), pinned to `group`."""
+    values = instance_values(template, engine, params, group)
+    text = query_pool.pin(template[engine][0], PIN_SLOTS)
+    return string.Template(text).substitute({name: format_value(v) for name, v in values.items()})
+
+def prepared_sql(template, engine):
+    """
+    (SQL with parameter markers, placeholder names in marker order) for the
+    engine's template: ? for pyodbc, $1..$n for a PostgreSQL PREPARE.
+    """
+    names = []
+    def marker(m):
+        names.append(m.group(1))
+        return "?" if engine == "sqlserver" else f"${len(names)}"
+    return PLACEHOLDER.sub(marker, query_pool.pin(template[engine][0], PIN_SLOTS)), names
+
+# --- Calibration ---
+
+def calibrate():
+    """{"page_len": [[value, rows], ...], "years": [[year, rows], ...]}, read once from CALIBRATION_ENGINE."""
+    if os.path.exists(CALIBRATION_FILE):
+        with open(CALIBRATION_FILE) as f:
+            return json.load(f)
+    schema = "dbo." if CALIBRATION_ENGINE == "sqlserver" else ""
+    queries = {
+        "page_len": f"SELECT page_len, COUNT(*) FROM {schema}page WHERE page_len IS NOT NULL GROUP BY page_len",
+        "years": f"SELECT LEFT(rev_timestamp, 4), COUNT(*) FROM {schema}revision GROUP BY LEFT(rev_timestamp, 4)",
+    }
+    conn = throughput.connect(CALIBRATION_ENGINE)
+    calibration = {"engine": CALIBRATION_ENGINE}
+    try:
+        cursor = conn.cursor()
+        for name, sql in queries.items():
+            cursor.execute(sql)
+            calibration[name] = sorted([int(value), int(rows)] for value, rows in cursor.fetchall()
+                                       if value is not None and str(value).isdigit())
+    finally:
+        conn.close()
+    with open(CALIBRATION_FILE, "w") as f:
+        json.dump(calibration, f)
+    print(f"Calibration histograms written to {CALIBRATION_FILE}.")
+    return calibration
+
+def distance_sample(name, rng):
+    """Seeded DISTANCE_SAMPLE_ROWS rows of the embedding cache, unit-normalized."""
+    _, vectors = embedding_cache.load_cache(name)
+    rows = np.sort(rng.choice(len(vectors), size=min(DISTANCE_SAMPLE_ROWS, len(vectors)), replace=False))
+    sample = np.asarray(vectors[rows], dtype=np.float32)
+    return sample / np.maximum(np.linalg.norm(sample, axis=1, keepdims=True), 1e-12)
+
+def histogram_quantile(histogram, q):
+    """Smallest value v with at least a fraction q of the rows below v (for `col < v` predicates)."""
+    values = np.array([v for v, _ in histogram])
+    cum = np.cumsum([n for _, n in histogram]) / sum(n for _, n in histogram)
+    i = min(np.searchsorted(cum, q), len(values) - 1)
+    return int(values[i]) + 1, float(cum[i])
+
+def year_window(years, s, rng):
+    """(first year, last year, share of rows) for a random run of consecutive years holding at least s of the rows."""
+    counts = np.array([n for _, n in years], dtype=float) / sum(n for _, n in years)
+    lo = hi = int(rng.integers(len(years)))
+    while counts[lo:hi + 1].sum() < s and (lo > 0 or hi < len(years) - 1):
+        if hi == len(years) - 1 or (lo > 0 and rng.random() < 0.5):
+            lo -= 1
+        else:
+            hi += 1
+    return years[lo][0], years[hi][0], float(counts[lo:hi + 1].sum())
+
+def draw_params(names, s, distances, calibration, rng):
+    """(params, {name: estimated selectivity}) for target selectivity s; `distances` is sorted."""
+    q = lambda p: float(np.quantile(distances, min(max(p, 0.0), 1.0)))
+    params, estimated = {}, {}
+    if "d" in names:
+        params["d"], estimated["d"] = q(s), s
+    if "d_min" in names:
+        a = rng.uniform(0, 1 - s)
+        params["d_min"], params["d_max"] = q(a), q(a + s)
+        estimated["d_min"] = s
+    if "d1_min" in names:
+        a1, a2 = rng.uniform(0, 0.5 - s / 2), rng.uniform(0.5, 1 - s / 2)
+        params.update(d1_min=q(a1), d1_max=q(a1 + s / 2), d2_min=q(a2), d2_max=q(a2 + s / 2))
+        estimated["d1_min"] = s
+    if "len" in names:
+        params["len"], estimated["len"] = histogram_quantile(calibration["page_len"], s)
+    if {"year_low", "date_low"} & set(names):
+        lo, hi, share = year_window(calibration["years"], s, rng)
+        params.update(year_low=lo, year_high=hi, date_low=f"{lo}-01-01T00:00:00Z", date_high=f"{hi + 1}-01-01T00:00:00Z")
+        estimated["year_low"] = share
+    if "k" in names:
+        params["k"] = int(rng.choice(K_CHOICES))
+    if "l" in names:
+        params["r"] = int(rng.choice(K_CHOICES))
+        params["l"] = max(1, params["r"] - 9)
+    return {n: v for n, v in params.items() if n in names}, estimated
+
+def generate():
+    templates = build_templates()
+    calibration = calibrate()
+    pool = query_pool.load_pool()
+    groups = query_pool.POOL_SIZE // 2
+    rng = np.random.default_rng(SEED)
+    samples = {name: distance_sample(name, rng) for name in embedding_cache.TABLES}
+    distances = {}
+    lo, hi = np.log10(SELECTIVITY_RANGE[0]), np.log10(SELECTIVITY_RANGE[1])
+
+    count = 0
+    with open(INSTANCES_FILE, "w") as f:
+        for qid, t in templates.items():
+            for i in range(INSTANCES_PER_QUERY):
+                g = int(rng.integers(groups))
+                key = (t["table"], g)
+                if key not in distances:
+                    vector = pool[t["table"]][1][2 * g]
+                    distances[key] = np.sort(1 - samples[t["table"]] @ (vector / np.linalg.norm(vector)))
+                s = float(10 ** rng.uniform(lo, hi))
+                params, estimated = draw_params(t["params"], s, distances[key], calibration, rng)
+                f.write(json.dumps({
+                    "query": qid, "instance": i, "vector_group": g, "target_selectivity": round(s, 6),
+                    "params": params, "selectivity": {n: round(v, 6) for n, v in estimated.items()},
+                }) + "\n")
+                count += 1
+    print(f"{count} instances of {len(templates)} templates written to {INSTANCES_FILE}.")
+
+# --- Execution ---
+
+def load_instances():
+    with open(INSTANCES_FILE) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def prepare(engine, conn, qid, template):
+    """
+    (statement, placeholder names) to run every instance of `qid` with, or None
+    when the template cannot be prepared (several PostgreSQL statements, or a
+    PREPARE that fails) and instances fall back to rendered SQL.
+    """
+    sql, names = prepared_sql(template, engine)
+    if engine == "sqlserver":
+        return sql, names # pyodbc prepares once and reuses it while the cursor runs the same text
+    if len(result_fetch.split_statements(sql)) > 1:
+        return None
+    name = "wl_" + re.sub(r"\W", "_", qid).lower()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DEALLOCATE ALL; PREPARE {name} AS {result_fetch.copy_query(sql)}")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"  [{engine}] {qid}: PREPARE failed ({str(e).strip()[:80]}), running rendered SQL")
+        return None
+    return f"EXECUTE {name}" + (f"({', '.join(['%s'] * len(names))})" if names else ""), names
+
+def execute_prepared(engine, conn, cursor, statement, args):
+    """Runs one instance on its query's prepared statement; returns rows fetched."""
+    cursor.execute(statement, args)
+    if engine == "sqlserver":
+        while not cursor.description and cursor.nextset():
+            pass
+        return len(cursor.fetchall()) if cursor.description else 0
+    rows = len(cursor.fetchall()) if cursor.description else 0
+    conn.commit()
+    return rows
+
+def run_worker(engine, instances, templates, groups):
+    """
+    Runs `instances` (grouped by query) on one connection; one timed execution
+    each, all instances of a query on the same prepared statement.
+    """
+    conn = throughput.connect(engine)
+    rows, warmed, statements = [], set(), {}
+    try:
+        query_pool.check_ids(engine, conn.cursor())
+        for inst in instances:
+            t = templates[inst["query"]]
+            if inst["query"] not in statements:
+                statements[inst["query"]] = prepare(engine, conn, inst["query"], t), conn.cursor()
+            statement, cursor = statements[inst["query"]]
+            row = {
+                "Engine": engine,
+                "System": bench_runner.SYSTEMS[engine],
+                "Query": inst["query"],
+                "Label": t["label"],
+                "Instance": inst["instance"],
+                "Vector_Group": inst["vector_group"],
+                "Target_Selectivity": inst["target_selectivity"],
+                **inst["params"],
+                **{f"Sel_{n}": v for n, v in inst["selectivity"].items()},
+            }
+            try:
+                group = groups[inst["vector_group"]]
+                if statement:
+                    values = instance_values(t, engine, inst["params"], group)
+                    sql, args = statement[0], [literal(values[name]) for name in statement[1]]
+                    run_once = lambda: execute_prepared(engine, conn, cursor, sql, args)
+                else:
+                    sql = render(t, engine, inst["params"], group)
+                    run_once = lambda: throughput.execute(engine, conn, sql)
+                warmup = 0 if inst["query"] in warmed else WARMUP_RUNS
+                warmed.add(inst["query"])
+                samples_ms, result = measure.measure(run_once, warmup, 1)
+                row.update({"Latency_MS": round(samples_ms[0], 3), "Rows": result, "Status": "Success"})
+            except Exception as e:
+                if engine == "postgres":
+                    conn.rollback()
+                row.update({"Status": "Failed", "Error_Msg": str(e)[:200]})
+            rows.append(row)
+    finally:
+        conn.close()
+    return rows
+
+def run_instances():
+    templates = build_templates()
+    instances = [inst for inst in load_instances() if inst["query"] in templates]
+    instances.sort(key=lambda inst: (inst["query"], inst["instance"]))
+    groups = query_pool.sql_groups("batch", query_pool.POOL_SIZE // 2)
+    print(f"Running {len(instances)} instances on {ENGINES} with {WORKERS} connection(s) per engine...")
+
+    results = []
+    for engine in ENGINES:
+        mine = [inst for inst in instances if engine in templates[inst["query"]]]
+        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+            # Whole queries per worker, so each one warms up a query once
+            queries = sorted({inst["query"] for inst in mine})
+            chunks = [[inst for inst in mine if queries.index(inst["query"]) % WORKERS == w] for w in range(WORKERS)]
+            futures = [executor.submit(run_worker, engine, chunk, templates, groups) for chunk in chunks if chunk]
+            engine_rows = [row for f in futures for row in f.result()]
+        ok = [r for r in engine_rows if r["Status"] == "Success"]
+        print(f"  [{engine}] {len(ok)} / {len(engine_rows)} instances succeeded")
+        results.extend(engine_rows)
+
+    df = pd.DataFrame(results)
+    df.to_csv(OUTPUT_FILE, index=False)
+    print(f"\nResults for {len(df)} instance runs saved to {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    if MODE in ("generate", "both"):
+        generate()
+    if MODE in ("run", "both"):
+        run_instances()